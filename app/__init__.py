@@ -12,14 +12,19 @@ from app.routes.institution.institution import institution_route
 from app.routes.incident.incident_resident import incident_resident_route
 from app.routes.incident.incident_institution import incident_institution_route
 from app.routes.incident.incident_vehicle import incident_vehicle_route
+from app.routes.incident.incident_export import incident_export_route
+from app.routes.incident.incident_stats import incident_stats_route
 from app.routes.storage import storage_route
+from app.routes.events import event_route
 
-from app.extensions import db, migrate, jwt, mail
+from app.extensions import db, migrate, jwt, mail, jobs, events
 from flask_seeder import FlaskSeeder
 from dotenv import load_dotenv
 from config import InitConfig
 from app.models import models
 from utils.error_handlers import register_error_handlers
+from utils.json_provider import init_json_provider
+from app.commands import register_commands
 
 # Create Flask app instance
 app = Flask(__name__)
@@ -32,15 +37,23 @@ load_dotenv('.env')
 with app.app_context():
     InitConfig(app)
 
+    # JSON provider (orjson jika tersedia)
+    init_json_provider(app)
+
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
     mail.init_app(app)
     seeder.init_app(app, db)
+    jobs.init_app(app)
+    events.init_app(app)
     
     # Register error handlers
     register_error_handlers(app)
+
+    # Register CLI commands
+    register_commands(app)
         
     app.register_blueprint(home_route, url_prefix='/')
     app.register_blueprint(auth_bp, url_prefix='/auth')
@@ -53,5 +66,8 @@ with app.app_context():
     app.register_blueprint(incident_resident_route, url_prefix='/incidents/residents')
     app.register_blueprint(incident_institution_route, url_prefix='/incidents/institutions')
     app.register_blueprint(incident_vehicle_route, url_prefix='/incidents/vehicles')
+    app.register_blueprint(incident_export_route, url_prefix='/incidents/export')
+    app.register_blueprint(incident_stats_route, url_prefix='/incidents/stats')
     app.register_blueprint(storage_route, url_prefix='/storage')
+    app.register_blueprint(event_route, url_prefix='/events')
     
\ No newline at end of file
@@ -0,0 +1,521 @@
+import time
+import random
+import click
+import numpy as np
+from datetime import timedelta
+from flask import current_app
+from sqlalchemy import update
+
+from app.extensions import db
+from app.models.models import Incident, Institution, Label
+from app.models.login_log import LoginLog
+from utils.datetime import get_current_time_in_timezone
+from utils.geo import grid_cell, nearest
+
+# Path yang diminta bergantian oleh perintah load-test
+LOAD_TEST_PROFILES = {
+    'home': ['/'],
+    'institution': [
+        '/institutions/',
+        '/institutions/vehicles/',
+        '/incidents/institutions/?status=reported',
+        '/incidents/stats/',
+    ],
+    'resident': [
+        '/institutions/nearby?lat=-6.2&lng=106.816666',
+        '/incidents/residents/?status=reported',
+    ],
+}
+
+def register_commands(app):
+    # Label ulang semua insiden dengan model terbaru
+    @app.cli.command('relabel-incidents')
+    @click.option('--chunk-size', default=500, show_default=True, help='Jumlah insiden per batch prediksi.')
+    @click.option('--dry-run', is_flag=True, help='Hitung perubahan tanpa menyimpan ke database.')
+    def relabel_incidents(chunk_size, dry_run):
+        """Re-label Incident rows in chunks with the current classifier."""
+        from utils.text_classification import predict_emergency_cases
+
+        started = time.perf_counter()
+        last_id = 0
+        scanned = 0
+        changed = 0
+
+        while True:
+            # Ambil insiden per halaman berdasarkan ID (keyset) agar memori tetap kecil
+            rows = db.session.query(
+                Incident.id,
+                Incident.description,
+                Incident.label
+            ).filter(
+                Incident.id > last_id
+            ).order_by(
+                Incident.id
+            ).limit(chunk_size).all()
+
+            if not rows:
+                break
+
+            last_id = rows[-1].id
+            scanned += len(rows)
+
+            # Lewati insiden tanpa deskripsi
+            rows = [row for row in rows if row.description and row.description.strip()]
+            if not rows:
+                continue
+
+            labels = predict_emergency_cases([row.description for row in rows], batch_size=chunk_size)
+
+            changes = []
+            for row, label in zip(rows, labels):
+                label = Label(str(label).lower())
+                if row.label != label:
+                    changes.append({'id': row.id, 'label': label})
+
+            # Bulk UPDATE berdasarkan primary key
+            if changes and not dry_run:
+                db.session.execute(update(Incident), changes)
+                db.session.commit()
+
+            changed += len(changes)
+            click.echo(f'{scanned} insiden diperiksa, {changed} label berubah...')
+
+        elapsed = time.perf_counter() - started
+        action = 'akan diubah' if dry_run else 'diubah'
+        click.echo(f'Selesai: {scanned} insiden diperiksa, {changed} label {action} dalam {elapsed:.2f} detik.')
+    # Akhir Label ulang semua insiden
+
+    # Hapus log masuk yang sudah kedaluwarsa
+    @app.cli.command('purge-login-logs')
+    @click.option('--batch-size', default=1000, show_default=True, help='Jumlah baris per transaksi DELETE.')
+    @click.option('--max-batches', default=None, type=int, help='Berhenti setelah sejumlah batch (default: sampai habis).')
+    @click.option('--older-than-days', default=None, type=int, help='Umur minimal log (default: masa berlaku token JWT).')
+    def purge_login_logs(batch_size, max_batches, older_than_days):
+        """Delete expired LoginLog rows."""
+        if older_than_days is None:
+            retention = current_app.config['JWT_ACCESS_TOKEN_EXPIRES']
+        else:
+            retention = timedelta(days=older_than_days)
+
+        # created_at disimpan dalam waktu WIB tanpa zona waktu
+        cutoff = get_current_time_in_timezone('Asia/Jakarta').replace(tzinfo=None) - retention
+
+        started = time.perf_counter()
+        removed = LoginLog.purge(cutoff, batch_size=batch_size, max_batches=max_batches)
+        elapsed = time.perf_counter() - started
+
+        click.echo(f'Selesai: {removed} log masuk dihapus (dibuat sebelum {cutoff:%Y-%m-%d %H:%M}) dalam {elapsed:.2f} detik.')
+    # Akhir Hapus log masuk yang sudah kedaluwarsa
+
+    # Isi sel grid instansi yang sudah ada
+    @app.cli.command('backfill-institution-grid')
+    @click.option('--chunk-size', default=1000, show_default=True, help='Jumlah instansi per transaksi UPDATE.')
+    def backfill_institution_grid(chunk_size):
+        """Fill grid_lat/grid_lng for every Institution row."""
+        last_id = 0
+        updated = 0
+
+        while True:
+            rows = db.session.query(
+                Institution.id,
+                Institution.latitude,
+                Institution.longitude
+            ).filter(
+                Institution.id > last_id
+            ).order_by(
+                Institution.id
+            ).limit(chunk_size).all()
+
+            if not rows:
+                break
+
+            last_id = rows[-1].id
+
+            changes = []
+            for row in rows:
+                grid_lat, grid_lng = grid_cell(row.latitude, row.longitude)
+                changes.append({'id': row.id, 'grid_lat': grid_lat, 'grid_lng': grid_lng})
+
+            db.session.execute(update(Institution), changes)
+            db.session.commit()
+
+            updated += len(changes)
+            click.echo(f'{updated} instansi diperbarui...')
+
+        click.echo(f'Selesai: sel grid {updated} instansi diperbarui.')
+    # Akhir Isi sel grid instansi
+
+    # Bandingkan pencarian instansi terdekat dengan pemindaian penuh
+    @app.cli.command('bench-nearby-institutions')
+    @click.option('--samples', default=200, show_default=True, help='Jumlah titik pencarian acak.')
+    @click.option('--radius', default=10.0, show_default=True, help='Radius pencarian dalam kilometer.')
+    @click.option('--limit', default=10, show_default=True, help='Jumlah instansi per pencarian.')
+    @click.option('--seed', default=0, show_default=True, help='Seed acak agar hasil bisa diulang.')
+    def bench_nearby_institutions(samples, radius, limit, seed):
+        """Benchmark the grid-indexed nearby search against a full table scan."""
+        from app.services.institution_service import find_nearby_institutions
+
+        points = db.session.query(Institution.latitude, Institution.longitude).all()
+        if not points:
+            click.echo('Tidak ada instansi untuk diuji.')
+            return
+
+        # Titik pencarian di sekitar instansi yang ada
+        rng = random.Random(seed)
+        queries = []
+        for _ in range(samples):
+            point = rng.choice(points)
+            queries.append((float(point.latitude) + rng.uniform(-0.05, 0.05), float(point.longitude) + rng.uniform(-0.05, 0.05)))
+
+        def full_scan(latitude, longitude):
+            rows = db.session.query(Institution.id, Institution.latitude, Institution.longitude).all()
+            return nearest(latitude, longitude, rows, radius, limit)
+
+        def measure(search):
+            timings = []
+            results = []
+            for latitude, longitude in queries:
+                started = time.perf_counter()
+                results.append([row.id for row, _ in search(latitude, longitude)])
+                timings.append((time.perf_counter() - started) * 1000)
+            return np.array(timings), results
+
+        scan_timings, scan_results = measure(full_scan)
+        grid_timings, grid_results = measure(lambda latitude, longitude: find_nearby_institutions(latitude, longitude, radius, limit))
+
+        mismatches = sum(1 for a, b in zip(scan_results, grid_results) if a != b)
+
+        click.echo(f'{len(points)} instansi, {samples} pencarian, radius {radius} km, limit {limit}')
+        for name, timings in (('pemindaian penuh', scan_timings), ('indeks grid', grid_timings)):
+            click.echo(f'{name:>16}: rata-rata {timings.mean():.2f} ms, p95 {np.percentile(timings, 95):.2f} ms')
+        click.echo(f'Percepatan: {scan_timings.mean() / grid_timings.mean():.1f}x, hasil berbeda: {mismatches}')
+    # Akhir Bandingkan pencarian instansi terdekat
+
+    # Pastikan daftar instansi tidak menjalankan kueri per baris (N+1)
+    @app.cli.command('check-institution-list-queries')
+    @click.option('--small', default=3, show_default=True, help='Jumlah instansi pada percobaan pertama.')
+    @click.option('--large', default=30, show_default=True, help='Jumlah instansi pada percobaan kedua.')
+    def check_institution_list_queries(small, large):
+        """Fail when the institution list runs more SQL statements for more institutions."""
+        import uuid
+        from sqlalchemy import event
+        from app.models.models import User, Driver, Vehicle
+        from app.routes.institution.institution import get_all_institutions
+        from utils.pagination import encode_cursor
+
+        def count_statements(count):
+            # Data uji hanya di-flush lalu dibatalkan, database tidak berubah
+            token = uuid.uuid4().hex[:8]
+            first_id = None
+            for k in range(count):
+                user = User(name=f'Instansi {token} {k}', address='-', email=f'{token}{k}@check.local', username=f'{token}_{k}', password='-')
+                db.session.add(user)
+                db.session.flush()
+                institution = Institution(user_id=user.id, description='-', latitude=-6.2, longitude=106.816666)
+                db.session.add(institution)
+                db.session.flush()
+                first_id = first_id or institution.id
+                for v in range(2):
+                    driver = Driver(institution_id=institution.id, phone_number=f'{token[:6]}{k:04d}{v}', user_id=user.id)
+                    db.session.add(driver)
+                    db.session.flush()
+                    db.session.add(Vehicle(institution_id=institution.id, driver_id=driver.id, name=f'Kendaraan {v}', description='-', is_ready=v == 0))
+            db.session.flush()
+
+            statements = []
+            def record(conn, cursor, statement, parameters, context, executemany):
+                statements.append(statement)
+
+            # Mulai halaman tepat sebelum instansi uji, tanpa pemeriksaan login
+            path = f'/institutions/?limit={count}&cursor={encode_cursor(first_id - 1)}'
+            event.listen(db.engine, 'before_cursor_execute', record)
+            try:
+                with app.test_request_context(path):
+                    response, status = get_all_institutions.__wrapped__()
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', record)
+                db.session.rollback()
+
+            rows = response.get_json()['data']
+            if status != 200 or len(rows) != count or any(row['ready_vehicle_count'] != 1 for row in rows):
+                raise click.ClickException(f'Daftar instansi tidak sesuai untuk {count} instansi.')
+            return len(statements)
+
+        small_count = count_statements(small)
+        large_count = count_statements(large)
+
+        click.echo(f'{small} instansi: {small_count} kueri, {large} instansi: {large_count} kueri')
+        if small_count != large_count:
+            raise click.ClickException('Jumlah kueri bertambah seiring jumlah instansi (N+1).')
+        click.echo('Selesai: jumlah kueri tetap.')
+    # Akhir Pastikan daftar instansi tidak menjalankan kueri per baris
+
+    # Bandingkan kecepatan JSON provider dengan encoder bawaan Python
+    @app.cli.command('bench-json')
+    @click.option('--rows', default=10000, show_default=True, help='Jumlah insiden dalam payload.')
+    @click.option('--repeat', default=20, show_default=True, help='Jumlah pengulangan serialisasi.')
+    def bench_json(rows, repeat):
+        """Benchmark the configured JSON provider against the stdlib provider."""
+        from decimal import Decimal
+        from app.models.models import IncidentStatus
+        from utils.json_provider import StdlibJSONProvider, init_json_provider
+
+        # Payload seperti daftar insiden: tanggal, Decimal, dan Enum.
+        # Kolom TIMESTAMP dibaca dari MySQL tanpa zona waktu, jadi tanggalnya naive.
+        now = get_current_time_in_timezone('Asia/Jakarta').replace(tzinfo=None)
+        labels = list(Label)
+        statuses = list(IncidentStatus)
+        payload = {
+            'status': True,
+            'message': 'Insiden berhasil dimuat.',
+            'data': [
+                {
+                    'id': i,
+                    'description': f'Kebakaran rumah warga nomor {i}',
+                    'label': labels[i % len(labels)],
+                    'status': statuses[i % len(statuses)],
+                    'reported_at': now - timedelta(minutes=i),
+                    'created_at': now - timedelta(minutes=i),
+                    'location': {
+                        'latitude': Decimal('-6.200000') + Decimal(i) / 1000000,
+                        'longitude': Decimal('106.816666'),
+                    },
+                    'picture': f'incidents/{i}.png',
+                }
+                for i in range(rows)
+            ],
+            'next_cursor': None,
+        }
+
+        def measure(provider):
+            provider.response(payload)  # Pemanasan
+            started = time.perf_counter()
+            for _ in range(repeat):
+                body = provider.response(payload).get_data()
+            return (time.perf_counter() - started) / repeat * 1000, len(body)
+
+        current_format = app.config['JSON_DATETIME_FORMAT']
+        with app.test_request_context():
+            for datetime_format in ('http', 'iso'):
+                app.config['JSON_DATETIME_FORMAT'] = datetime_format
+                baseline, _ = measure(StdlibJSONProvider(app))
+                provider = init_json_provider(app)
+                elapsed, size = measure(provider)
+                click.echo(
+                    f'Tanggal {datetime_format:>4}: stdlib {baseline:.2f} ms, {type(provider).__name__} {elapsed:.2f} ms '
+                    f'per respons ({size / 1024:.0f} KiB), percepatan {baseline / elapsed:.1f}x'
+                )
+
+        # Kembalikan konfigurasi semula
+        app.config['JSON_DATETIME_FORMAT'] = current_format
+        init_json_provider(app)
+    # Akhir Bandingkan kecepatan JSON provider
+
+    # Bangun ulang tabel statistik insiden dari data mentah
+    @app.cli.command('rebuild-incident-rollups')
+    @click.option('--chunk-size', default=1000, show_default=True, help='Jumlah baris yang dibaca per batch.')
+    def rebuild_incident_rollups(chunk_size):
+        """Recompute incident_rollups from incidents and incident_vehicles."""
+        from app.models.models import IncidentRollup, IncidentVehicle
+        from app.services import rollup_service
+
+        started = time.perf_counter()
+        increments = rollup_service.aggregate_events([])
+
+        # Transisi status insiden
+        incidents = db.session.query(
+            Incident.institution_id,
+            Incident.label,
+            Incident.reported_at,
+            Incident.handle_at,
+            Incident.completed_at
+        ).yield_per(chunk_size)
+        scanned = 0
+        for incident in incidents:
+            events = rollup_service.incident_reported_events(incident)
+            if incident.handle_at is not None:
+                events += rollup_service.incident_handled_events(incident)
+            if incident.completed_at is not None:
+                events += rollup_service.incident_completed_events(incident)
+            rollup_service.aggregate_events(events, increments)
+            scanned += 1
+
+        # Waktu tiba kendaraan
+        arrivals = db.session.query(
+            Incident.institution_id,
+            Incident.label,
+            IncidentVehicle.assigned_at,
+            IncidentVehicle.arrived_at
+        ).join(
+            Incident, Incident.id == IncidentVehicle.incident_id
+        ).filter(
+            IncidentVehicle.arrived_at.isnot(None)
+        ).yield_per(chunk_size)
+        for arrival in arrivals:
+            rollup_service.aggregate_events(rollup_service.vehicle_arrived_events(arrival, arrival), increments)
+
+        # Ganti isi tabel dalam satu transaksi
+        db.session.query(IncidentRollup).delete()
+        keys = list(increments)
+        for i in range(0, len(keys), chunk_size):
+            rollup_service.apply_increments({key: increments[key] for key in keys[i:i + chunk_size]})
+        db.session.commit()
+
+        elapsed = time.perf_counter() - started
+        click.echo(f'Selesai: {scanned} insiden diringkas menjadi {len(keys)} baris statistik dalam {elapsed:.2f} detik.')
+    # Akhir Bangun ulang tabel statistik insiden
+
+    # Kirim email outbox yang tertunda
+    @app.cli.command('deliver-emails')
+    @click.option('--max-batches', default=None, type=int, help='Berhenti setelah sejumlah batch (default: sampai habis).')
+    def deliver_emails(max_batches):
+        """Send due outbox emails now, e.g. from a scheduler or after a restart."""
+        from app.services.email_service import deliver_pending_emails
+
+        started = time.perf_counter()
+        sent, failed = deliver_pending_emails(max_batches=max_batches)
+        elapsed = time.perf_counter() - started
+        click.echo(f'Selesai: {sent} email terkirim, {failed} gagal permanen dalam {elapsed:.2f} detik.')
+    # Akhir Kirim email outbox
+
+    # Buat thumbnail untuk gambar lama
+    @app.cli.command('generate-thumbnails')
+    @click.option('--force', is_flag=True, help='Buat ulang walaupun thumbnail sudah ada.')
+    def generate_thumbnails(force):
+        """Render thumbnails for vehicle and incident pictures uploaded before thumbnails existed."""
+        from app.models.models import Vehicle
+        from utils.images import thumbnail_path
+        from utils.storage import storage_manager
+
+        started = time.perf_counter()
+        scanned = generated = failed = 0
+        for model in (Vehicle, Incident):
+            pictures = db.session.scalars(
+                db.select(model.picture).where(model.picture.isnot(None)).distinct()
+            ).all()
+            db.session.rollback()
+
+            for picture in pictures:
+                scanned += 1
+                if not force and storage_manager.fileExists(thumbnail_path(picture, 'small')):
+                    continue
+                try:
+                    if storage_manager.generateThumbnails(picture):
+                        generated += 1
+                    else:
+                        failed += 1
+                except Exception as e:
+                    click.echo(f'Gagal membuat thumbnail {picture}: {e}')
+                    failed += 1
+
+        elapsed = time.perf_counter() - started
+        click.echo(f'Selesai: {scanned} gambar diperiksa, {generated} dibuatkan thumbnail, {failed} gagal dalam {elapsed:.2f} detik.')
+    # Akhir Buat thumbnail untuk gambar lama
+
+    # Ulangi pemrosesan insiden yang tertahan
+    @app.cli.command('requeue-incidents')
+    @click.option('--older-than-minutes', default=10, show_default=True, help='Umur minimal insiden yang dianggap tertahan.')
+    @click.option('--failed', is_flag=True, help='Ulangi juga insiden yang gagal diproses.')
+    def requeue_incidents(older_than_minutes, failed):
+        """Re-run processing of incidents left pending or processing, e.g. after a restart or crash."""
+        from app.models.models import IncidentProcessingStatus
+        from app.services.incident_service import process_incident
+
+        # reported_at disimpan dalam waktu WIB tanpa zona waktu
+        cutoff = get_current_time_in_timezone('Asia/Jakarta').replace(tzinfo=None) - timedelta(minutes=older_than_minutes)
+
+        statuses = [IncidentProcessingStatus.PENDING, IncidentProcessingStatus.PROCESSING]
+        if failed:
+            statuses.append(IncidentProcessingStatus.FAILED)
+
+        ids = db.session.scalars(
+            db.select(Incident.id).where(Incident.processing_status.in_(statuses), Incident.reported_at < cutoff).order_by(Incident.id)
+        ).all()
+        db.session.rollback()
+
+        started = time.perf_counter()
+        for incident_id in ids:
+            process_incident(incident_id)
+        elapsed = time.perf_counter() - started
+
+        done = db.session.query(Incident.id).filter(
+            Incident.id.in_(ids), Incident.processing_status == IncidentProcessingStatus.DONE
+        ).count() if ids else 0
+        click.echo(f'Selesai: {len(ids)} insiden diproses ulang, {done} berhasil, {len(ids) - done} gagal dalam {elapsed:.2f} detik.')
+    # Akhir Ulangi pemrosesan insiden yang tertahan
+
+    # Uji beban server yang sedang berjalan
+    @app.cli.command('load-test')
+    @click.option('--url', default='http://127.0.0.1:8080', show_default=True, help='Alamat server yang diuji.')
+    @click.option('--profile', type=click.Choice(sorted(LOAD_TEST_PROFILES)), default='home', show_default=True, help='Kumpulan path yang diminta bergantian.')
+    @click.option('--path', 'paths', multiple=True, help='Path tambahan atau pengganti profil (bisa diulang).')
+    @click.option('--concurrency', default=50, show_default=True, help='Jumlah klien bersamaan.')
+    @click.option('--duration', default=30.0, show_default=True, help='Lama pengujian dalam detik.')
+    @click.option('--token', default=None, help='JWT untuk route yang membutuhkan login.')
+    def load_test(url, profile, paths, concurrency, duration, token):
+        """Measure throughput and latency of a running server, e.g. to compare GUNICORN_WORKER_CLASS values."""
+        import http.client
+        import threading
+        from urllib.parse import urlsplit
+
+        target = urlsplit(url)
+        connection_class = http.client.HTTPSConnection if target.scheme == 'https' else http.client.HTTPConnection
+        paths = list(paths) or LOAD_TEST_PROFILES[profile]
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+
+        latencies = [[] for _ in range(concurrency)]
+        statuses = [{} for _ in range(concurrency)]
+        errors = [0] * concurrency
+        deadline = time.perf_counter() + duration
+
+        def client(index):
+            # Satu koneksi keep-alive per klien, dibuka ulang jika terputus
+            connection = None
+            request_index = index
+            while time.perf_counter() < deadline:
+                path = paths[request_index % len(paths)]
+                request_index += 1
+                started = time.perf_counter()
+                try:
+                    if connection is None:
+                        connection = connection_class(target.hostname, target.port, timeout=30)
+                    connection.request('GET', path, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                except (OSError, http.client.HTTPException):
+                    errors[index] += 1
+                    if connection is not None:
+                        connection.close()
+                    connection = None
+                    time.sleep(0.05)
+                    continue
+                latencies[index].append((time.perf_counter() - started) * 1000)
+                statuses[index][response.status] = statuses[index].get(response.status, 0) + 1
+            if connection is not None:
+                connection.close()
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        timings = np.array([latency for client_latencies in latencies for latency in client_latencies])
+        status_counts = {}
+        for client_statuses in statuses:
+            for status, count in client_statuses.items():
+                status_counts[status] = status_counts.get(status, 0) + count
+
+        click.echo(f'{url} {paths}, {concurrency} klien, {elapsed:.1f} detik')
+        if not len(timings):
+            click.echo(f'Tidak ada respons, {sum(errors)} kesalahan koneksi.')
+            return
+        click.echo(f'Permintaan: {len(timings)} ({len(timings) / elapsed:.1f}/detik), kesalahan koneksi: {sum(errors)}')
+        click.echo(f'Status: {dict(sorted(status_counts.items()))}')
+        click.echo(
+            f'Latensi: p50 {np.percentile(timings, 50):.1f} ms, p95 {np.percentile(timings, 95):.1f} ms, '
+            f'p99 {np.percentile(timings, 99):.1f} ms, maks {timings.max():.1f} ms'
+        )
+    # Akhir Uji beban server
@@ -3,10 +3,14 @@ from flask_jwt_extended import JWTManager
 from flask_migrate import Migrate
 from flask_seeder import FlaskSeeder
 from flask_mail import Mail
+from utils.jobs import JobQueue
+from utils.events import EventBroker
 
 # Create extension instances without binding to an app initially
 db = SQLAlchemy()
 jwt = JWTManager()
 migrate = Migrate()
 seeder = FlaskSeeder()
-mail = Mail()
\ No newline at end of file
+mail = Mail()
+jobs = JobQueue()
+events = EventBroker()
\ No newline at end of file
@@ -3,17 +3,20 @@
 # Import the actual models
 from .models import (
     # Enums
-    Gender, IncidentStatus,
+    Gender, IncidentStatus, IncidentProcessingStatus,
     
     # Models
     Role, User, UserRole, Resident, 
     Administration, Institution, 
     Driver, Vehicle, Incident, 
-    IncidentVehicle
+    IncidentVehicle, IncidentRollup
 )
 
 from .reset_password import ResetPassword
 from .login_log import LoginLog
+from .email_outbox import EmailOutbox, EmailStatus
+from .stored_file import StoredFile
+from .incident_upload import IncidentUpload
 
 # Optional: If you need any model-related initialization
 def init_models(app):
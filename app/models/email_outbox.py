@@ -0,0 +1,30 @@
+from enum import Enum
+from app.extensions import db
+
+class EmailStatus(str, Enum):
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+class EmailOutbox(db.Model):
+    """
+    Outgoing email, written during the request and delivered in batches by
+    app.services.email_service.
+    """
+    __tablename__ = 'email_outbox'
+    __table_args__ = (
+        # Ambil email yang siap dikirim berikutnya
+        db.Index('ix_email_outbox_due', 'status', 'next_attempt_at'),
+    )
+
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    recipient = db.Column(db.String(255), nullable=False)
+    sender = db.Column(db.String(255), nullable=True)
+    subject = db.Column(db.String(255), nullable=False)
+    html = db.Column(db.Text, nullable=False)
+    status = db.Column(db.Enum(EmailStatus), nullable=False, default=EmailStatus.PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False)  # WIB
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False)  # WIB
+    sent_at = db.Column(db.DateTime, nullable=True)  # WIB
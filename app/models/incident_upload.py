@@ -0,0 +1,17 @@
+from sqlalchemy.dialects import mysql
+from app.extensions import db
+
+class IncidentUpload(db.Model):
+    """
+    Picture of a new incident waiting for app.services.incident_service.process_incident.
+
+    Saved in the same transaction as the incident, so processing can be run
+    again after a restart (`flask requeue-incidents`); deleted once the picture
+    is in storage.
+    """
+    __tablename__ = 'incident_uploads'
+
+    incident_id = db.Column(db.BigInteger, db.ForeignKey('incidents.id', ondelete='CASCADE'), primary_key=True)
+    image = db.Column(db.Text().with_variant(mysql.LONGTEXT(), 'mysql'), nullable=False)  # Base64 dari klien
+    label = db.Column(db.String(20), nullable=True)  # Label pilihan klien, jika ada
+    created_at = db.Column(db.DateTime, nullable=False)  # WIB
@@ -8,9 +8,9 @@ class LoginLog(db.Model):
     __tablename__ = 'login_logs'
   
     id = db.Column(db.Integer, primary_key=True)
-    token_identifier = db.Column(db.Text, nullable=False)
+    token_identifier = db.Column(db.String(36), nullable=False, unique=True, index=True)  # JTI (UUID)
     destroy_at = db.Column(db.DateTime, nullable=True)
-    created_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, index=True)
 
     def __init__(self, token_identifier: str):
         self.token_identifier = token_identifier
@@ -35,6 +35,41 @@ class LoginLog(db.Model):
             db.session.rollback()
             raise e
 
+    @classmethod
+    def purge(cls, cutoff: datetime, batch_size: int = 1000, max_batches: int = None):
+        """
+        Delete sessions created before `cutoff`, in bounded batches. Logging out
+        already deletes the row, so only expired sessions are left to purge.
+
+        Each batch is its own short transaction so the table is never locked for long,
+        and is read in created_at order so it is a range scan of the created_at index.
+        Returns the number of rows removed.
+        """
+        removed = 0
+        batches = 0
+
+        while max_batches is None or batches < max_batches:
+            ids = [
+                row.id for row in db.session.query(cls.id).filter(
+                    cls.created_at < cutoff
+                ).order_by(cls.created_at, cls.id).limit(batch_size)
+            ]
+            if not ids:
+                break
+
+            try:
+                cls.query.filter(cls.id.in_(ids)).delete(synchronize_session=False)
+                db.session.commit()
+            except Exception as e:
+                current_app.logger.error(f"Error while purging LoginLog: {e}")
+                db.session.rollback()
+                raise e
+
+            removed += len(ids)
+            batches += 1
+
+        return removed
+
     def update(self, fields: dict = {}):
         try:
             for field in fields:
@@ -1,5 +1,6 @@
 from app.extensions import db
 from enum import Enum
+from utils.geo import grid_cell
 
 class Gender(str, Enum):
     MALE = "male"
@@ -16,6 +17,12 @@ class IncidentStatus(str, Enum):
     COMPLETED = 'completed'
     REJECTED = 'rejected'
     
+class IncidentProcessingStatus(str, Enum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    DONE = "done"
+    FAILED = "failed"
+
 class IncidentVehicleStatus(str, Enum):
     ON_ROUTE = "on-route"
     ARRIVED = "arrived"
@@ -23,6 +30,10 @@ class IncidentVehicleStatus(str, Enum):
 
 class Role(db.Model):
     __tablename__ = 'roles'
+    __table_args__ = (
+        # Pencarian nama role (lihat utils.search)
+        db.Index('ft_roles_name', 'name', mysql_prefix='FULLTEXT'),
+    )
     id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
     name = db.Column(db.String(20), nullable=False)
     created_at = db.Column(db.TIMESTAMP, server_default=db.func.now())
@@ -30,6 +41,11 @@ class Role(db.Model):
 
 class User(db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        # Pencarian nama pengguna (lihat utils.search); indeks biasa untuk pencarian awalan kata pendek
+        db.Index('ft_users_name', 'name', mysql_prefix='FULLTEXT'),
+        db.Index('ix_users_name', 'name'),
+    )
     id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
     name = db.Column(db.String(50), nullable=False)
     address = db.Column(db.String(255), nullable=False)
@@ -65,6 +81,10 @@ class User(db.Model):
 
 class UserRole(db.Model):
     __tablename__ = 'user_roles'
+    __table_args__ = (
+        # Daftar pengguna per role (mis. daftar admin)
+        db.Index('ix_user_roles_role_user', 'role_id', 'user_id'),
+    )
     user_id = db.Column(db.BigInteger, db.ForeignKey('users.id'), primary_key=True)
     role_id = db.Column(db.BigInteger, db.ForeignKey('roles.id'), primary_key=True)
 
@@ -96,11 +116,17 @@ class Administration(db.Model):
 
 class Institution(db.Model):
     __tablename__ = 'institutions'
+    __table_args__ = (
+        # Pencarian instansi terdekat per sel grid
+        db.Index('ix_institutions_grid', 'grid_lat', 'grid_lng'),
+    )
     id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
     user_id = db.Column(db.BigInteger, db.ForeignKey('users.id'), nullable=False)
     description = db.Column(db.Text, nullable=False)
     latitude = db.Column(db.Numeric(9, 6), nullable=False)
     longitude = db.Column(db.Numeric(9, 6), nullable=False)
+    grid_lat = db.Column(db.Integer, nullable=True)  # Diisi otomatis dari latitude, lihat utils.geo
+    grid_lng = db.Column(db.Integer, nullable=True)  # Diisi otomatis dari longitude, lihat utils.geo
     created_at = db.Column(db.TIMESTAMP, server_default=db.func.now())
     updated_at = db.Column(db.TIMESTAMP, onupdate=db.func.now())
 
@@ -108,6 +134,13 @@ class Institution(db.Model):
     user = db.relationship('User', back_populates='institution', uselist=False)
     vehicles = db.relationship('Vehicle', back_populates='institution', lazy=True)
 
+# Perbarui sel grid setiap kali koordinat instansi disimpan
+@db.event.listens_for(Institution, 'before_insert')
+@db.event.listens_for(Institution, 'before_update')
+def set_institution_grid_cell(mapper, connection, target):
+    if target.latitude is not None and target.longitude is not None:
+        target.grid_lat, target.grid_lng = grid_cell(target.latitude, target.longitude)
+
 class Driver(db.Model):
     __tablename__ = 'drivers'
     id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
@@ -124,6 +157,10 @@ class Driver(db.Model):
 
 class Vehicle(db.Model):
     __tablename__ = 'vehicles'
+    __table_args__ = (
+        # Hitung kendaraan siap per instansi
+        db.Index('ix_vehicles_institution_ready', 'institution_id', 'is_ready'),
+    )
     id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
     institution_id = db.Column(db.BigInteger, db.ForeignKey('institutions.id'), nullable=False, index=True)
     driver_id = db.Column(db.BigInteger, db.ForeignKey('drivers.id'), nullable=False, index=True)
@@ -142,12 +179,18 @@ class Vehicle(db.Model):
 
 class Incident(db.Model):
     __tablename__ = 'incidents'
+    __table_args__ = (
+        # Keyset pagination daftar insiden per pelapor / instansi dan status
+        db.Index('ix_incidents_resident_status_id', 'resident_id', 'status', 'id'),
+        db.Index('ix_incidents_institution_status_id', 'institution_id', 'status', 'id'),
+    )
     id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
     resident_id = db.Column(db.BigInteger, db.ForeignKey('residents.id'), nullable=False)
     institution_id = db.Column(db.BigInteger, db.ForeignKey('institutions.id'), nullable=False)
     description = db.Column(db.Text)
-    label = db.Column(db.Enum(Label), nullable=False)
+    label = db.Column(db.Enum(Label), nullable=True)  # Kosong selama klasifikasi masih berjalan
     status = db.Column(db.Enum(IncidentStatus), nullable=False, default=IncidentStatus.REPORTED)
+    processing_status = db.Column(db.Enum(IncidentProcessingStatus), nullable=False, default=IncidentProcessingStatus.DONE)
     latitude = db.Column(db.Float)
     longitude = db.Column(db.Float)
     picture = db.Column(db.String(255), nullable=True)
@@ -164,6 +207,9 @@ class Incident(db.Model):
 
 class IncidentVehicle(db.Model):
     __tablename__ = 'incident_vehicles'
+    __table_args__ = (
+        db.Index('ix_incident_vehicles_vehicle_incident', 'vehicle_id', 'incident_id'),
+    )
     id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
     incident_id = db.Column(db.BigInteger, db.ForeignKey('incidents.id'), nullable=False)
     vehicle_id = db.Column(db.BigInteger, db.ForeignKey('vehicles.id'), nullable=False)
@@ -174,4 +220,26 @@ class IncidentVehicle(db.Model):
 
     # Relationships
     incident = db.relationship('Incident', backref='incident_vehicles')
-    vehicle = db.relationship('Vehicle', backref='incident_vehicles')
\ No newline at end of file
+    vehicle = db.relationship('Vehicle', backref='incident_vehicles')
+
+
+class IncidentRollup(db.Model):
+    """
+    Pre-aggregated incident statistics per hour or day, maintained by
+    app.services.rollup_service. Counters use bin 0; duration metrics keep one
+    row per histogram bin so percentiles can be estimated without raw rows.
+    """
+    __tablename__ = 'incident_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('granularity', 'bucket_start', 'institution_id', 'label', 'metric', 'bin', name='uq_incident_rollups_key'),
+        db.Index('ix_incident_rollups_lookup', 'granularity', 'institution_id', 'bucket_start'),
+    )
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    granularity = db.Column(db.String(4), nullable=False)  # 'hour' atau 'day'
+    bucket_start = db.Column(db.DateTime, nullable=False)  # Awal jam/hari dalam WIB
+    institution_id = db.Column(db.BigInteger, db.ForeignKey('institutions.id'), nullable=False)
+    label = db.Column(db.String(10), nullable=False)  # Nilai Label atau 'unknown'
+    metric = db.Column(db.String(20), nullable=False)
+    bin = db.Column(db.Integer, nullable=False, default=0)
+    event_count = db.Column(db.BigInteger, nullable=False, default=0)
+    seconds_sum = db.Column(db.BigInteger, nullable=False, default=0)  # Hanya untuk metrik durasi
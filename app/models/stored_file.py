@@ -0,0 +1,103 @@
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from utils.datetime import get_current_time_in_timezone
+
+class StoredFile(db.Model):
+    """
+    Uploaded file stored once under the SHA-256 digest of its bytes and shared by
+    every row that references its path. utils.storage deletes the file when
+    ref_count drops to zero.
+    """
+    __tablename__ = 'stored_files'
+
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    digest = db.Column(db.String(64), nullable=False, unique=True)  # SHA-256 file yang diunggah
+    path = db.Column(db.String(255), nullable=False, unique=True)
+    content_type = db.Column(db.String(100), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False)  # WIB
+
+    @classmethod
+    def find(cls, digest):
+        return cls.query.filter_by(digest=digest).first()
+
+    @classmethod
+    def acquire(cls, digest, path, content_type, size):
+        """
+        Add a reference to the file with this digest, creating its row at `path` if it is new.
+
+        The row stays locked until the transaction ends, so a concurrent release
+        cannot delete the file in between. Commit together with the row that
+        stores the returned path.
+
+        :return: StoredFile, with ref_count 1 when this is the first reference
+        """
+        row = {
+            'digest': digest,
+            'path': path,
+            'content_type': content_type,
+            'size': size,
+            'ref_count': 1,
+            'created_at': get_current_time_in_timezone('Asia/Jakarta').replace(tzinfo=None),
+        }
+
+        table = cls.__table__
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ('mysql', 'mariadb'):
+            stmt = mysql.insert(table).values(row)
+            stmt = stmt.on_duplicate_key_update(ref_count=table.c.ref_count + 1)
+        elif dialect == 'sqlite':
+            stmt = sqlite.insert(table).values(row)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['digest'],
+                set_={'ref_count': table.c.ref_count + 1}
+            )
+        else:
+            return cls._acquire_generic(row)
+
+        db.session.execute(stmt)
+        return cls.query.filter_by(digest=digest).populate_existing().one()
+
+    @classmethod
+    def _acquire_generic(cls, row):
+        """
+        Fallback for dialects without an upsert: lock the existing row and add a
+        reference, or insert it. A row inserted concurrently is locked and updated instead.
+        """
+        def add_reference():
+            stored = cls.query.filter_by(digest=row['digest']).with_for_update().populate_existing().first()
+            if stored is not None:
+                stored.ref_count += 1
+                db.session.flush()
+            return stored
+
+        stored = add_reference()
+        if stored is not None:
+            return stored
+
+        try:
+            with db.session.begin_nested():
+                stored = cls(**row)
+                db.session.add(stored)
+            return stored
+        except IntegrityError:
+            return add_reference()
+
+    @classmethod
+    def release(cls, path):
+        """
+        Drop one reference to the file at `path`, deleting the row at zero.
+
+        :return: Remaining references, or None when the file is not tracked (uploaded before deduplication)
+        """
+        stored = cls.query.filter_by(path=path).with_for_update().first()
+        if stored is None:
+            return None
+
+        stored.ref_count -= 1
+        if stored.ref_count <= 0:
+            db.session.delete(stored)
+            return 0
+        return stored.ref_count
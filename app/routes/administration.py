@@ -1,13 +1,15 @@
 import os
-from app.extensions import db, mail
+from app.extensions import db
 from marshmallow import ValidationError
 from flask import Blueprint, request, jsonify, render_template
 from werkzeug.security import generate_password_hash
 from flask_jwt_extended import create_access_token
 from itsdangerous import URLSafeTimedSerializer
-from flask_mail import Message
+from app.services.email_service import queue_email
 
 from utils import auth
+from utils.pagination import paginate
+from utils.search import search
 from app.models.models import User, Role, UserRole, Administration
 
 # schemas
@@ -32,12 +34,11 @@ def get_all_drivers():
         User.name
      ).join(UserRole).join(Role).filter(Role.name == 'administration')
 
-     # Terapkan filter
+     # Terapkan pencarian berperingkat, atau halaman biasa jika tanpa pencarian
     if search_name:
-        query = query.filter(User.name.ilike(f'%{search_name}%'))  # Filter berdasarkan nama administration
-
-    # Jalankan kueri
-    administrations = query.all()
+        administrations, next_cursor = search(query, User.name, search_name)
+    else:
+        administrations, next_cursor = paginate(query, User.id, key='user_id')
 
     # Siapkan data
     admin_data = [
@@ -54,7 +55,8 @@ def get_all_drivers():
     return jsonify(
         status=True,
         message='Data berhasil dimuat.',
-        data=admin_data
+        data=admin_data,
+        next_cursor=next_cursor
     ), 200
 # Akhir Ambil Data 
 
@@ -246,13 +248,13 @@ def delete_admistration(administration_id):
 # Kirim Email Verifikasi
 def send_email_verify(user) :
     token = generate_verify_token(user.email)
-    msg = Message(
+    # Simpan ke outbox, dikirim per batch di latar belakang
+    queue_email(
         subject="Verify Email Address",
         recipients=[user.email],
         sender=os.getenv('MAIL_USERNAME'),
         html=render_template('verify_email.html', token=token, name=user.name)
     )
-    mail.send(msg)
 # Akhir Kirim Email Verifikasi
 
 # Hasilkan Verifikasi Token
@@ -9,9 +9,10 @@ from itsdangerous import URLSafeTimedSerializer
 from sqlalchemy.orm.exc import NoResultFound, MultipleResultsFound
 from utils.datetime import get_current_time_in_timezone
 from utils import auth
+from utils.token_session import token_sessions
 
-from app.extensions import db, mail
-from flask_mail import Message
+from app.extensions import db
+from app.services.email_service import queue_email
 from app.models.models import Role, User, Resident, Institution, UserRole
 from app.models.login_log import LoginLog
 from app.models.reset_password import ResetPassword
@@ -119,13 +120,13 @@ def register():
 # Kirim Email Verifikasi
 def send_email_verify(user) :
     token = generate_verify_token(user.email)
-    msg = Message(
+    # Simpan ke outbox, dikirim per batch di latar belakang
+    queue_email(
         subject="Verify Email Address",
         recipients=[user.email],
         sender=os.getenv('MAIL_USERNAME'),
         html=render_template('verify_email.html', token=token, name=user.name)
     )
-    mail.send(msg)
 # Akhir Kirim Email Verifikasi
 
 # Kirim Email Lupa Kata Sandi
@@ -136,7 +137,8 @@ def send_forgot_password(user, reset_token):
     # URL fallback ke web jika aplikasi tidak terinstal
     # web_link = f"https://instahelp.com/reset-password?token={reset_token}"
 
-    msg = Message(
+    # Simpan ke outbox, dikirim per batch di latar belakang
+    queue_email(
         subject="Forgot Password",
         recipients=[user.email],
         sender=os.getenv('MAIL_USERNAME'),
@@ -147,7 +149,6 @@ def send_forgot_password(user, reset_token):
             # web_link=web_link
         )
     )
-    mail.send(msg)
 # Akhir Kirim Email Lupa Kata Sandi
 
 # Verifikasi Email
@@ -211,6 +212,7 @@ def login():
         jti = get_jti(access_token)
         try:
             login_log = LoginLog(jti)
+            token_sessions.mark_active(jti)
         except Exception as e:
             return jsonify(
                 status=False,
@@ -288,6 +290,7 @@ def logout():
 
         # Hapus log / tandai logout
         log.destroy()  # Pastikan `destroy` method menangani logika delete dengan benar.
+        token_sessions.invalidate(token_identifier)
 
         return jsonify(
             status=True,
@@ -0,0 +1,118 @@
+import time
+import threading
+from flask_jwt_extended import get_jwt_identity
+from flask import Blueprint, Response, jsonify, current_app, stream_with_context
+from app.extensions import db, events
+from utils import auth
+from utils.events import institution_channel, driver_channel
+from app.models.models import Institution, Driver
+
+event_route = Blueprint('events', __name__)
+
+# Jumlah stream yang sedang terbuka di proses worker ini
+_open_streams = 0
+_open_streams_lock = threading.Lock()
+
+def _acquire_stream():
+    global _open_streams
+    with _open_streams_lock:
+        if _open_streams >= current_app.config.get('EVENT_STREAM_MAX_CONNECTIONS', 4):
+            return False
+        _open_streams += 1
+        return True
+
+def _release_stream():
+    global _open_streams
+    with _open_streams_lock:
+        _open_streams -= 1
+
+def event_stream(channel):
+    """
+    Server-Sent Events response for one channel.
+
+    The stream sends a heartbeat comment every EVENT_STREAM_HEARTBEAT_SECONDS so
+    proxies keep the connection open, and ends after EVENT_STREAM_MAX_SECONDS;
+    EventSource reconnects on its own after the `retry` delay.
+    """
+    if not _acquire_stream():
+        return jsonify(
+            status=False,
+            message='Terlalu banyak koneksi real-time, coba lagi nanti.'
+        ), 503
+
+    heartbeat = current_app.config.get('EVENT_STREAM_HEARTBEAT_SECONDS', 15)
+    max_seconds = current_app.config.get('EVENT_STREAM_MAX_SECONDS', 240)
+
+    # Kembalikan koneksi database ke pool, stream tidak membutuhkannya
+    db.session.close()
+
+    subscription = events.subscribe([channel])
+
+    closed = threading.Event()
+
+    def close():
+        if not closed.is_set():
+            closed.set()
+            subscription.close()
+            _release_stream()
+
+    def generate():
+        try:
+            yield 'retry: 3000\n\n'
+            deadline = time.monotonic() + max_seconds
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                message = subscription.get(timeout=min(heartbeat, remaining))
+                if message is None:
+                    yield ': heartbeat\n\n'
+                    continue
+                event_type, data = message
+                yield f'event: {event_type}\ndata: {data}\n\n'
+        finally:
+            close()
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',  # Matikan buffering proxy
+        }
+    )
+    # Dipanggil juga saat klien terputus sebelum stream dimulai
+    response.call_on_close(close)
+    return response
+
+# Stream Event Instansi
+@event_route.route('/institutions', methods=['GET'])
+@auth.login_required
+def institution_events():
+    # Ambil instansi berdasarkan data login
+    user_id = get_jwt_identity()
+    institution_id = Institution.query.filter_by(user_id=user_id).with_entities(Institution.id).scalar()
+    if institution_id is None:
+        return jsonify(
+            status=False,
+            message='Instansi tidak ditemukan.'
+        ), 404
+
+    return event_stream(institution_channel(institution_id))
+# Akhir Stream Event Instansi
+
+# Stream Event Driver
+@event_route.route('/drivers', methods=['GET'])
+@auth.login_required
+def driver_events():
+    # Ambil driver berdasarkan data login
+    user_id = get_jwt_identity()
+    driver_id = Driver.query.filter_by(user_id=user_id).with_entities(Driver.id).scalar()
+    if driver_id is None:
+        return jsonify(
+            status=False,
+            message='Driver tidak ditemukan.'
+        ), 404
+
+    return event_stream(driver_channel(driver_id))
+# Akhir Stream Event Driver
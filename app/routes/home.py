@@ -1,4 +1,7 @@
 from flask import jsonify, Blueprint
+from utils import auth
+from utils.text_classification import get_classifier_stats, get_classifier_load_report, get_classifier_cache_stats
+from utils.storage import storage_manager
 
 home_route = Blueprint('home', __name__)
 @home_route.route('/', methods=['GET'])
@@ -6,4 +9,28 @@ def home() :
   return jsonify(
     status=True,
     message="Welcome to InstHelp backend service!"
-  )
\ No newline at end of file
+  )
+
+@home_route.route('/metrics/classifier', methods=['GET'])
+@auth.login_required
+def classifier_metrics() :
+  return jsonify(
+    status=True,
+    message="Classifier metrics loaded successfully.",
+    data={
+      "batching": get_classifier_stats(),
+      "startup": get_classifier_load_report(),
+      "cache": get_classifier_cache_stats()
+    }
+  )
+
+@home_route.route('/metrics/storage', methods=['GET'])
+@auth.login_required
+def storage_metrics() :
+  return jsonify(
+    status=True,
+    message="Storage metrics loaded successfully.",
+    data={
+      "cache": storage_manager.cacheStats()
+    }
+  )
@@ -0,0 +1,58 @@
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from flask_jwt_extended import get_jwt_identity
+
+from utils import auth
+from utils.datetime import get_current_time_in_timezone, parse_date_param
+from app.services.export_service import iter_incident_export, to_ndjson, to_csv
+from app.models.models import Institution
+
+incident_export_route = Blueprint('incidents/export', __name__)
+
+# Format ekspor yang didukung
+EXPORT_FORMATS = {
+    'ndjson': (to_ndjson, 'application/x-ndjson'),
+    'csv': (to_csv, 'text/csv'),
+}
+
+# Ekspor Insiden
+@incident_export_route.route('/', methods=['GET'])
+@auth.login_required
+def export_incidents():
+    # Hanya instansi yang boleh mengekspor, dan hanya insiden miliknya sendiri
+    user_id = get_jwt_identity()
+    institution_id = Institution.query.filter_by(user_id=user_id).with_entities(Institution.id).scalar()
+    if institution_id is None:
+        return jsonify(
+            status=False,
+            message='Hanya instansi yang dapat mengekspor insiden.'
+        ), 403
+
+    # Validasi format ekspor
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify(
+            status=False,
+            message='Format harus ndjson atau csv.'
+        ), 400
+
+    # Validasi rentang tanggal
+    try:
+        date_from = parse_date_param(request.args.get('from'))
+        date_to = parse_date_param(request.args.get('to'), end=True)
+    except ValueError:
+        return jsonify(
+            status=False,
+            message='Tanggal harus berformat YYYY-MM-DD atau ISO 8601.'
+        ), 400
+
+    encode, mimetype = EXPORT_FORMATS[export_format]
+    rows = iter_incident_export(date_from=date_from, date_to=date_to, institution_id=institution_id)
+    filename = f"incidents-{get_current_time_in_timezone('Asia/Jakarta'):%Y%m%d-%H%M%S}.{export_format}"
+
+    # Kirim baris sedikit demi sedikit tanpa memuat semuanya ke memori
+    return Response(
+        stream_with_context(encode(rows)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+# Akhir Ekspor Insiden
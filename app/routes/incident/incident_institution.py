@@ -2,8 +2,15 @@ from flask_jwt_extended import get_jwt_identity
 from app.extensions import db
 from marshmallow import ValidationError
 from flask import Blueprint, request, jsonify
+from sqlalchemy import insert, update
 from utils.datetime import get_current_time_in_timezone
 from utils import auth
+from utils.pagination import paginate
+from utils.URL import ThumbnailURLs
+from app.services.incident_service import load_incident_detail, serialize_incident_detail
+from app.services.dispatch_service import recommend_vehicles
+from app.services.rollup_service import record_incident_handled, record_incident_completed
+from app.services.event_service import publish_incident_event
 from app.models.models import Incident, IncidentStatus, Institution, IncidentVehicle, IncidentVehicleStatus, Vehicle
 
 from app.schemas.incident.handle_schema import HandleIncidentSchema
@@ -22,7 +29,7 @@ def get_incident_institution():
     status = request.args.get('status', None)
     
     # Bangun kueri
-    incidents = db.session.query(
+    query = db.session.query(
         Incident.id.label('incident_id'),
         Incident.description,
         Incident.reported_at,
@@ -32,7 +39,10 @@ def get_incident_institution():
         Incident.status == status
     ).filter_by(
         institution_id = institution_id
-    ).all()  # Gunakan alias di sini
+    )
+
+    # Jalankan kueri per halaman (terbaru lebih dulu)
+    incidents, next_cursor = paginate(query, Incident.id, key='incident_id', descending=True)
 
     # Siapkan datanya
     incident_data = [
@@ -41,6 +51,7 @@ def get_incident_institution():
             "description": incident.description,
             "reported_at": incident.reported_at.strftime('%H:%M'),  # Format jam dan menit
             "picture": incident.picture,
+            "thumbnails": ThumbnailURLs(incident.picture),
             "status": incident.status,
         }
         for incident in incidents
@@ -49,7 +60,8 @@ def get_incident_institution():
     return jsonify(
         status=True,
         message='Insiden berhasil dimuat.',
-        data=incident_data
+        data=incident_data,
+        next_cursor=next_cursor
     ), 200
 # Akhir Ambil Data
 
@@ -60,10 +72,8 @@ def get_incident_institution_by_id(incident_id):
     # Ambil parameter query status (ditolak, dilaporkan, ditangani, selesai)
     status = request.args.get('status', None)
     
-    # Query untuk mendapatkan data incident berdasarkan ID
-    incident = db.session.query(Incident).filter_by(id=incident_id).filter(
-        Incident.status == status
-    ).first()
+    # Query untuk mendapatkan data incident beserta relasinya dalam satu kueri
+    incident = load_incident_detail(incident_id, status)
 
     # Jika data tidak ditemukan
     if not incident:
@@ -73,125 +83,8 @@ def get_incident_institution_by_id(incident_id):
         ), 404
 
     # Menyiapkan data untuk respons
-    if incident.status == IncidentStatus.REPORTED:
-        incident_data = {
-            "id": incident.id,
-            "status": incident.status,
-            "description": incident.description,
-            "reported_at": incident.reported_at,
-            "location": {
-                "latitude": incident.latitude,
-                "longitude": incident.longitude
-            },
-            "picture": incident.picture,
-            "status": incident.status,
-            "resident": {
-                "id": incident.resident.id,
-                "user": {
-                    "id": incident.resident.user.id,  # Akses User dari Resident
-                    "name": incident.resident.user.name,  # Akses User's name
-                    "avatar": incident.resident.user.avatar  # Akses User's address
-                }
-            },
-            "institution": {
-                "id": incident.institution.id,
-                "user": {
-                    "name": incident.institution.user.name,  # Akses User's name di Institution
-                    "address": incident.institution.user.address,  # Akses User's address di Institution
-                    "avatar": incident.institution.user.avatar,  # Akses User's avatar di Institution
-                },
-            }
-        }
-    elif incident.status == IncidentStatus.HANDLED:
-        incident_data = {
-            "id": incident.id,
-            "status": incident.status,
-            "description": incident.description,
-            "reported_at": incident.reported_at,
-            "location": {
-                "latitude": incident.latitude,
-                "longitude": incident.longitude
-            },
-            "picture": incident.picture,
-            "status": incident.status,
-            "resident": {
-                "id": incident.resident.id,
-                "user": {
-                    "id": incident.resident.user.id,  # Akses User dari Resident
-                    "name": incident.resident.user.name,  # Akses User's name
-                    "avatar": incident.resident.user.avatar  # Akses User's address
-                }
-            },
-            "institution": {
-                "id": incident.institution.id,
-                "user": {
-                    "name": incident.institution.user.name,  # Akses User's name di Institution
-                    "address": incident.institution.user.address,  # Akses User's address di Institution
-                    "avatar": incident.institution.user.avatar,  # Akses User's avatar di Institution
-                },
-            }
-        }
-    elif incident.status == IncidentStatus.COMPLETED:
-        incident_data = {
-            "id": incident.id,
-            "status": incident.status,
-            "description": incident.description,
-            "reported_at": incident.reported_at,
-            "location": {
-                "latitude": incident.latitude,
-                "longitude": incident.longitude
-            },
-            "picture": incident.picture,
-            "status": incident.status,
-            "resident": {
-                "id": incident.resident.id,
-                "user": {
-                    "id": incident.resident.user.id,  # Akses User dari Resident
-                    "name": incident.resident.user.name,  # Akses User's name
-                    "avatar": incident.resident.user.avatar  # Akses User's address
-                }
-            },
-            "institution": {
-                "id": incident.institution.id,
-                "user": {
-                    "name": incident.institution.user.name,  # Akses User's name di Institution
-                    "address": incident.institution.user.address,  # Akses User's address di Institution
-                    "avatar": incident.institution.user.avatar,  # Akses User's avatar di Institution
-                },
-            }
-        }
-    elif incident.status == IncidentStatus.REJECTED:
-        incident_data = {
-            "id": incident.id,
-            "status": incident.status,
-            "description": incident.description,
-            "reported_at": incident.reported_at,
-            "location": {
-                "latitude": incident.latitude,
-                "longitude": incident.longitude
-            },
-            "picture": incident.picture,
-            "status": incident.status,
-            "resident": {
-                "id": incident.resident.id,
-                "user": {
-                    "id": incident.resident.user.id,  # Akses User dari Resident
-                    "name": incident.resident.user.name,  # Akses User's name
-                    "avatar": incident.resident.user.avatar  # Akses User's address
-                }
-            },
-            "institution": {
-                "id": incident.institution.id,
-                "user": {
-                    "name": incident.institution.user.name,  # Akses User's name di Institution
-                    "address": incident.institution.user.address,  # Akses User's address di Institution
-                    "avatar": incident.institution.user.avatar,  # Akses User's avatar di Institution
-                },
-            }
-        }
-    else:
-        return jsonify(status=False, message='Status Insiden tidak valid'), 400
-        
+    incident_data = serialize_incident_detail(incident)
+
     # Mengembalikan respons
     return jsonify(
         status=True,
@@ -200,6 +93,37 @@ def get_incident_institution_by_id(incident_id):
     ), 200
 # Akhir Ambil Data berdasarkan ID
 
+# Rekomendasi Kendaraan
+@incident_institution_route.route('/<int:incident_id>/recommendation', methods=['GET'])
+@auth.login_required
+def get_vehicle_recommendation(incident_id):
+    incident = Incident.query.filter_by(id=incident_id).first()
+    if not incident:
+        return jsonify({
+            'status': False,
+            'message': 'Insiden tidak ditemukan.'
+        }), 404
+
+    # Jumlah kendaraan (opsional) dan cakupan instansi sekitar
+    count = request.args.get('count', None, type=int)
+    nearby = request.args.get('nearby', '').lower() in ('1', 'true', 'yes')
+    if count is not None and count < 1:
+        return jsonify({
+            'status': False,
+            'message': 'Jumlah kendaraan minimal 1.'
+        }), 400
+
+    return jsonify(
+        status=True,
+        message='Rekomendasi kendaraan berhasil dimuat.',
+        data={
+            'incident_id': incident.id,
+            'label': incident.label,
+            'vehicles': recommend_vehicles(incident, count=count, nearby=nearby)
+        }
+    ), 200
+# Akhir Rekomendasi Kendaraan
+
 # Tangani Insiden
 @incident_institution_route.route('/<int:incident_id>/handle', methods=['PUT'])
 @auth.login_required
@@ -208,61 +132,111 @@ def handle_incident(incident_id):
         # Buat skema dengan data kendaraan saat ini
         schema = HandleIncidentSchema(db_session=db.session, incident_id=incident_id)
 
-        # Validasi permintaan data
-        try:
-            data = schema.load(request.json)
-        except ValidationError as err:
-            return jsonify({
-                'status': False,
-                'message': 'Validasi data gagal',
-                'errors': err.messages
-            }), 400
-
-        # Get incident 
-        incident = Incident.query.filter_by(id=incident_id).first()
+        # Get incident, skema sudah memuatnya sehingga nilai terkunci harus dibaca ulang
+        incident = Incident.query.filter_by(id=incident_id).with_for_update().populate_existing().first()
         if not incident:
             return jsonify({
                 'status': False,
                 'message': 'Insiden tidak ditemukan.'
             }), 404
-            
-        db.session.begin_nested()
 
-        # Perbarui status incident
-        incident.status = IncidentStatus.HANDLED 
-        incident.handle_at = get_current_time_in_timezone('Asia/Jakarta')
+        # Hanya insiden yang baru dilaporkan yang bisa ditangani (bukan ditolak, ditangani, atau selesai)
+        if incident.status != IncidentStatus.REPORTED:
+            db.session.rollback()
+            return jsonify({
+                'status': False,
+                'message': 'Insiden sudah ditangani atau tidak dapat ditangani.'
+            }), 409
 
-        incident_vehicles_list = []  # Menyimpan kendaraan untuk respon
+        body = request.get_json(silent=True) or {}
+        auto = request.args.get('auto', '').lower() in ('1', 'true', 'yes') or body.get('auto') is True
 
-        # Proses kendaraan yang terpilih
-        for incident_vehicle_data in data['vehicles']:
-            vehicle = Vehicle.query.filter_by(id=incident_vehicle_data['vehicle_id']).first()
-            
-            if not vehicle:
+        if auto:
+            # Pilih kendaraan secara otomatis dengan mesin rekomendasi
+            recommendation = recommend_vehicles(incident)
+            if not recommendation:
+                db.session.rollback()
+                return jsonify({
+                    'status': False,
+                    'message': 'Tidak ada kendaraan siap untuk ditugaskan.'
+                }), 409
+            data = {'vehicles': [{'vehicle_id': vehicle['vehicle_id']} for vehicle in recommendation]}
+        else:
+            # Validasi permintaan data
+            try:
+                data = schema.load(body)
+            except ValidationError as err:
+                db.session.rollback()
                 return jsonify({
                     'status': False,
-                    'message': f"Kendaraan dengan ID {incident_vehicle_data['vehicle_id']} tidak ditemukan."
+                    'message': 'Validasi data gagal',
+                    'errors': err.messages
+                }), 400
+
+        # Kendaraan unik sesuai urutan permintaan
+        vehicle_ids = list(dict.fromkeys(vehicle_data['vehicle_id'] for vehicle_data in data['vehicles']))
+        if not vehicle_ids:
+            db.session.rollback()
+            return jsonify({
+                'status': False,
+                'message': 'Kendaraan tidak boleh kosong.'
+            }), 400
+
+        # Kunci semua baris kendaraan sekaligus agar tidak dikirim dua operator bersamaan
+        vehicles = {
+            vehicle.id: vehicle
+            for vehicle in db.session.query(Vehicle.id, Vehicle.is_ready, Vehicle.driver_id)
+                .filter(Vehicle.id.in_(vehicle_ids))
+                .with_for_update()
+                .all()
+        }
+
+        for vehicle_id in vehicle_ids:
+            if vehicle_id not in vehicles:
+                db.session.rollback()
+                return jsonify({
+                    'status': False,
+                    'message': f"Kendaraan dengan ID {vehicle_id} tidak ditemukan."
                 }), 404
-            
-            # Ubah status kendaraan menjadi tidak siap (false)
-            vehicle.is_ready = False
-
-            new_incident_vehicle = IncidentVehicle(
-                incident_id=incident.id,
-                vehicle_id=vehicle.id,
-                status=IncidentVehicleStatus.ON_ROUTE,
-                assigned_at=get_current_time_in_timezone('Asia/Jakarta')
-            )
-
-            # Tambahkan kendaraan baru ke tabel incident_vehicles
-            db.session.add(new_incident_vehicle)
-            db.session.add(vehicle)
-
-            incident_vehicles_list.append({
-                'vehicle_id': vehicle.id,
-                'status': 'ON_ROUTE',
-                'assigned_at': new_incident_vehicle.assigned_at
-            })
+
+            if not vehicles[vehicle_id].is_ready:
+                db.session.rollback()
+                return jsonify({
+                    'status': False,
+                    'message': f"Kendaraan dengan ID {vehicle_id} sedang tidak siap."
+                }), 409
+
+        # Perbarui status incident
+        incident.status = IncidentStatus.HANDLED 
+        incident.handle_at = get_current_time_in_timezone('Asia/Jakarta')
+        assigned_at = incident.handle_at
+
+        # Tambahkan semua kendaraan ke tabel incident_vehicles dalam satu INSERT
+        db.session.execute(insert(IncidentVehicle), [
+            {
+                'incident_id': incident.id,
+                'vehicle_id': vehicle_id,
+                'status': IncidentVehicleStatus.ON_ROUTE,
+                'assigned_at': assigned_at
+            }
+            for vehicle_id in vehicle_ids
+        ])
+
+        # Ubah status semua kendaraan menjadi tidak siap (false) dalam satu UPDATE
+        db.session.execute(
+            update(Vehicle).where(Vehicle.id.in_(vehicle_ids)).values(is_ready=False)
+        )
+
+        # Perbarui statistik insiden dalam transaksi yang sama
+        record_incident_handled(incident)
+
+        # Beritahu instansi dan driver kendaraan yang ditugaskan setelah commit
+        publish_incident_event(
+            'incident.handled', incident,
+            driver_ids=[vehicles[vehicle_id].driver_id for vehicle_id in vehicle_ids],
+            handle_at=incident.handle_at,
+            vehicle_ids=vehicle_ids
+        )
 
         db.session.commit()
 
@@ -277,12 +251,19 @@ def handle_incident(incident_id):
                 },
                 'vehicles': [
                     {
-                        'vehicle_id': vehicle_data['vehicle_id'],
+                        'vehicle_id': vehicle_id,
                         'is_ready': False  # Menunjukkan kendaraan sedang tidak siap
                     }
-                    for vehicle_data in data['vehicles']
+                    for vehicle_id in vehicle_ids
+                ],
+                'incident_vehicles': [
+                    {
+                        'vehicle_id': vehicle_id,
+                        'status': 'ON_ROUTE',
+                        'assigned_at': assigned_at
+                    }
+                    for vehicle_id in vehicle_ids
                 ],
-                'incident_vehicles': incident_vehicles_list,
             }
         }), 200
 
@@ -299,13 +280,21 @@ def handle_incident(incident_id):
 @auth.login_required
 def complete_incident(incident_id):
     try:
-        # Get incident 
-        incident = Incident.query.filter_by(id=incident_id).first()
+        # Get incident, dikunci agar dua permintaan tidak menyelesaikannya bersamaan
+        incident = Incident.query.filter_by(id=incident_id).with_for_update().first()
         if not incident:
             return jsonify({
                 'status': False,
                 'message': 'Insiden tidak ditemukan.'
             }), 404
+
+        # Statistik hanya dihitung sekali, saat status benar-benar berubah
+        if incident.status == IncidentStatus.COMPLETED:
+            db.session.rollback()
+            return jsonify({
+                'status': False,
+                'message': 'Insiden sudah selesai.'
+            }), 409
         
         # Ambil semua kendaraan yang terkait dengan incident dan pastikan semua sudah selesai
         incident_vehicles = IncidentVehicle.query.filter_by(incident_id=incident_id).all()
@@ -324,6 +313,16 @@ def complete_incident(incident_id):
         for ivd in incident_vehicles:
             ivd.vehicle.is_ready = True  # Status kendaraan kembali ke "available" atau "ready"
 
+        # Perbarui statistik insiden dalam transaksi yang sama
+        record_incident_completed(incident)
+
+        # Beritahu instansi dan driver yang terlibat setelah commit
+        publish_incident_event(
+            'incident.completed', incident,
+            driver_ids=[ivd.vehicle.driver_id for ivd in incident_vehicles],
+            completed_at=incident.completed_at
+        )
+
         db.session.commit()
 
         return jsonify({
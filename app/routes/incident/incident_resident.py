@@ -3,7 +3,10 @@ from app.extensions import db
 from flask import Blueprint, request, jsonify
 
 from utils import auth
-from app.models.models import Incident, IncidentStatus, Resident
+from utils.pagination import paginate
+from utils.URL import ThumbnailURLs
+from app.services.incident_service import load_incident_detail, serialize_incident_detail
+from app.models.models import Incident, Resident
 
 incident_resident_route = Blueprint('incidents/residents', __name__)
 
@@ -19,7 +22,7 @@ def get_incident_resident():
     status = request.args.get('status', None)
     
     # Bangun kueri
-    incidents = db.session.query(
+    query = db.session.query(
         Incident.id.label('incident_id'),
         Incident.description,
         Incident.reported_at,
@@ -29,7 +32,10 @@ def get_incident_resident():
         Incident.status == status
     ).filter_by(
         resident_id = resident_id
-    ).all()  # Gunakan alias di sini
+    )
+
+    # Jalankan kueri per halaman (terbaru lebih dulu)
+    incidents, next_cursor = paginate(query, Incident.id, key='incident_id', descending=True)
 
     # Siapkan datanya
     incident_data = [
@@ -38,6 +44,7 @@ def get_incident_resident():
             "description": incident.description,
             "reported_at": incident.reported_at.strftime('%H:%M'),  # Format jam dan menit
             "picture": incident.picture,
+            "thumbnails": ThumbnailURLs(incident.picture),
             "status": incident.status,
         }
         for incident in incidents
@@ -46,7 +53,8 @@ def get_incident_resident():
     return jsonify(
         status=True,
         message='Laporan Kejadian Darurat berhasil dimuat.',
-        data=incident_data
+        data=incident_data,
+        next_cursor=next_cursor
     ), 200
 # Akhir Ambil Data
 
@@ -57,10 +65,8 @@ def get_incident_resident_by_id(incident_id):
     # Ambil parameter query status (ditolak, dilaporkan, ditangani, selesai)
     status = request.args.get('status', None)
     
-    # Query untuk mendapatkan data incident berdasarkan ID
-    incident = db.session.query(Incident).filter_by(id=incident_id).filter(
-        Incident.status == status
-    ).first()
+    # Query untuk mendapatkan data incident beserta relasinya dalam satu kueri
+    incident = load_incident_detail(incident_id, status)
 
     # Jika data tidak ditemukan
     if not incident:
@@ -70,129 +76,50 @@ def get_incident_resident_by_id(incident_id):
         ), 404
 
     # Menyiapkan data untuk respons
-    if incident.status == IncidentStatus.REPORTED:
-        incident_data = {
-            "id": incident.id,
-            "status": incident.status,
-            "description": incident.description,
-            "reported_at": incident.reported_at,
-            "location": {
-                "latitude": incident.latitude,
-                "longitude": incident.longitude
-            },
-            "picture": incident.picture,
-            "status": incident.status,
-            "resident": {
-                "id": incident.resident.id,
-                "user": {
-                    "id": incident.resident.user.id,  # Akses User dari Resident
-                    "name": incident.resident.user.name,  # Akses User's name
-                    "avatar": incident.resident.user.avatar  # Akses User's address
-                }
-            },
-            "institution": {
-                "id": incident.institution.id,
-                "user": {
-                    "name": incident.institution.user.name,  # Akses User's name di Institution
-                    "address": incident.institution.user.address,  # Akses User's address di Institution
-                    "avatar": incident.institution.user.avatar,  # Akses User's avatar di Institution
-                },
-            }
-        }
-    elif incident.status == IncidentStatus.HANDLED:
-        incident_data = {
-            "id": incident.id,
-            "status": incident.status,
-            "description": incident.description,
-            "reported_at": incident.reported_at,
-            "location": {
-                "latitude": incident.latitude,
-                "longitude": incident.longitude
-            },
-            "picture": incident.picture,
-            "status": incident.status,
-            "resident": {
-                "id": incident.resident.id,
-                "user": {
-                    "id": incident.resident.user.id,  # Akses User dari Resident
-                    "name": incident.resident.user.name,  # Akses User's name
-                    "avatar": incident.resident.user.avatar  # Akses User's address
-                }
-            },
-            "institution": {
-                "id": incident.institution.id,
-                "user": {
-                    "name": incident.institution.user.name,  # Akses User's name di Institution
-                    "address": incident.institution.user.address,  # Akses User's address di Institution
-                    "avatar": incident.institution.user.avatar,  # Akses User's avatar di Institution
-                },
-            }
-        }
-    elif incident.status == IncidentStatus.COMPLETED:
-        incident_data = {
-            "id": incident.id,
-            "status": incident.status,
-            "description": incident.description,
-            "reported_at": incident.reported_at,
-            "location": {
-                "latitude": incident.latitude,
-                "longitude": incident.longitude
-            },
-            "picture": incident.picture,
-            "status": incident.status,
-            "resident": {
-                "id": incident.resident.id,
-                "user": {
-                    "id": incident.resident.user.id,  # Akses User dari Resident
-                    "name": incident.resident.user.name,  # Akses User's name
-                    "avatar": incident.resident.user.avatar  # Akses User's address
-                }
-            },
-            "institution": {
-                "id": incident.institution.id,
-                "user": {
-                    "name": incident.institution.user.name,  # Akses User's name di Institution
-                    "address": incident.institution.user.address,  # Akses User's address di Institution
-                    "avatar": incident.institution.user.avatar,  # Akses User's avatar di Institution
-                },
-            }
-        }
-    elif incident.status == IncidentStatus.REJECTED:
-        incident_data = {
-            "id": incident.id,
-            "status": incident.status,
-            "description": incident.description,
-            "reported_at": incident.reported_at,
-            "location": {
-                "latitude": incident.latitude,
-                "longitude": incident.longitude
-            },
-            "picture": incident.picture,
-            "status": incident.status,
-            "resident": {
-                "id": incident.resident.id,
-                "user": {
-                    "id": incident.resident.user.id,  # Akses User dari Resident
-                    "name": incident.resident.user.name,  # Akses User's name
-                    "avatar": incident.resident.user.avatar  # Akses User's address
-                }
-            },
-            "institution": {
-                "id": incident.institution.id,
-                "user": {
-                    "name": incident.institution.user.name,  # Akses User's name di Institution
-                    "address": incident.institution.user.address,  # Akses User's address di Institution
-                    "avatar": incident.institution.user.avatar,  # Akses User's avatar di Institution
-                },
-            }
-        }
-    else:
-        return jsonify(status=False, message='Status Laporan tidak valid'), 400
-        
+    incident_data = serialize_incident_detail(incident)
+
     # Mengembalikan respons
     return jsonify(
         status=True,
         message='Data berhasil dimuat.',
         data=incident_data
     ), 200
-# Akhir Ambil Data berdasarkan ID
\ No newline at end of file
+# Akhir Ambil Data berdasarkan ID
+
+# Status Pemrosesan Laporan
+@incident_resident_route.route('/<int:incident_id>/processing', methods=['GET'])
+@auth.login_required
+def get_incident_processing_status(incident_id):
+    # Ambil user berdasarkan data login
+    user_id = get_jwt_identity()
+    resident_id = Resident.query.filter_by(user_id = user_id).with_entities(Resident.id).scalar()
+
+    # Hanya pelapor yang dapat melihat status laporannya
+    incident = db.session.query(
+        Incident.id,
+        Incident.processing_status,
+        Incident.label,
+        Incident.picture
+    ).filter_by(
+        id=incident_id,
+        resident_id=resident_id
+    ).first()
+
+    if not incident:
+        return jsonify(
+            status=False,
+            message='Laporan tidak ditemukan.',
+        ), 404
+
+    return jsonify(
+        status=True,
+        message='Status laporan berhasil dimuat.',
+        data={
+            "id": incident.id,
+            "processing_status": incident.processing_status,
+            "label": incident.label,
+            "picture": incident.picture,
+            "thumbnails": ThumbnailURLs(incident.picture),
+        }
+    ), 200
+# Akhir Status Pemrosesan Laporan
\ No newline at end of file
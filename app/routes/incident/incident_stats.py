@@ -0,0 +1,70 @@
+from datetime import timedelta
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import get_jwt_identity
+
+from utils import auth
+from utils.datetime import get_current_time_in_timezone, parse_date_param
+from app.services.rollup_service import GRANULARITIES, bucket_start, get_incident_stats
+from app.models.models import Institution
+
+incident_stats_route = Blueprint('incidents/stats', __name__)
+
+# Batas jumlah bucket per permintaan (31 hari per jam)
+MAX_BUCKETS = 744
+
+# Statistik Insiden
+@incident_stats_route.route('/', methods=['GET'])
+@auth.login_required
+def get_stats():
+    # Hanya instansi yang boleh melihat statistik, dan hanya statistik miliknya sendiri
+    user_id = get_jwt_identity()
+    institution_id = Institution.query.filter_by(user_id=user_id).with_entities(Institution.id).scalar()
+    if institution_id is None:
+        return jsonify(
+            status=False,
+            message='Hanya instansi yang dapat melihat statistik insiden.'
+        ), 403
+
+    # Validasi granularitas
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        return jsonify(
+            status=False,
+            message='Granularity harus hour atau day.'
+        ), 400
+
+    # Validasi rentang tanggal (default 7 hari terakhir atau 24 jam terakhir)
+    try:
+        start = parse_date_param(request.args.get('from'))
+        end = parse_date_param(request.args.get('to'), end=True)
+    except ValueError:
+        return jsonify(
+            status=False,
+            message='Tanggal harus berformat YYYY-MM-DD atau ISO 8601.'
+        ), 400
+
+    step = timedelta(hours=1) if granularity == 'hour' else timedelta(days=1)
+    now = get_current_time_in_timezone('Asia/Jakarta').replace(tzinfo=None)
+    if end is None:
+        end = bucket_start(now, granularity) + step
+    if start is None:
+        start = end - (timedelta(hours=24) if granularity == 'hour' else timedelta(days=7))
+    start = bucket_start(start, granularity)
+
+    if start >= end:
+        return jsonify(
+            status=False,
+            message='Tanggal awal harus sebelum tanggal akhir.'
+        ), 400
+    if (end - start) / step > MAX_BUCKETS:
+        return jsonify(
+            status=False,
+            message=f'Rentang terlalu panjang, maksimal {MAX_BUCKETS} {granularity}.'
+        ), 400
+
+    return jsonify(
+        status=True,
+        message='Statistik insiden berhasil dimuat.',
+        data=get_incident_stats(granularity, start, end, institution_id=institution_id)
+    ), 200
+# Akhir Statistik Insiden
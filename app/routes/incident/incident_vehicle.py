@@ -4,6 +4,11 @@ from marshmallow import ValidationError
 from flask import Blueprint, request, jsonify
 from utils.datetime import get_current_time_in_timezone
 from utils import auth
+from utils.pagination import paginate
+from utils.URL import ThumbnailURLs
+from app.services.incident_service import load_incident_detail, serialize_incident_detail
+from app.services.rollup_service import record_vehicle_arrived
+from app.services.event_service import publish_incident_event
 from app.models.models import Incident, IncidentStatus, Vehicle, IncidentVehicle, IncidentVehicleStatus, Driver
 
 incident_vehicle_route = Blueprint('incidents/vehicles', __name__)
@@ -14,23 +19,29 @@ incident_vehicle_route = Blueprint('incidents/vehicles', __name__)
 def get_incident_vehicle():
     # Ambil user berdasarkan data login
     user_id = get_jwt_identity()
-    vehicle_id = Vehicle.query.filter_by(user_id = user_id).with_entities(Vehicle.id).scalar()
+    driver_id = Driver.query.filter_by(user_id = user_id).with_entities(Driver.id).scalar()
     
     # Ambil parameter query status (ditolak, dilaporkan, ditangani, selesai)
     status = request.args.get('status', None)
     
-    # Bangun kueri
-    incidents = db.session.query(
+    # Bangun kueri: insiden yang ditugaskan ke kendaraan milik driver
+    query = db.session.query(
         Incident.id.label('incident_id'),
         Incident.description,
         Incident.reported_at,
         Incident.picture,
         Incident.status,
+    ).join(
+        IncidentVehicle, IncidentVehicle.incident_id == Incident.id
+    ).join(
+        Vehicle, Vehicle.id == IncidentVehicle.vehicle_id
     ).filter(
-        Incident.status == status
-    ).filter_by(
-        vehicle_id = vehicle_id
-    ).all()  # Gunakan alias di sini
+        Incident.status == status,
+        Vehicle.driver_id == driver_id
+    ).distinct()
+
+    # Jalankan kueri per halaman (terbaru lebih dulu)
+    incidents, next_cursor = paginate(query, Incident.id, key='incident_id', descending=True)
 
     # Siapkan datanya
     incident_data = [
@@ -39,6 +50,7 @@ def get_incident_vehicle():
             "description": incident.description,
             "reported_at": incident.reported_at.strftime('%H:%M'),  # Format jam dan menit
             "picture": incident.picture,
+            "thumbnails": ThumbnailURLs(incident.picture),
             "status": incident.status,
         }
         for incident in incidents
@@ -47,7 +59,8 @@ def get_incident_vehicle():
     return jsonify(
         status=True,
         message='Insiden berhasil dimuat.',
-        data=incident_data
+        data=incident_data,
+        next_cursor=next_cursor
     ), 200
 # Akhir Ambil Data
 
@@ -58,10 +71,8 @@ def get_incident_vehicle_by_id(incident_id):
     # Ambil parameter query status (ditolak, dilaporkan, ditangani, selesai)
     status = request.args.get('status', None)
     
-    # Query untuk mendapatkan data incident berdasarkan ID
-    incident = db.session.query(Incident).filter_by(id=incident_id).filter(
-        Incident.status == status
-    ).first()
+    # Query untuk mendapatkan data incident beserta relasinya dalam satu kueri
+    incident = load_incident_detail(incident_id, status)
 
     # Jika data tidak ditemukan
     if not incident:
@@ -71,125 +82,8 @@ def get_incident_vehicle_by_id(incident_id):
         ), 404
 
     # Menyiapkan data untuk respons
-    if incident.status == IncidentStatus.REPORTED:
-        incident_data = {
-            "id": incident.id,
-            "status": incident.status,
-            "description": incident.description,
-            "reported_at": incident.reported_at,
-            "location": {
-                "latitude": incident.latitude,
-                "longitude": incident.longitude
-            },
-            "picture": incident.picture,
-            "status": incident.status,
-            "resident": {
-                "id": incident.resident.id,
-                "user": {
-                    "id": incident.resident.user.id,  # Akses User dari Resident
-                    "name": incident.resident.user.name,  # Akses User's name
-                    "avatar": incident.resident.user.avatar  # Akses User's address
-                }
-            },
-            "institution": {
-                "id": incident.institution.id,
-                "user": {
-                    "name": incident.institution.user.name,  # Akses User's name di Vehicle
-                    "address": incident.institution.user.address,  # Akses User's address di Vehicle
-                    "avatar": incident.institution.user.avatar,  # Akses User's avatar di Vehicle
-                },
-            }
-        }
-    elif incident.status == IncidentStatus.HANDLED:
-        incident_data = {
-            "id": incident.id,
-            "status": incident.status,
-            "description": incident.description,
-            "reported_at": incident.reported_at,
-            "location": {
-                "latitude": incident.latitude,
-                "longitude": incident.longitude
-            },
-            "picture": incident.picture,
-            "status": incident.status,
-            "resident": {
-                "id": incident.resident.id,
-                "user": {
-                    "id": incident.resident.user.id,  # Akses User dari Resident
-                    "name": incident.resident.user.name,  # Akses User's name
-                    "avatar": incident.resident.user.avatar  # Akses User's address
-                }
-            },
-            "institution": {
-                "id": incident.institution.id,
-                "user": {
-                    "name": incident.institution.user.name,  # Akses User's name di Vehicle
-                    "address": incident.institution.user.address,  # Akses User's address di Vehicle
-                    "avatar": incident.institution.user.avatar,  # Akses User's avatar di Vehicle
-                },
-            }
-        }
-    elif incident.status == IncidentStatus.COMPLETED:
-        incident_data = {
-            "id": incident.id,
-            "status": incident.status,
-            "description": incident.description,
-            "reported_at": incident.reported_at,
-            "location": {
-                "latitude": incident.latitude,
-                "longitude": incident.longitude
-            },
-            "picture": incident.picture,
-            "status": incident.status,
-            "resident": {
-                "id": incident.resident.id,
-                "user": {
-                    "id": incident.resident.user.id,  # Akses User dari Resident
-                    "name": incident.resident.user.name,  # Akses User's name
-                    "avatar": incident.resident.user.avatar  # Akses User's address
-                }
-            },
-            "institution": {
-                "id": incident.institution.id,
-                "user": {
-                    "name": incident.institution.user.name,  # Akses User's name di Vehicle
-                    "address": incident.institution.user.address,  # Akses User's address di Vehicle
-                    "avatar": incident.institution.user.avatar,  # Akses User's avatar di Vehicle
-                },
-            }
-        }
-    elif incident.status == IncidentStatus.REJECTED:
-        incident_data = {
-            "id": incident.id,
-            "status": incident.status,
-            "description": incident.description,
-            "reported_at": incident.reported_at,
-            "location": {
-                "latitude": incident.latitude,
-                "longitude": incident.longitude
-            },
-            "picture": incident.picture,
-            "status": incident.status,
-            "resident": {
-                "id": incident.resident.id,
-                "user": {
-                    "id": incident.resident.user.id,  # Akses User dari Resident
-                    "name": incident.resident.user.name,  # Akses User's name
-                    "avatar": incident.resident.user.avatar  # Akses User's address
-                }
-            },
-            "institution": {
-                "id": incident.institution.id,
-                "user": {
-                    "name": incident.institution.user.name,  # Akses User's name di Vehicle
-                    "address": incident.institution.user.address,  # Akses User's address di Vehicle
-                    "avatar": incident.institution.user.avatar,  # Akses User's avatar di Vehicle
-                },
-            }
-        }
-    else:
-        return jsonify(status=False, message='Status Insiden tidak valid'), 400
-        
+    incident_data = serialize_incident_detail(incident)
+
     # Mengembalikan respons
     return jsonify(
         status=True,
@@ -239,6 +133,17 @@ def arrive_incident_vehicle(incident_id):
         incident_vehicle.status=IncidentVehicleStatus.ARRIVED
         incident_vehicle.arrived_at=get_current_time_in_timezone('Asia/Jakarta') # WIB
 
+        # Perbarui statistik waktu tiba kendaraan
+        record_vehicle_arrived(incident, incident_vehicle)
+
+        # Beritahu instansi setelah commit
+        publish_incident_event(
+            'incident.vehicle_arrived', incident,
+            driver_ids=[driver_id],
+            vehicle_id=incident_vehicle.vehicle_id,
+            arrived_at=incident_vehicle.arrived_at
+        )
+
         db.session.commit()
 
         return jsonify({
@@ -309,6 +214,14 @@ def complete_incident_vehicle(incident_id):
         incident_vehicle.status=IncidentVehicleStatus.COMPLETED
         incident_vehicle.completed_at=get_current_time_in_timezone('Asia/Jakarta') # WIB
 
+        # Beritahu instansi setelah commit
+        publish_incident_event(
+            'incident.vehicle_completed', incident,
+            driver_ids=[driver_id],
+            vehicle_id=incident_vehicle.vehicle_id,
+            completed_at=incident_vehicle.completed_at
+        )
+
         db.session.commit()
 
         return jsonify({
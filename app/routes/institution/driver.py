@@ -1,13 +1,15 @@
 import os
-from app.extensions import db, mail
+from app.extensions import db
 from marshmallow import ValidationError
 from flask import Blueprint, request, jsonify, render_template
 from werkzeug.security import generate_password_hash
 from flask_jwt_extended import create_access_token
 from itsdangerous import URLSafeTimedSerializer
-from flask_mail import Message
+from app.services.email_service import queue_email
 
 from utils import auth
+from utils.pagination import paginate
+from utils.search import search
 from app.models.models import Driver, User, Role, UserRole
 
 # schemas
@@ -33,12 +35,11 @@ def get_all_drivers():
         User.name
     ).join(User, Driver.user_id == User.id)
 
-    # If a search name is provided, filter by the user's name
+    # Ranked search when a name is given, otherwise a regular page
     if search_name:
-        query = query.filter(User.name.ilike(f'%{search_name}%'))  # Use ilike for case-insensitive matching
-
-    # Execute the query
-    drivers = query.all()
+        drivers, next_cursor = search(query, User.name, search_name)
+    else:
+        drivers, next_cursor = paginate(query, Driver.id)
 
     # Prepare the response
     driver_data = [
@@ -59,7 +60,8 @@ def get_all_drivers():
     return jsonify(
         status=True,
         message='Data berhasil dimuat.',
-        data=driver_data
+        data=driver_data,
+        next_cursor=next_cursor
     ), 200
 # Akhir Ambil Data 
 
@@ -310,13 +312,13 @@ def delete_driver(driver_id):
 # Kirim Email Verifikasi
 def send_email_verify(user) :
     token = generate_verify_token(user.email)
-    msg = Message(
+    # Simpan ke outbox, dikirim per batch di latar belakang
+    queue_email(
         subject="Verify Email Address",
         recipients=[user.email],
         sender=os.getenv('MAIL_USERNAME'),
         html=render_template('institution/verify_email.html', token=token, name=user.name)
     )
-    mail.send(msg)
 # Akhir Kirim Email Verifikasi
 
 # Hasilkan Verifikasi Token
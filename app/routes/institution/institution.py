@@ -1,17 +1,31 @@
 from flask_jwt_extended import get_jwt_identity
-from app.extensions import db
+from app.extensions import db, jobs
 from marshmallow import ValidationError
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from utils import auth
 from utils.datetime import get_current_time_in_timezone
-from app.models.models import Institution, User, Vehicle, Driver, Incident, Resident
-from utils.storage import storage_manager
-from utils.text_classification import predict_emergency_case
+from utils.pagination import paginate
+from utils.search import search
+from app.models.models import Institution, User, Vehicle, Driver, Incident, Resident, IncidentProcessingStatus
+from app.models.incident_upload import IncidentUpload
+from app.services.incident_service import process_incident
+from app.services.event_service import publish_incident_event
+from app.services.rollup_service import record_incident_reported
+from app.services.institution_service import find_nearby_institutions
  
 from app.schemas.incident.create_schema import CreateIncidentSchema
 
 institution_route = Blueprint('institutions', __name__)
 
+# Jumlah kendaraan siap per instansi, dihitung di dalam kueri utama (tanpa N+1)
+def ready_vehicle_count_column():
+    return db.session.query(
+        db.func.count(Vehicle.id)
+    ).filter(
+        Vehicle.institution_id == Institution.id,
+        Vehicle.is_ready == True
+    ).correlate(Institution).scalar_subquery().label('ready_vehicle_count')
+
 # Tampilkan semua Insiden
 @institution_route.route('/', methods=['GET'])
 @auth.login_required
@@ -28,25 +42,19 @@ def get_all_institutions():
         User.email,
         User.avatar,
         User.name,
-        User.address
+        User.address,
+        ready_vehicle_count_column()
     ).join(User, Institution.user_id == User.id)
 
-    # Jika ada parameter 'name' pada query, filter berdasarkan nama user
+    # Terapkan pencarian berperingkat, atau halaman biasa jika tanpa pencarian
     if search_name:
-        query = query.filter(User.name.ilike(f'%{search_name}%'))  # Menggunakan ilike untuk pencarian yang tidak case-sensitive
-
-    # Eksekusi query untuk mengambil data institusi
-    institutions = query.all()
+        institutions, next_cursor = search(query, User.name, search_name)
+    else:
+        institutions, next_cursor = paginate(query, Institution.id)
 
     # Menyiapkan data respons, termasuk jumlah kendaraan yang siap (ready)
     institution_data = []
     for institution in institutions:
-        # Menghitung jumlah kendaraan yang memiliki is_ready = True
-        ready_vehicle_count = db.session.query(Vehicle).filter(
-            Vehicle.institution_id == institution.id,
-            Vehicle.is_ready == True
-        ).count()
-
         # Menambahkan data institusi beserta jumlah kendaraan yang siap
         institution_data.append({
             "id": institution.id,
@@ -59,17 +67,99 @@ def get_all_institutions():
                 "name": institution.name,
                 "address": institution.address,
             },
-            "ready_vehicle_count": ready_vehicle_count  # Menambahkan jumlah kendaraan yang siap
+            "ready_vehicle_count": institution.ready_vehicle_count  # Menambahkan jumlah kendaraan yang siap
         })
 
     # Mengembalikan respons dengan data institusi yang sudah difilter dan jumlah kendaraan yang siap
     return jsonify(
         status=True,
         message='Data loaded successfully.',
-        data=institution_data
+        data=institution_data,
+        next_cursor=next_cursor
     ), 200
 # Akhir Tampilkan semua Insiden
 
+# Cari Instansi Terdekat
+@institution_route.route('/nearby', methods=['GET'])
+@auth.login_required
+def get_nearby_institutions():
+    # Validasi parameter lokasi, radius (km), dan jumlah hasil
+    try:
+        latitude = float(request.args['lat'])
+        longitude = float(request.args['lng'])
+        radius = float(request.args.get('radius', current_app.config['NEARBY_DEFAULT_RADIUS_KM']))
+        limit = int(request.args.get('limit', current_app.config['NEARBY_DEFAULT_LIMIT']))
+    except (KeyError, ValueError):
+        return jsonify(
+            status=False,
+            message='Parameter lat dan lng wajib diisi, lat, lng, radius, dan limit harus berupa angka.'
+        ), 400
+
+    max_radius = current_app.config['NEARBY_MAX_RADIUS_KM']
+    max_limit = current_app.config['PAGINATION_MAX_LIMIT']
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return jsonify(status=False, message='Koordinat tidak valid.'), 400
+    if not (0 < radius <= max_radius):
+        return jsonify(status=False, message=f'Radius harus antara 0 dan {max_radius} km.'), 400
+    if not (1 <= limit <= max_limit):
+        return jsonify(status=False, message=f'Limit harus antara 1 dan {max_limit}.'), 400
+
+    ready_only = request.args.get('ready', '').lower() in ('1', 'true', 'yes')
+
+    # Cari kandidat lewat indeks grid lalu urutkan berdasarkan jarak sebenarnya
+    ranked = find_nearby_institutions(latitude, longitude, radius, limit, ready_only=ready_only)
+    if not ranked:
+        return jsonify(
+            status=True,
+            message='Data loaded successfully.',
+            data=[]
+        ), 200
+
+    # Ambil rincian hanya untuk instansi yang lolos peringkat
+    distances = {candidate.id: distance for candidate, distance in ranked}
+    institutions = db.session.query(
+        Institution.id,
+        Institution.description,
+        Institution.latitude,
+        Institution.longitude,
+        User.id.label('user_id'),
+        User.username,
+        User.avatar,
+        User.name,
+        User.address,
+        ready_vehicle_count_column()
+    ).join(User, Institution.user_id == User.id) \
+        .filter(Institution.id.in_(distances)) \
+        .all()
+    institutions = sorted(institutions, key=lambda institution: distances[institution.id])
+
+    # Menyiapkan data respons
+    institution_data = [
+        {
+            "id": institution.id,
+            "description": institution.description,
+            "latitude": institution.latitude,
+            "longitude": institution.longitude,
+            "distance_km": round(distances[institution.id], 3),
+            "user": {
+                "id": institution.user_id,
+                "username": institution.username,
+                "avatar": institution.avatar,
+                "name": institution.name,
+                "address": institution.address,
+            },
+            "ready_vehicle_count": institution.ready_vehicle_count
+        }
+        for institution in institutions
+    ]
+
+    return jsonify(
+        status=True,
+        message='Data loaded successfully.',
+        data=institution_data
+    ), 200
+# Akhir Cari Instansi Terdekat
+
 # Tampilkan Instansi berdasarkan ID
 @institution_route.route('/<int:institution_id>', methods=['GET'])
 @auth.login_required
@@ -188,27 +278,41 @@ def add_incident(institution_id):
                 'message': 'Tidak ada gambar yang disediakan'
             }), 400
         
-        # Upload gambar dan dapatkan path
-        file_path = storage_manager.uploadFile(image_base64, dir='incidents')
-        
-        predicted_label = predict_emergency_case(data['description'])
-        label = data['label'] if 'label' in data else predicted_label
-        
+        # Simpan insiden dulu, gambar dan label diproses di latar belakang
         new_incident = Incident(
             institution_id=institution_id,
             resident_id=resident_id,
             description=data['description'],
             latitude=data['latitude'],
             longitude=data['longitude'],
-            label=label,  # Label sudah divalidasi
-            picture=file_path,
+            label=None,
+            picture=None,
+            processing_status=IncidentProcessingStatus.PENDING,
             reported_at=get_current_time_in_timezone('Asia/Jakarta')  # WIB
         )
         db.session.add(new_incident)
+        db.session.flush()
+
+        # Simpan gambar bersama insiden agar pemrosesan bisa diulang setelah restart
+        db.session.add(IncidentUpload(
+            incident_id=new_incident.id,
+            image=image_base64,
+            label=data.get('label'),
+            created_at=new_incident.reported_at.replace(tzinfo=None)
+        ))
+
+        # Hitung laporan sekali di sini (label 'unknown'), dipindah ke label asli setelah klasifikasi
+        record_incident_reported(new_incident)
+
+        # Beritahu instansi secara real-time setelah commit
+        publish_incident_event('incident.reported', new_incident, reported_at=new_incident.reported_at)
 
         # Simpan semua perubahan ke database
         db.session.commit()
 
+        # Upload gambar dan klasifikasi deskripsi oleh worker
+        jobs.submit(process_incident, new_incident.id)
+
         return jsonify({
             'status': True,
             'message': 'Laporan berhasil dibuat',
@@ -221,6 +325,7 @@ def add_incident(institution_id):
                 'latitude': new_incident.latitude,
                 'longitude': new_incident.longitude,
                 'picture': new_incident.picture,
+                'processing_status': new_incident.processing_status,
             }
         }), 201
 
@@ -3,7 +3,9 @@ from marshmallow import ValidationError
 from flask import Blueprint, request, jsonify
 
 from utils import auth
-from utils.URL import StorageURL
+from utils.URL import StorageURL, ThumbnailURLs
+from utils.pagination import paginate
+from utils.search import search
 from app.models.models import Vehicle, User, Vehicle, Driver
 from utils.storage import storage_manager
 
@@ -33,12 +35,11 @@ def get_vehicles():
      .join(User, Driver.user_id == User.id)  # Gunakan alias di sini
 
     
-    # Terapkan filter
+    # Terapkan pencarian berperingkat, atau halaman biasa jika tanpa pencarian
     if search_name:
-        query = query.filter(User.name.ilike(f'%{search_name}%'))  # Filter berdasarkan nama driver
-
-    # Jalankan kueri
-    vehicles = query.all()
+        vehicles, next_cursor = search(query, User.name, search_name)
+    else:
+        vehicles, next_cursor = paginate(query, Vehicle.id, key='vehicle_id')
 
     # Siapkan datanya
     vehicle_data = [
@@ -48,6 +49,7 @@ def get_vehicles():
             "description": vehicle.description,
             "is_ready": vehicle.is_ready,
             "picture": StorageURL(vehicle.picture),
+            "thumbnails": ThumbnailURLs(vehicle.picture),
             "driver": {
                 "id": vehicle.driver_id,
                 "name": vehicle.driver_name
@@ -59,7 +61,8 @@ def get_vehicles():
     return jsonify(
         status=True,
         message='Kendaraan berhasi dimuat.',
-        data=vehicle_data
+        data=vehicle_data,
+        next_cursor=next_cursor
     ), 200
 # Akhir Ambil Data
 
@@ -116,6 +119,7 @@ def add_vehicles():
                 'driver_id': new_vehicles.driver_id,
                 'is_ready': new_vehicles.is_ready,
                 'picture': new_vehicles.picture,
+                'thumbnails': ThumbnailURLs(new_vehicles.picture),
             }
         }), 201
 
@@ -219,11 +223,16 @@ def delete_driver(vehicle_id):
             }), 404
 
         # Hapus data Vehicle
+        picture = vehicle.picture
         db.session.delete(vehicle)
 
         # Commit transaksi
         db.session.commit()
 
+        # Lepas gambar, file dihapus jika tidak dipakai data lain
+        if picture:
+            storage_manager.deleteFile(picture)
+
         return jsonify(
             status= True,
             message='Kendaraan berhasil dihapus.'
@@ -3,6 +3,8 @@ from marshmallow import ValidationError
 from flask import Blueprint, request, jsonify
 
 from utils import auth
+from utils.pagination import paginate
+from utils.search import search
 from app.models.models import Role
 
 # schemas
@@ -24,12 +26,11 @@ def get_roles():
         Role.created_at
     ) 
     
-    # Terapkan filter
+    # Terapkan pencarian berperingkat, atau halaman biasa jika tanpa pencarian
     if search_name:
-        query = query.filter(Role.name.ilike(f'%{search_name}%'))  # Filter berdasarkan nama role
-
-    # Jalankan kueri
-    roles = query.all()
+        roles, next_cursor = search(query, Role.name, search_name)
+    else:
+        roles, next_cursor = paginate(query, Role.id, key='role_id')
 
     # Siapkan datanya
     role_data = [
@@ -44,7 +45,8 @@ def get_roles():
     return jsonify(
         status=True,
         message='Role berhasil dimuat.',
-        data=role_data
+        data=role_data,
+        next_cursor=next_cursor
     ), 200
 # Akhir Ambil Data
 
@@ -1,19 +1,65 @@
-import io
-
-from flask import Blueprint, send_file, jsonify
-from utils import storage
+from flask import Blueprint, Response, request, jsonify, current_app
+from werkzeug.http import http_date
+from utils.storage import storage_manager
 
 storage_route = Blueprint('storage', __name__)
 
 @storage_route.route('/<path:filepath>', methods=['GET'])
 def view(filepath) :
-  blob = storage.getFile(filepath)
-  if blob.exists() :
-    content_type = blob.content_type
-    image_data = blob.download_as_bytes()
-    filename = filepath.split('/')[-1]
-    return send_file(io.BytesIO(image_data), mimetype=content_type, as_attachment=False, download_name=filename)
-  return jsonify(
-    status=False,
-    message='File not found.'
-  )
\ No newline at end of file
+  # Satu permintaan metadata, file tidak diunduh ke memori
+  stat = storage_manager.statFile(filepath)
+  if stat is None :
+    return jsonify(
+      status=False,
+      message='File not found.'
+    ), 404
+
+  etag = (stat.etag or str(stat.generation)).strip('"')
+  headers = {
+    'ETag': f'"{etag}"',
+    'Cache-Control': current_app.config.get('STORAGE_CACHE_CONTROL', 'public, max-age=86400'),
+    'Accept-Ranges': 'bytes',
+  }
+  if stat.updated is not None :
+    headers['Last-Modified'] = http_date(stat.updated)
+
+  # Permintaan bersyarat (If-None-Match lebih diutamakan daripada If-Modified-Since)
+  if request.if_none_match :
+    not_modified = request.if_none_match.contains_weak(etag)
+  else :
+    not_modified = (
+      request.if_modified_since is not None and stat.updated is not None
+      and stat.updated.replace(microsecond=0) <= request.if_modified_since
+    )
+  if not_modified :
+    return Response(status=304, headers=headers)
+
+  # Range hanya berlaku jika If-Range (jika ada) masih cocok dengan versi file
+  if_range = request.if_range
+  range_valid = (
+    if_range.etag is None and if_range.date is None
+    or if_range.etag == etag
+    or if_range.date is not None and stat.updated is not None and stat.updated.replace(microsecond=0) <= if_range.date
+  )
+  start, end, status = 0, stat.size, 200
+  byte_range = request.range
+  # Multi-range (multipart/byteranges) tidak didukung, header diabaikan dan seluruh file dikirim
+  if byte_range is not None and range_valid and byte_range.units == 'bytes' and len(byte_range.ranges) == 1 :
+    bounds = byte_range.range_for_length(stat.size)
+    if bounds is None :
+      headers['Content-Range'] = f'bytes */{stat.size}'
+      return Response(status=416, headers=headers)
+    start, end = bounds
+    status = 206
+    headers['Content-Range'] = f'bytes {start}-{end - 1}/{stat.size}'
+
+  headers['Content-Length'] = str(end - start)
+  headers['Content-Disposition'] = f'inline; filename="{filepath.split("/")[-1]}"'
+
+  return Response(
+    storage_manager.streamFile(filepath, start, end, generation=stat.generation, size=stat.size),
+    status=status,
+    headers=headers,
+    mimetype=stat.content_type,
+    direct_passthrough=True
+  )
@@ -25,11 +25,12 @@ class HandleIncidentSchema(Schema):
 
     @validates('vehicles')
     def validate_vehicles(self, vehicles):
-        # Validasi kendaraan dan driver untuk setiap kendaraan
-        for vehicle in vehicles:
-            vehicle_id = vehicle.get("vehicle_id")
-            
-            # Validasi kendaraan berdasarkan vehicle_id
-            existing_vehicle = self.db_session.query(Vehicle).get(vehicle_id)
-            if not existing_vehicle:
-                raise ValidationError(f"Kendaraan dengan ID {vehicle_id} tidak ditemukan.")
\ No newline at end of file
+        # Validasi semua kendaraan sekaligus dengan satu kueri IN
+        vehicle_ids = [vehicle.get("vehicle_id") for vehicle in vehicles]
+        existing_ids = {
+            vehicle_id for (vehicle_id,) in self.db_session.query(Vehicle.id).filter(Vehicle.id.in_(vehicle_ids))
+        }
+
+        for vehicle_id in vehicle_ids:
+            if vehicle_id not in existing_ids:
+                raise ValidationError(f"Kendaraan dengan ID {vehicle_id} tidak ditemukan.")
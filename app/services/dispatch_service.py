@@ -0,0 +1,165 @@
+import heapq
+from datetime import timedelta
+from itertools import chain
+import numpy as np
+from flask import current_app
+
+from app.extensions import db
+from app.models.models import Institution, IncidentVehicle, Label, Vehicle
+from utils.datetime import get_current_time_in_timezone
+from utils.geo import bounding_box, grid_range, haversine_km
+
+# Jumlah kendaraan yang dikirim per tingkat keparahan
+VEHICLES_PER_LABEL = {
+    Label.HIGH: 3,
+    Label.MEDIUM: 2,
+    Label.LOW: 1,
+}
+
+# Bobot (jarak, beban) per tingkat keparahan; kasus berat mengutamakan jarak,
+# kasus ringan mengutamakan pemerataan beban kendaraan
+SCORE_WEIGHTS = {
+    Label.HIGH: (0.8, 0.2),
+    Label.MEDIUM: (0.6, 0.4),
+    Label.LOW: (0.4, 0.6),
+}
+
+# Rekomendasi Kendaraan
+def recommend_vehicles(incident, count=None, nearby=False):
+    """
+    Rank the ready vehicles that should be dispatched to an incident.
+
+    Candidate institutions are narrowed with the grid index and bounding box,
+    then ranked by haversine distance with NumPy. Vehicles with recent
+    assignments are few and are all scored; idle vehicles score by distance
+    alone, so they are read nearest institution first and reading stops once
+    no farther vehicle can enter the ranking. Lower scores are better.
+
+    :param incident: Incident to dispatch vehicles to
+    :param count: Number of vehicles to return (default: based on the incident label)
+    :param nearby: Also consider vehicles of other institutions within DISPATCH_RADIUS_KM
+    :return: List of dictionaries, best vehicle first
+    """
+    label = incident.label or Label.MEDIUM  # Label belum ada selama klasifikasi berjalan
+    if count is None:
+        count = VEHICLES_PER_LABEL[label]
+
+    radius_km = current_app.config['DISPATCH_RADIUS_KM']
+    # assigned_at disimpan dalam waktu WIB tanpa zona waktu
+    since = get_current_time_in_timezone('Asia/Jakarta').replace(tzinfo=None) - timedelta(hours=current_app.config['DISPATCH_LOAD_WINDOW_HOURS'])
+
+    # Hanya kolom numerik (float) agar hasil bisa langsung menjadi matriks NumPy
+    query = db.session.query(
+        Institution.id,
+        db.cast(Institution.latitude, db.Float),
+        db.cast(Institution.longitude, db.Float)
+    )
+
+    has_location = incident.latitude is not None and incident.longitude is not None
+    if nearby and has_location:
+        # Batasi ke instansi di sekitar lokasi insiden lewat indeks grid
+        min_lat, max_lat, min_lng, max_lng = bounding_box(incident.latitude, incident.longitude, radius_km)
+        min_grid_lat, max_grid_lat, min_grid_lng, max_grid_lng = grid_range(min_lat, max_lat, min_lng, max_lng)
+        query = query.filter(
+            Institution.grid_lat.between(min_grid_lat, max_grid_lat),
+            Institution.grid_lng.between(min_grid_lng, max_grid_lng),
+            Institution.latitude.between(min_lat, max_lat),
+            Institution.longitude.between(min_lng, max_lng)
+        )
+    else:
+        query = query.filter(Institution.id == incident.institution_id)
+
+    rows = db.session.connection().execute(query.statement).fetchall()
+    if not rows:
+        return []
+
+    # Jarak instansi ke lokasi insiden, instansi di luar radius tidak dipertimbangkan
+    institutions = np.fromiter(chain.from_iterable(rows), dtype=np.float64, count=len(rows) * 3).reshape(-1, 3)
+    institution_ids, latitudes, longitudes = institutions.T
+    if has_location:
+        distances = haversine_km(incident.latitude, incident.longitude, latitudes, longitudes)
+    else:
+        distances = np.zeros(len(institutions))
+    if nearby:
+        inside = distances <= radius_km
+        institution_ids, distances = institution_ids[inside], distances[inside]
+
+    # Instansi terdekat lebih dulu
+    order = np.lexsort((institution_ids, distances))
+    institution_ids = institution_ids[order].astype(np.int64).tolist()
+    distances = distances[order].tolist()
+    if not institution_ids:
+        return []
+    distance_of = dict(zip(institution_ids, distances))
+
+    # Kendaraan siap yang punya penugasan dalam jendela waktu beban
+    loaded = db.session.query(
+        Vehicle.id,
+        Vehicle.institution_id,
+        db.func.count(IncidentVehicle.id)
+    ).join(
+        IncidentVehicle, IncidentVehicle.vehicle_id == Vehicle.id
+    ).filter(
+        IncidentVehicle.assigned_at >= since,
+        Vehicle.is_ready == True,
+        Vehicle.deleted_at.is_(None),
+        Vehicle.institution_id.in_(institution_ids)
+    ).group_by(
+        Vehicle.id,
+        Vehicle.institution_id
+    ).all()
+
+    # Skor gabungan jarak dan beban yang dinormalisasi
+    distance_weight, load_weight = SCORE_WEIGHTS[label]
+    max_assignments = float(max((assignments for _, _, assignments in loaded), default=0))
+
+    def candidate(vehicle_id, institution_id, assignments):
+        distance = distance_of[institution_id]
+        score = distance_weight * distance / radius_km + load_weight * assignments / max(max_assignments, 1.0)
+        return (score, vehicle_id, institution_id, distance, assignments)
+
+    candidates = [candidate(vehicle_id, institution_id, assignments) for vehicle_id, institution_id, assignments in loaded]
+    loaded_ids = {vehicle_id for vehicle_id, _, _ in loaded}
+
+    # Kendaraan tanpa penugasan dibaca per kelompok instansi, dari yang terdekat
+    position, batch = 0, 8
+    while position < len(institution_ids):
+        if len(candidates) >= count:
+            # Kendaraan yang belum dibaca tidak bisa lebih baik dari skor jarak instansi berikutnya
+            kth_score = heapq.nsmallest(count, candidates)[-1][0]
+            if kth_score < distance_weight * distances[position] / radius_km:
+                break
+
+        idle = db.session.query(
+            Vehicle.id,
+            Vehicle.institution_id
+        ).filter(
+            Vehicle.institution_id.in_(institution_ids[position:position + batch]),
+            Vehicle.is_ready == True,
+            Vehicle.deleted_at.is_(None)
+        ).all()
+        candidates.extend(
+            candidate(vehicle_id, institution_id, 0)
+            for vehicle_id, institution_id in idle
+            if vehicle_id not in loaded_ids
+        )
+        position, batch = position + batch, batch * 2
+
+    selected = heapq.nsmallest(count, candidates)
+
+    # Nama hanya diambil untuk kendaraan terpilih
+    selected_ids = [vehicle_id for _, vehicle_id, _, _, _ in selected]
+    names = dict(db.session.query(Vehicle.id, Vehicle.name).filter(Vehicle.id.in_(selected_ids)).all()) if selected_ids else {}
+
+    return [
+        {
+            'vehicle_id': vehicle_id,
+            'name': names.get(vehicle_id),
+            'institution_id': institution_id,
+            'distance_km': round(float(distance), 3),
+            'assignments': int(assignments),
+            'score': round(float(score), 4),
+        }
+        for score, vehicle_id, institution_id, distance, assignments in selected
+    ]
+# Akhir Rekomendasi Kendaraan
@@ -0,0 +1,211 @@
+import random
+import smtplib
+import logging
+import threading
+from datetime import timedelta
+from flask import current_app
+from flask_mail import Connection, Message
+
+from app.extensions import db, jobs
+from app.models.email_outbox import EmailOutbox, EmailStatus
+from utils.datetime import get_current_time_in_timezone
+
+class TimeoutConnection(Connection):
+    """Flask-Mail connection whose SMTP socket gives up after MAIL_TIMEOUT seconds"""
+
+    def __init__(self, mail, timeout):
+        super().__init__(mail)
+        self.timeout = timeout
+
+    def configure_host(self):
+        if self.mail.use_ssl:
+            host = smtplib.SMTP_SSL(self.mail.server, self.mail.port, timeout=self.timeout)
+        else:
+            host = smtplib.SMTP(self.mail.server, self.mail.port, timeout=self.timeout)
+
+        host.set_debuglevel(int(self.mail.debug))
+
+        if self.mail.use_tls:
+            host.starttls()
+
+        if self.mail.username and self.mail.password:
+            host.login(self.mail.username, self.mail.password)
+
+        return host
+
+def _now():
+    return get_current_time_in_timezone('Asia/Jakarta').replace(tzinfo=None)
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter after `attempts` failed deliveries"""
+    base = current_app.config.get('MAIL_RETRY_BASE_SECONDS', 30)
+    cap = current_app.config.get('MAIL_RETRY_MAX_SECONDS', 3600)
+    delay = min(base * 2 ** (attempts - 1), cap)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+# Antrekan Email
+def queue_email(subject, recipients, html, sender=None):
+    """
+    Save an email to the outbox and wake the background sender.
+
+    :param subject: Email subject
+    :param recipients: List of recipient addresses, one outbox row each
+    :param html: Rendered HTML body
+    :param sender: Sender address, MAIL_DEFAULT_SENDER when None
+    :return: List of outbox IDs
+    """
+    now = _now()
+    emails = [
+        EmailOutbox(
+            recipient=recipient,
+            sender=sender,
+            subject=subject,
+            html=html,
+            status=EmailStatus.PENDING,
+            attempts=0,
+            next_attempt_at=now,
+            created_at=now
+        )
+        for recipient in recipients
+    ]
+    db.session.add_all(emails)
+    db.session.commit()
+
+    schedule_delivery()
+    return [email.id for email in emails]
+# Akhir Antrekan Email
+
+# Pengirim Latar Belakang
+# Hanya satu pengirim berjalan per proses, permintaan lain cukup menandai ada email baru
+_sender_lock = threading.Lock()
+_sender_running = False
+_sender_wakeup = False
+_retry_timer = None
+
+def schedule_delivery(delay=None):
+    """Run the sender as a background job, now or after `delay` seconds"""
+    global _sender_running, _sender_wakeup, _retry_timer
+
+    if delay is not None:
+        with _sender_lock:
+            if _retry_timer is not None:
+                _retry_timer.cancel()
+            _retry_timer = threading.Timer(delay, schedule_delivery)
+            _retry_timer.daemon = True
+            _retry_timer.start()
+        return
+
+    with _sender_lock:
+        if _sender_running:
+            _sender_wakeup = True
+            return
+        _sender_running = True
+        _sender_wakeup = False
+
+    jobs.submit(_run_sender)
+
+def _run_sender():
+    global _sender_running, _sender_wakeup
+
+    try:
+        while True:
+            deliver_pending_emails()
+            with _sender_lock:
+                if not _sender_wakeup:
+                    _sender_running = False
+                    break
+                _sender_wakeup = False
+    except Exception:
+        with _sender_lock:
+            _sender_running = False
+        raise
+
+    # Jadwalkan percobaan ulang berikutnya di proses ini
+    next_attempt_at = db.session.query(
+        db.func.min(EmailOutbox.next_attempt_at)
+    ).filter(
+        EmailOutbox.status == EmailStatus.PENDING
+    ).scalar()
+    db.session.rollback()
+    if next_attempt_at is not None:
+        schedule_delivery(delay=max((next_attempt_at - _now()).total_seconds(), 1))
+
+def deliver_pending_emails(max_batches=None):
+    """
+    Send due outbox emails in batches of MAIL_BATCH_SIZE, one SMTP connection per batch.
+
+    Rows are locked with SKIP LOCKED so several workers can drain the outbox
+    together. Failed emails are retried with exponential backoff until
+    MAIL_MAX_ATTEMPTS, then marked failed.
+
+    :param max_batches: Stop after this many batches (default: until nothing is due)
+    :return: Tuple of (sent, failed) counts
+    """
+    batch_size = current_app.config.get('MAIL_BATCH_SIZE', 50)
+    max_attempts = current_app.config.get('MAIL_MAX_ATTEMPTS', 5)
+    timeout = current_app.config.get('MAIL_TIMEOUT', 30)
+    default_sender = current_app.config.get('MAIL_DEFAULT_SENDER')
+    state = current_app.extensions['mail']
+
+    sent = failed = batches = 0
+    while max_batches is None or batches < max_batches:
+        emails = EmailOutbox.query.filter(
+            EmailOutbox.status == EmailStatus.PENDING,
+            EmailOutbox.next_attempt_at <= _now()
+        ).order_by(
+            EmailOutbox.next_attempt_at, EmailOutbox.id
+        ).limit(batch_size).with_for_update(skip_locked=True).all()
+
+        if not emails:
+            db.session.rollback()
+            break
+
+        remaining = list(emails)
+        try:
+            with TimeoutConnection(state, timeout) as connection:
+                while remaining:
+                    email = remaining[0]
+                    message = Message(
+                        subject=email.subject,
+                        recipients=[email.recipient],
+                        sender=email.sender or default_sender,
+                        html=email.html
+                    )
+                    try:
+                        connection.send(message)
+                    except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException) as e:
+                        # Kode 5xx (mis. alamat ditolak) bersifat permanen, tidak perlu diulang
+                        permanent = getattr(e, 'smtp_code', 550) >= 500
+                        failed += _defer(email, e, 1 if permanent else max_attempts)
+                    else:
+                        email.status = EmailStatus.SENT
+                        email.attempts += 1
+                        email.sent_at = _now()
+                        email.last_error = None
+                        sent += 1
+                    remaining.pop(0)
+        except (smtplib.SMTPException, OSError) as e:
+            # Koneksi gagal atau terputus, tunda sisa batch
+            logging.error(f"SMTP connection failed, {len(remaining)} email(s) deferred: {e}")
+            for email in remaining:
+                failed += _defer(email, e, max_attempts)
+
+        db.session.commit()
+        batches += 1
+
+        if remaining:
+            # Server SMTP bermasalah, lanjutkan pada percobaan ulang berikutnya
+            break
+
+    return sent, failed
+
+def _defer(email, error, max_attempts):
+    """Schedule a retry, or give up after max_attempts; returns 1 when the email failed for good"""
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= max_attempts:
+        email.status = EmailStatus.FAILED
+        return 1
+    email.next_attempt_at = _now() + retry_delay(email.attempts)
+    return 0
+# Akhir Pengirim Latar Belakang
@@ -0,0 +1,27 @@
+from app.extensions import db, events
+from utils.events import institution_channel, driver_channel
+
+# Kirim Event Insiden
+def publish_incident_event(event_type, incident, driver_ids=(), **extra):
+    """
+    Queue an incident event for the institution and the given drivers; it is sent
+    only after the current transaction commits.
+
+    :param event_type: Event name, e.g. 'incident.handled'
+    :param incident: Incident the event is about
+    :param driver_ids: Drivers that also receive the event
+    :param extra: Additional payload fields
+    """
+    channels = [institution_channel(incident.institution_id)]
+    channels.extend(driver_channel(driver_id) for driver_id in dict.fromkeys(driver_ids) if driver_id is not None)
+
+    data = {
+        'incident_id': incident.id,
+        'institution_id': incident.institution_id,
+        'status': incident.status,
+        'label': incident.label,
+        'processing_status': incident.processing_status,
+        **extra,
+    }
+    events.publish_on_commit(db.session, channels, event_type, data)
+# Akhir Kirim Event Insiden
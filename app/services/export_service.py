@@ -0,0 +1,154 @@
+import csv
+import io
+from datetime import datetime
+from enum import Enum
+from flask import current_app
+from sqlalchemy.orm import aliased
+
+from app.extensions import db
+from app.models.models import Incident, IncidentVehicle, Institution, Resident, User
+
+# Kolom ekspor, sesuai urutan kolom CSV
+EXPORT_FIELDS = (
+    'incident_id',
+    'status',
+    'label',
+    'processing_status',
+    'description',
+    'latitude',
+    'longitude',
+    'reported_at',
+    'handle_at',
+    'completed_at',
+    'resident_id',
+    'resident_name',
+    'institution_id',
+    'institution_name',
+    'vehicle_count',
+    'first_assigned_at',
+    'first_arrived_at',
+    'last_completed_at',
+    'handle_seconds',
+    'response_seconds',
+    'resolution_seconds',
+)
+
+def _seconds_between(start, end):
+    if start is None or end is None:
+        return None
+    return int((end - start).total_seconds())
+
+def _export_value(value):
+    # Nilai ekspor selalu tipe JSON dasar; tanggal dalam ISO 8601
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+# Baris Ekspor Insiden
+def iter_incident_export(date_from=None, date_to=None, institution_id=None, chunk_size=1000):
+    """
+    Stream incidents with resident, institution and dispatch timing fields.
+
+    Rows are read with a server-side cursor (yield_per), so memory stays flat
+    regardless of how many incidents match.
+
+    :param date_from: Only incidents reported at or after this datetime
+    :param date_to: Only incidents reported before this datetime
+    :param institution_id: Only incidents of this institution
+    :param chunk_size: Rows fetched from the cursor at a time
+    :return: Generator of dictionaries keyed by EXPORT_FIELDS
+    """
+    resident_user = aliased(User)
+    institution_user = aliased(User)
+
+    # Ringkasan waktu penugasan kendaraan per insiden
+    dispatch = db.session.query(
+        IncidentVehicle.incident_id,
+        db.func.count(IncidentVehicle.id).label('vehicle_count'),
+        db.func.min(IncidentVehicle.assigned_at).label('first_assigned_at'),
+        db.func.min(IncidentVehicle.arrived_at).label('first_arrived_at'),
+        db.func.max(IncidentVehicle.completed_at).label('last_completed_at')
+    ).group_by(
+        IncidentVehicle.incident_id
+    ).subquery()
+
+    query = db.session.query(
+        Incident.id.label('incident_id'),
+        Incident.status,
+        Incident.label,
+        Incident.processing_status,
+        Incident.description,
+        Incident.latitude,
+        Incident.longitude,
+        Incident.reported_at,
+        Incident.handle_at,
+        Incident.completed_at,
+        Resident.id.label('resident_id'),
+        resident_user.name.label('resident_name'),
+        Institution.id.label('institution_id'),
+        institution_user.name.label('institution_name'),
+        db.func.coalesce(dispatch.c.vehicle_count, 0).label('vehicle_count'),
+        dispatch.c.first_assigned_at,
+        dispatch.c.first_arrived_at,
+        dispatch.c.last_completed_at
+    ).join(
+        Resident, Resident.id == Incident.resident_id
+    ).join(
+        resident_user, resident_user.id == Resident.user_id
+    ).join(
+        Institution, Institution.id == Incident.institution_id
+    ).join(
+        institution_user, institution_user.id == Institution.user_id
+    ).outerjoin(
+        dispatch, dispatch.c.incident_id == Incident.id
+    )
+
+    if date_from is not None:
+        query = query.filter(Incident.reported_at >= date_from)
+    if date_to is not None:
+        query = query.filter(Incident.reported_at < date_to)
+    if institution_id is not None:
+        query = query.filter(Incident.institution_id == institution_id)
+
+    for row in query.order_by(Incident.id).yield_per(chunk_size):
+        item = row._asdict()
+        item['handle_seconds'] = _seconds_between(row.reported_at, row.handle_at)
+        item['response_seconds'] = _seconds_between(row.reported_at, row.first_arrived_at)
+        item['resolution_seconds'] = _seconds_between(row.reported_at, row.completed_at)
+        yield {field: _export_value(item[field]) for field in EXPORT_FIELDS}
+# Akhir Baris Ekspor Insiden
+
+# Format NDJSON
+def to_ndjson(rows, batch_size=500):
+    """Encode rows as newline-delimited JSON, yielding a chunk every `batch_size` rows"""
+    json = current_app.json
+    batch = []
+    for row in rows:
+        batch.append(json.dumps(row))
+        if len(batch) >= batch_size:
+            yield '\n'.join(batch) + '\n'
+            batch = []
+    if batch:
+        yield '\n'.join(batch) + '\n'
+# Akhir Format NDJSON
+
+# Format CSV
+def to_csv(rows, batch_size=500):
+    """Encode rows as CSV with a header line, yielding a chunk every `batch_size` rows"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+# Akhir Format CSV
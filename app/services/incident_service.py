@@ -0,0 +1,144 @@
+import logging
+from sqlalchemy.orm import joinedload
+from app.extensions import db
+from app.models.models import Incident, IncidentProcessingStatus, Label, Resident, Institution, IncidentVehicle
+from app.models.incident_upload import IncidentUpload
+from utils.storage import storage_manager
+from utils.text_classification import predict_emergency_case
+from utils.URL import ThumbnailURLs
+from app.services.rollup_service import record_incident_relabeled
+from app.services.event_service import publish_incident_event
+
+# Proses Insiden di Latar Belakang
+def process_incident(incident_id):
+    """
+    Upload the incident picture and classify its description, then update the row.
+
+    The picture is read from IncidentUpload, so the job can run again after a
+    restart; any unexpected error marks the incident as failed instead of
+    leaving it pending or processing.
+
+    :param incident_id: ID of the incident inserted with a pending status
+    """
+    incident = db.session.get(Incident, incident_id)
+    if incident is None:
+        logging.error(f"Incident {incident_id} not found for processing.")
+        return
+
+    try:
+        _process_incident(incident)
+    except Exception as e:
+        logging.exception(f"Failed to process incident {incident_id}: {e}")
+        db.session.rollback()
+
+        incident = db.session.get(Incident, incident_id)
+        if incident is not None:
+            incident.processing_status = IncidentProcessingStatus.FAILED
+            publish_incident_event('incident.processed', incident, picture=incident.picture)
+            db.session.commit()
+
+def _process_incident(incident):
+    incident.processing_status = IncidentProcessingStatus.PROCESSING
+    db.session.commit()
+
+    failed = False
+    upload = db.session.get(IncidentUpload, incident.id)
+    label = upload.label if upload is not None else None
+
+    # Upload gambar dan dapatkan path (sudah tersimpan jika ini percobaan ulang)
+    if incident.picture is None:
+        file_path = storage_manager.uploadFile(upload.image, dir='incidents') if upload is not None else None
+        if file_path is None:
+            failed = True
+        else:
+            incident.picture = file_path
+            db.session.delete(upload)
+            db.session.commit()
+
+    # Klasifikasi deskripsi insiden
+    previous_label = incident.label
+    try:
+        if label is None:
+            label = predict_emergency_case(incident.description)
+        incident.label = Label(str(label).lower())
+    except Exception as e:
+        logging.error(f"Failed to classify incident {incident.id}: {e}")
+        failed = True
+
+    incident.processing_status = IncidentProcessingStatus.FAILED if failed else IncidentProcessingStatus.DONE
+
+    # Laporan sudah dihitung saat dibuat, pindahkan hanya jika labelnya berubah
+    record_incident_relabeled(incident, previous_label)
+
+    # Beritahu instansi bahwa label dan gambar sudah tersedia
+    publish_incident_event('incident.processed', incident, picture=incident.picture)
+    db.session.commit()
+# Akhir Proses Insiden di Latar Belakang
+
+# Ambil Rincian Insiden
+def load_incident_detail(incident_id, status):
+    """
+    Load an incident with its resident, institution, their users and dispatched vehicles in one query.
+
+    :param incident_id: ID of the incident
+    :param status: Expected incident status
+    :return: Incident, or None if not found
+    """
+    return db.session.query(Incident).options(
+        joinedload(Incident.resident).joinedload(Resident.user),
+        joinedload(Incident.institution).joinedload(Institution.user),
+        joinedload(Incident.incident_vehicles).joinedload(IncidentVehicle.vehicle),
+    ).filter(
+        Incident.id == incident_id,
+        Incident.status == status
+    ).first()
+# Akhir Ambil Rincian Insiden
+
+# Susun Data Rincian Insiden
+def serialize_incident_detail(incident):
+    """
+    Build the response body shared by the resident, institution and vehicle detail routes.
+
+    :param incident: Incident loaded with load_incident_detail
+    :return: Dictionary for the response
+    """
+    return {
+        "id": incident.id,
+        "status": incident.status,
+        "description": incident.description,
+        "reported_at": incident.reported_at,
+        "location": {
+            "latitude": incident.latitude,
+            "longitude": incident.longitude
+        },
+        "picture": incident.picture,
+        "thumbnails": ThumbnailURLs(incident.picture),
+        "resident": {
+            "id": incident.resident.id,
+            "user": {
+                "id": incident.resident.user.id,  # Akses User dari Resident
+                "name": incident.resident.user.name,  # Akses User's name
+                "avatar": incident.resident.user.avatar  # Akses User's avatar
+            }
+        },
+        "institution": {
+            "id": incident.institution.id,
+            "user": {
+                "name": incident.institution.user.name,  # Akses User's name di Institution
+                "address": incident.institution.user.address,  # Akses User's address di Institution
+                "avatar": incident.institution.user.avatar,  # Akses User's avatar di Institution
+            },
+        },
+        "vehicles": [
+            {
+                "id": incident_vehicle.vehicle.id,
+                "name": incident_vehicle.vehicle.name,
+                "status": incident_vehicle.status,
+                "assigned_at": incident_vehicle.assigned_at,
+                "arrived_at": incident_vehicle.arrived_at,
+                "completed_at": incident_vehicle.completed_at,
+            }
+            for incident_vehicle in incident.incident_vehicles
+        ]
+    }
+# Akhir Susun Data Rincian Insiden
@@ -0,0 +1,39 @@
+from app.extensions import db
+from app.models.models import Institution, Vehicle
+from utils.geo import bounding_box, grid_range, nearest
+
+# Cari Instansi Terdekat
+def find_nearby_institutions(latitude, longitude, radius_km, limit, ready_only=False):
+    """
+    Find the institutions closest to a point.
+
+    Candidates are narrowed with the (grid_lat, grid_lng) index and the exact
+    bounding box, then ranked by haversine distance in NumPy.
+
+    :param latitude: Latitude of the point in degrees
+    :param longitude: Longitude of the point in degrees
+    :param radius_km: Search radius in kilometers
+    :param limit: Maximum number of institutions
+    :param ready_only: Only institutions with at least one ready vehicle
+    :return: List of (row, distance_km), nearest first; rows have id, latitude and longitude
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_km)
+    min_grid_lat, max_grid_lat, min_grid_lng, max_grid_lng = grid_range(min_lat, max_lat, min_lng, max_lng)
+
+    query = db.session.query(
+        Institution.id,
+        Institution.latitude,
+        Institution.longitude
+    ).filter(
+        Institution.grid_lat.between(min_grid_lat, max_grid_lat),
+        Institution.grid_lng.between(min_grid_lng, max_grid_lng),
+        Institution.latitude.between(min_lat, max_lat),
+        Institution.longitude.between(min_lng, max_lng)
+    )
+
+    # Hanya instansi yang memiliki kendaraan siap
+    if ready_only:
+        query = query.filter(Institution.vehicles.any(Vehicle.is_ready == True))
+
+    return nearest(latitude, longitude, query.all(), radius_km, limit)
+# Akhir Cari Instansi Terdekat
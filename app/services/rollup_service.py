@@ -0,0 +1,322 @@
+import math
+from collections import defaultdict
+from datetime import timedelta
+import pytz
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models.models import IncidentRollup
+
+GRANULARITIES = ('hour', 'day')
+
+# Jumlah kejadian per transisi status
+COUNT_METRICS = ('reported', 'handled', 'completed')
+
+# Durasi dalam detik:
+# - handle_time     : reported_at -> handle_at
+# - completion_time : reported_at -> completed_at
+# - arrival_time    : IncidentVehicle.assigned_at -> arrived_at
+DURATION_METRICS = ('handle_time', 'completion_time', 'arrival_time')
+
+# Histogram durasi berskala log: 4 bin per kelipatan dua (lebar bin ~19%)
+BINS_PER_DOUBLING = 4
+
+WIB = pytz.timezone('Asia/Jakarta')
+
+def duration_bin(seconds):
+    """Histogram bin of a duration in seconds"""
+    return int(math.floor(math.log2(max(seconds, 0) + 1) * BINS_PER_DOUBLING))
+
+def bin_midpoint(bin_index):
+    """Representative duration (seconds) of a histogram bin"""
+    return 2 ** ((bin_index + 0.5) / BINS_PER_DOUBLING) - 1
+
+def to_local_naive(value):
+    """Timestamps are stored in WIB without a timezone; aware values are converted first"""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(WIB).replace(tzinfo=None)
+    return value
+
+def bucket_start(value, granularity):
+    """Start of the hour or day containing value"""
+    value = value.replace(minute=0, second=0, microsecond=0)
+    if granularity == 'day':
+        value = value.replace(hour=0)
+    return value
+
+def label_key(label):
+    if label is None:
+        return 'unknown'
+    return getattr(label, 'value', label)
+
+def seconds_between(start, end):
+    start, end = to_local_naive(start), to_local_naive(end)
+    if start is None or end is None:
+        return None
+    return max(int((end - start).total_seconds()), 0)
+
+def aggregate_events(events, increments=None):
+    """
+    Fold events into rollup increments for every granularity.
+
+    :param events: Iterable of (metric, at, institution_id, label, seconds); seconds is None for counters
+    :param increments: Existing increments to add to
+    :return: Dictionary of rollup key -> [event_count, seconds_sum]
+    """
+    if increments is None:
+        increments = defaultdict(lambda: [0, 0])
+
+    for metric, at, institution_id, label, seconds in events:
+        at = to_local_naive(at)
+        if at is None or (metric in DURATION_METRICS and seconds is None):
+            continue
+        bin_index = 0 if seconds is None else duration_bin(seconds)
+        for granularity in GRANULARITIES:
+            key = (granularity, bucket_start(at, granularity), institution_id, label_key(label), metric, bin_index)
+            increment = increments[key]
+            increment[0] += 1
+            increment[1] += seconds or 0
+
+    return increments
+
+def apply_increments(increments):
+    """
+    Add increments to the rollup table with one upsert, in the caller's transaction.
+    """
+    if not increments:
+        return
+
+    rows = [
+        {
+            'granularity': granularity,
+            'bucket_start': start,
+            'institution_id': institution_id,
+            'label': label,
+            'metric': metric,
+            'bin': bin_index,
+            'event_count': event_count,
+            'seconds_sum': seconds_sum,
+        }
+        for (granularity, start, institution_id, label, metric, bin_index), (event_count, seconds_sum) in increments.items()
+    ]
+
+    table = IncidentRollup.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('mysql', 'mariadb'):
+        stmt = mysql.insert(table).values(rows)
+        stmt = stmt.on_duplicate_key_update(
+            event_count=table.c.event_count + stmt.inserted.event_count,
+            seconds_sum=table.c.seconds_sum + stmt.inserted.seconds_sum
+        )
+    elif dialect == 'sqlite':
+        stmt = sqlite.insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['granularity', 'bucket_start', 'institution_id', 'label', 'metric', 'bin'],
+            set_={
+                'event_count': table.c.event_count + stmt.excluded.event_count,
+                'seconds_sum': table.c.seconds_sum + stmt.excluded.seconds_sum,
+            }
+        )
+    else:
+        apply_increments_generic(rows)
+        return
+
+    db.session.execute(stmt)
+
+def apply_increments_generic(rows):
+    """
+    Fallback for dialects without an upsert: lock each existing row and add to
+    it, or insert it. A row inserted concurrently is locked and updated instead.
+    """
+    key_columns = ('granularity', 'bucket_start', 'institution_id', 'label', 'metric', 'bin')
+
+    def add_to_existing(row):
+        existing = IncidentRollup.query.filter_by(
+            **{column: row[column] for column in key_columns}
+        ).with_for_update().populate_existing().first()
+        if existing is None:
+            return False
+        existing.event_count += row['event_count']
+        existing.seconds_sum += row['seconds_sum']
+        return True
+
+    for row in rows:
+        if add_to_existing(row):
+            continue
+        try:
+            with db.session.begin_nested():
+                db.session.add(IncidentRollup(**row))
+        except IntegrityError:
+            add_to_existing(row)
+
+    db.session.flush()
+
+def record_events(events):
+    apply_increments(aggregate_events(events))
+
+# Pencatatan Transisi Insiden
+def incident_reported_events(incident):
+    return [('reported', incident.reported_at, incident.institution_id, incident.label, None)]
+
+def incident_handled_events(incident):
+    return [
+        ('handled', incident.handle_at, incident.institution_id, incident.label, None),
+        ('handle_time', incident.handle_at, incident.institution_id, incident.label,
+         seconds_between(incident.reported_at, incident.handle_at)),
+    ]
+
+def incident_completed_events(incident):
+    return [
+        ('completed', incident.completed_at, incident.institution_id, incident.label, None),
+        ('completion_time', incident.completed_at, incident.institution_id, incident.label,
+         seconds_between(incident.reported_at, incident.completed_at)),
+    ]
+
+def vehicle_arrived_events(incident, incident_vehicle):
+    return [
+        ('arrival_time', incident_vehicle.arrived_at, incident.institution_id, incident.label,
+         seconds_between(incident_vehicle.assigned_at, incident_vehicle.arrived_at)),
+    ]
+
+def record_incident_reported(incident):
+    """Count a new incident once, under 'unknown' until it is classified"""
+    record_events(incident_reported_events(incident))
+
+def record_incident_relabeled(incident, previous_label):
+    """Move the reported count of an incident from previous_label to its current label"""
+    if label_key(previous_label) == label_key(incident.label):
+        return
+
+    increments = aggregate_events(incident_reported_events(incident))
+    previous = [('reported', incident.reported_at, incident.institution_id, previous_label, None)]
+    for key, (event_count, seconds_sum) in aggregate_events(previous).items():
+        increments[key][0] -= event_count
+        increments[key][1] -= seconds_sum
+    apply_increments(increments)
+
+def record_incident_handled(incident):
+    record_events(incident_handled_events(incident))
+
+def record_incident_completed(incident):
+    record_events(incident_completed_events(incident))
+
+def record_vehicle_arrived(incident, incident_vehicle):
+    record_events(vehicle_arrived_events(incident, incident_vehicle))
+# Akhir Pencatatan Transisi Insiden
+
+# Ringkasan Statistik
+def summarize_durations(bins):
+    """
+    Mean and p90 of a duration histogram.
+
+    :param bins: Dictionary of bin index -> [event_count, seconds_sum]
+    :return: Dictionary with count, mean_seconds and p90_seconds
+    """
+    total = sum(event_count for event_count, _ in bins.values())
+    if not total:
+        return {'count': 0, 'mean_seconds': None, 'p90_seconds': None}
+
+    seconds_sum = sum(seconds for _, seconds in bins.values())
+
+    # Persentil ke-90 diperkirakan dari titik tengah bin histogram
+    target = math.ceil(total * 0.9)
+    cumulative = 0
+    p90 = None
+    for bin_index in sorted(bins):
+        cumulative += bins[bin_index][0]
+        if cumulative >= target:
+            p90 = bin_midpoint(bin_index)
+            break
+
+    return {
+        'count': total,
+        'mean_seconds': round(seconds_sum / total, 1),
+        'p90_seconds': round(p90, 1),
+    }
+
+def get_incident_stats(granularity, start, end, institution_id=None):
+    """
+    Read incident statistics from the rollup table only.
+
+    :param granularity: 'hour' or 'day'
+    :param start: First bucket (inclusive, WIB)
+    :param end: End of the range (exclusive, WIB)
+    :param institution_id: Only this institution, or all institutions
+    :return: Dictionary with per-bucket series and a summary over the range
+    """
+    query = db.session.query(
+        IncidentRollup.bucket_start,
+        IncidentRollup.label,
+        IncidentRollup.metric,
+        IncidentRollup.bin,
+        db.func.sum(IncidentRollup.event_count).label('event_count'),
+        db.func.sum(IncidentRollup.seconds_sum).label('seconds_sum')
+    ).filter(
+        IncidentRollup.granularity == granularity,
+        IncidentRollup.bucket_start >= start,
+        IncidentRollup.bucket_start < end
+    )
+
+    if institution_id is not None:
+        query = query.filter(IncidentRollup.institution_id == institution_id)
+
+    rows = query.group_by(
+        IncidentRollup.bucket_start,
+        IncidentRollup.label,
+        IncidentRollup.metric,
+        IncidentRollup.bin
+    ).order_by(
+        IncidentRollup.bucket_start
+    ).all()
+
+    buckets = {}
+    total_counts = {metric: defaultdict(int) for metric in COUNT_METRICS}
+    total_durations = {metric: defaultdict(lambda: [0, 0]) for metric in DURATION_METRICS}
+
+    for row in rows:
+        bucket = buckets.setdefault(row.bucket_start, {
+            'counts': {metric: defaultdict(int) for metric in COUNT_METRICS},
+            'durations': {metric: defaultdict(lambda: [0, 0]) for metric in DURATION_METRICS},
+        })
+        event_count, seconds_sum = int(row.event_count), int(row.seconds_sum)
+        if not event_count:
+            continue  # Baris yang hitungannya sudah dipindah ke label lain
+
+        if row.metric in COUNT_METRICS:
+            bucket['counts'][row.metric][row.label] += event_count
+            total_counts[row.metric][row.label] += event_count
+        elif row.metric in DURATION_METRICS:
+            for bins in (bucket['durations'][row.metric], total_durations[row.metric]):
+                bins[row.bin][0] += event_count
+                bins[row.bin][1] += seconds_sum
+
+    series = []
+    step = timedelta(hours=1) if granularity == 'hour' else timedelta(days=1)
+    current = start
+    while current < end:
+        bucket = buckets.get(current)
+        series.append({
+            'bucket_start': current.isoformat(),
+            'counts': {
+                metric: dict(bucket['counts'][metric]) if bucket else {}
+                for metric in COUNT_METRICS
+            },
+            'durations': {
+                metric: summarize_durations(bucket['durations'][metric] if bucket else {})
+                for metric in DURATION_METRICS
+            },
+        })
+        current += step
+
+    return {
+        'granularity': granularity,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'series': series,
+        'summary': {
+            'counts': {metric: dict(total_counts[metric]) for metric in COUNT_METRICS},
+            'durations': {metric: summarize_durations(total_durations[metric]) for metric in DURATION_METRICS},
+        },
+    }
+# Akhir Ringkasan Statistik
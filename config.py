@@ -16,9 +16,22 @@ class InitConfig() :
             'pass': os.getenv('DB_PASSWORD'),
             # 'port': os.getenv('DB_PORT'),
         }
+        # Driver MySQL: mysqlclient (mysqldb) atau PyMySQL (pymysql, wajib untuk worker gevent)
+        default_driver = 'pymysql' if os.getenv('GUNICORN_WORKER_CLASS') == 'gevent' else 'mysqldb'
+        db_driver = os.getenv('DB_DRIVER', default_driver)
         app.config['SQLALCHEMY_DATABASE_URI'] =\
-            f'mysql://{db_config["user"]}:{db_config["pass"]}@{db_config["host"]}/{db_config["name"]}'
+            f'mysql+{db_driver}://{db_config["user"]}:{db_config["pass"]}@{db_config["host"]}/{db_config["name"]}'
         app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = os.getenv('SQLALCHEMY_TRACK_MODIFICATIONS', False)
+
+        # Connection pool per worker: cukup untuk semua thread permintaan dan job latar belakang.
+        # Koneksi diperiksa sebelum dipakai dan didaur ulang sebelum wait_timeout MySQL.
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 5)),
+            'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 10)),
+            'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 280)),
+            'pool_pre_ping': True,
+        }
         
         # JWT Configuration
         app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
@@ -27,8 +40,72 @@ class InitConfig() :
         
         # Mail Configuration
         app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER')
-        app.config['MAIL_PORT'] = os.getenv('MAIL_PORT')
+        app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT', 587))
         app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
         app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
-        app.config['MAIL_USE_TLS'] = True
-        app.config['MAIL_USE_SSL'] = False
+        app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER', os.getenv('MAIL_USERNAME'))
+        # Untuk server SMTP lokal (mis. `python -m aiosmtpd -n -l localhost:1025`) set MAIL_USE_TLS=false
+        app.config['MAIL_USE_TLS'] = os.getenv('MAIL_USE_TLS', 'true').lower() == 'true'
+        app.config['MAIL_USE_SSL'] = os.getenv('MAIL_USE_SSL', 'false').lower() == 'true'
+        app.config['MAIL_SUPPRESS_SEND'] = os.getenv('MAIL_SUPPRESS_SEND', 'false').lower() == 'true'
+
+        # Email Outbox Configuration (dikirim per batch di latar belakang dengan percobaan ulang)
+        app.config['MAIL_TIMEOUT'] = int(os.getenv('MAIL_TIMEOUT', 30))
+        app.config['MAIL_BATCH_SIZE'] = int(os.getenv('MAIL_BATCH_SIZE', 50))
+        app.config['MAIL_MAX_ATTEMPTS'] = int(os.getenv('MAIL_MAX_ATTEMPTS', 5))
+        app.config['MAIL_RETRY_BASE_SECONDS'] = int(os.getenv('MAIL_RETRY_BASE_SECONDS', 30))
+        app.config['MAIL_RETRY_MAX_SECONDS'] = int(os.getenv('MAIL_RETRY_MAX_SECONDS', 3600))
+
+        # JSON Configuration ('auto', 'orjson', 'stdlib'; tanggal 'http' atau 'iso')
+        app.config['JSON_PROVIDER'] = os.getenv('JSON_PROVIDER', 'auto')
+        app.config['JSON_DATETIME_FORMAT'] = os.getenv('JSON_DATETIME_FORMAT', 'http')
+
+        # Storage Proxy Configuration (header Cache-Control untuk /storage)
+        app.config['STORAGE_CACHE_CONTROL'] = os.getenv('STORAGE_CACHE_CONTROL', 'public, max-age=86400')
+
+        # Pagination Configuration
+        app.config['PAGINATION_DEFAULT_LIMIT'] = int(os.getenv('PAGINATION_DEFAULT_LIMIT', 20))
+        app.config['PAGINATION_MAX_LIMIT'] = int(os.getenv('PAGINATION_MAX_LIMIT', 100))
+
+        # Name Search Configuration ('auto', 'fulltext' untuk MySQL, atau 'ngram' di dalam proses)
+        app.config['SEARCH_BACKEND'] = os.getenv('SEARCH_BACKEND', 'auto')
+        app.config['SEARCH_INDEX_TTL'] = int(os.getenv('SEARCH_INDEX_TTL', 300))
+        app.config['SEARCH_MAX_CANDIDATES'] = int(os.getenv('SEARCH_MAX_CANDIDATES', 500))
+
+        # Nearby Institution Search Configuration (radius dalam kilometer)
+        app.config['NEARBY_DEFAULT_RADIUS_KM'] = float(os.getenv('NEARBY_DEFAULT_RADIUS_KM', 10))
+        app.config['NEARBY_MAX_RADIUS_KM'] = float(os.getenv('NEARBY_MAX_RADIUS_KM', 100))
+        app.config['NEARBY_DEFAULT_LIMIT'] = int(os.getenv('NEARBY_DEFAULT_LIMIT', 10))
+
+        # Dispatch Recommendation Configuration
+        app.config['DISPATCH_RADIUS_KM'] = float(os.getenv('DISPATCH_RADIUS_KM', 25))
+        app.config['DISPATCH_LOAD_WINDOW_HOURS'] = int(os.getenv('DISPATCH_LOAD_WINDOW_HOURS', 24))
+
+        # Background Job Configuration ('thread' atau 'sync' untuk lokal/pengujian)
+        app.config['JOB_QUEUE_BACKEND'] = os.getenv('JOB_QUEUE_BACKEND', 'thread')
+        app.config['JOB_QUEUE_WORKERS'] = int(os.getenv('JOB_QUEUE_WORKERS', 4))
+
+        # Real-time Event Configuration
+        # Broker 'memory' hanya mengirim event ke pelanggan di proses yang sama, sehingga dengan
+        # lebih dari satu worker gunicorn (GUNICORN_WORKERS, diekspor oleh gunicorn.conf.py)
+        # broker wajib 'redis'. Tanpa gunicorn (flask run) aplikasi dianggap satu proses.
+        app.config['GUNICORN_WORKERS'] = int(os.getenv('GUNICORN_WORKERS', 1))
+        app.config['EVENT_BROKER_BACKEND'] = os.getenv('EVENT_BROKER_BACKEND', 'redis' if app.config['GUNICORN_WORKERS'] > 1 else 'memory')
+        app.config['EVENT_BROKER_REDIS_URL'] = os.getenv('EVENT_BROKER_REDIS_URL', 'redis://localhost:6379/0')
+        app.config['EVENT_QUEUE_SIZE'] = int(os.getenv('EVENT_QUEUE_SIZE', 100))
+        app.config['EVENT_STREAM_HEARTBEAT_SECONDS'] = int(os.getenv('EVENT_STREAM_HEARTBEAT_SECONDS', 15))
+        app.config['EVENT_STREAM_MAX_SECONDS'] = int(os.getenv('EVENT_STREAM_MAX_SECONDS', 240))
+
+        # Setiap stream SSE menahan satu thread (gthread) atau greenlet (gevent) selama
+        # EVENT_STREAM_MAX_SECONDS, jadi dibatasi setengah kapasitas worker agar permintaan
+        # biasa tetap terlayani. Worker sync tidak melayani stream sama sekali.
+        worker_class = os.getenv('GUNICORN_WORKER_CLASS')
+        if worker_class == 'gthread':
+            stream_limit = int(os.getenv('GUNICORN_THREADS', 8)) // 2
+        elif worker_class == 'gevent':
+            stream_limit = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 200)) // 2
+        elif worker_class == 'sync':
+            stream_limit = 0
+        else:
+            stream_limit = 50
+        app.config['EVENT_STREAM_MAX_CONNECTIONS'] = min(int(os.getenv('EVENT_STREAM_MAX_CONNECTIONS', stream_limit)), stream_limit)
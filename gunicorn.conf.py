@@ -0,0 +1,54 @@
+import os
+
+# Jenis worker (GUNICORN_WORKER_CLASS):
+# - gthread (default): setiap worker melayani GUNICORN_THREADS permintaan sekaligus,
+#   upload GCS dan SMTP hanya menahan satu thread; setiap koneksi SSE (/events) juga
+#   menahan satu thread, jadi paling banyak GUNICORN_THREADS // 2 stream per worker
+# - gevent           : ribuan permintaan I/O per worker (GUNICORN_WORKER_CONNECTIONS);
+#   database otomatis memakai PyMySQL karena mysqlclient memblokir event loop.
+#   Disarankan jika banyak dashboard memakai /events, stream hanya menahan greenlet
+#   (paling banyak GUNICORN_WORKER_CONNECTIONS // 2 per worker)
+# - sync             : satu permintaan per worker (perilaku lama)
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+
+if worker_class == 'gevent':
+    # Patch harus terjadi sebelum aplikasi (dan modul socket/ssl) diimpor, termasuk saat preload
+    from gevent import monkey
+    monkey.patch_all()
+
+# Server
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv('GUNICORN_WORKERS', 4))
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 200))
+
+# Nilai efektif dibaca oleh config.py (broker event dan batas koneksi SSE per worker)
+os.environ['GUNICORN_WORKER_CLASS'] = worker_class
+os.environ['GUNICORN_WORKERS'] = str(workers)
+os.environ['GUNICORN_THREADS'] = str(threads)
+os.environ['GUNICORN_WORKER_CONNECTIONS'] = str(worker_connections)
+
+# Batas waktu: permintaan yang macet dihentikan, keep-alive sedikit di atas load balancer
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# Model klasifikasi (TensorFlow)
+# - CLASSIFIER_PRELOAD=true : muat model sekali di master, worker berbagi memori (copy-on-write)
+# - CLASSIFIER_WARMUP=true  : setiap worker memuat model di thread latar setelah fork
+# - keduanya false (default): model dimuat saat prediksi pertama
+classifier_preload = os.getenv('CLASSIFIER_PRELOAD', 'false').lower() == 'true'
+classifier_warmup = os.getenv('CLASSIFIER_WARMUP', 'false').lower() == 'true'
+
+preload_app = classifier_preload
+
+def when_ready(server):
+    if classifier_preload:
+        from utils.text_classification import preload_classifier
+        report = preload_classifier()
+        server.log.info(f"Classifier preloaded in master: {report}")
+
+def post_worker_init(worker):
+    if classifier_warmup and not classifier_preload:
+        from utils.text_classification import warm_up_classifier_async
+        warm_up_classifier_async()
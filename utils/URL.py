@@ -1,10 +1,20 @@
-import os
+from utils.storage import storage_manager
+from utils.images import THUMBNAIL_SIZES, thumbnail_path
 
 def StorageURL(filename):
     """
-    Generate the full URL for a file stored in Google Cloud Storage.
-    :param filename: Path in the bucket, e.g., 'vehicles/image.png'.
-    :return: Full URL to access the file in GCS.
+    Generate the full URL for an uploaded file on the configured storage backend.
+    :param filename: Path in storage, e.g., 'vehicles/image.png'.
+    :return: Public GCS URL, or the /storage proxy path for the local and memory backends.
     """
-    bucket_name = os.getenv('BUCKET_NAME')  # Nama bucket GCS
-    return f"https://storage.googleapis.com/{bucket_name}/{filename}"
+    return storage_manager.publicUrl(filename)
+
+def ThumbnailURLs(filename):
+    """
+    Generate the URLs of the thumbnails stored next to an uploaded picture.
+    :param filename: Path of the original picture, e.g., 'vehicles/image.jpeg'.
+    :return: Dictionary of thumbnail name to URL, e.g. {'small': ..., 'medium': ...}, or None without a picture.
+    """
+    if not filename:
+        return None
+    return {size: StorageURL(thumbnail_path(filename, size)) for size in THUMBNAIL_SIZES}
@@ -1,20 +1,14 @@
 from flask import jsonify
 from flask_jwt_extended import verify_jwt_in_request, get_jwt
 from functools import wraps
-from app.models.login_log import LoginLog
+from utils.token_session import token_sessions
 
 def login_required(fn) :
   @wraps(fn)
   def wrapper(*args, **kwargs) :
       verify_jwt_in_request()
-      log = LoginLog.query.filter_by(token_identifier=get_jwt()['jti']).first()
-      if log is not None :
-        if log.destroy_at is None :
-          return fn(*args, **kwargs)
-        return jsonify(
-            status=False,
-            message="Invalid token."
-        ), 401
+      if token_sessions.is_active(get_jwt()['jti']) :
+        return fn(*args, **kwargs)
       return jsonify(
           status=False,
           message="Invalid token."
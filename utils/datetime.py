@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 import pytz
 
 def get_current_time_in_timezone(timezone='Asia/Jakarta'):
@@ -17,3 +17,27 @@ def get_current_time_in_timezone(timezone='Asia/Jakarta'):
         return datetime.now(tz)
     except pytz.UnknownTimeZoneError:
         raise ValueError(f"Zona waktu tidak valid: {timezone}")
+
+
+def parse_date_param(value, end=False):
+    """
+    Mengubah parameter kueri tanggal (YYYY-MM-DD atau ISO 8601) menjadi datetime WIB tanpa zona waktu.
+
+    Args:
+        value (str): Nilai parameter, boleh kosong.
+        end (bool): Jika True dan hanya berisi tanggal, hasilnya awal hari berikutnya agar seluruh hari tercakup.
+
+    Returns:
+        datetime: Objek datetime, atau None jika parameter kosong.
+
+    Raises:
+        ValueError: Jika format tanggal tidak valid.
+    """
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(pytz.timezone('Asia/Jakarta')).replace(tzinfo=None)
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
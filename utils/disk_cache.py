@@ -0,0 +1,285 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows, penguncian antar proses dinonaktifkan
+    fcntl = None
+
+# Sisa ruang setelah eviksi, agar eviksi tidak berjalan pada setiap penulisan
+EVICT_TARGET_RATIO = 0.9
+
+# Interval minimal pemindaian ulang ukuran cache (detik), karena worker lain juga menulis
+SCAN_INTERVAL = 60
+
+# File sementara yang lebih tua dari ini dianggap sisa proses yang mati
+STALE_TMP_SECONDS = 3600
+
+class DiskLRUCache:
+    """
+    Read-through file cache on local disk, shared by the gunicorn workers of one instance.
+
+    Each object version is stored in its own file ({digest}.{version}.data), so a
+    reader never sees bytes of another version; metadata sits next to it in
+    {digest}.json. Files are written to a temporary name and renamed into place
+    under a short flock, and the least recently used files are evicted once the
+    directory grows past `max_bytes`.
+    """
+
+    def __init__(self, directory, max_bytes, max_object_bytes=None):
+        self.directory = directory
+        self.max_bytes = int(max_bytes)
+        self.max_object_bytes = int(max_object_bytes or self.max_bytes // 10)
+        self.counters = {'hits': 0, 'misses': 0, 'fills': 0, 'skipped': 0, 'evictions': 0, 'evicted_bytes': 0, 'errors': 0}
+        self._counter_lock = threading.Lock()
+        self._size_lock = threading.Lock()
+        self._approx_bytes = None
+        self._entries = None
+        self._scanned_at = 0.0
+
+        os.makedirs(directory, exist_ok=True)
+
+    # Metadata
+    def get_meta(self, key):
+        """Metadata dictionary stored for key, or None"""
+        try:
+            with open(self._base(key) + '.json', 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def set_meta(self, key, meta):
+        self._write_atomic(self._base(key) + '.json', [json.dumps(meta).encode()])
+
+    # Data
+    def open(self, key, version):
+        """
+        Open a cached object version for reading and mark it recently used.
+
+        :return: Binary file object, or None on a miss
+        """
+        file = self._open_data(key, version)
+        self._count('hits' if file is not None else 'misses')
+        return file
+
+    def fill(self, key, version, chunks):
+        """
+        Store an object version from an iterable of byte chunks and open it.
+
+        The download goes to a temporary file without holding any lock; the shard
+        lock is only taken to check for a copy written meanwhile and to rename the
+        file into place, so a slow download never blocks misses on other keys.
+        Objects larger than `max_object_bytes` are not kept.
+
+        :param key: Cache key, e.g. the storage path
+        :param version: Object version, e.g. the GCS generation
+        :param chunks: Iterable of bytes, consumed only if the object is not cached yet
+        :return: Binary file object, or None if the object was not cached
+        """
+        file = self._open_data(key, version)
+        if file is not None:
+            return file
+
+        data_path = self._data_path(key, version)
+        try:
+            tmp_path, size = self._write_tmp(os.path.dirname(data_path), chunks, limit=self.max_object_bytes)
+        except OSError as e:
+            logging.error(f"Disk cache write failed for {key}: {e}")
+            self._count('errors')
+            return None
+        if tmp_path is None:
+            self._count('skipped')
+            return None
+
+        # Satu file kunci per subdirektori (maksimal 256), hanya untuk pemeriksaan ulang dan rename
+        with self._flock(os.path.join(os.path.dirname(data_path), '.fill.lock')):
+            file = self._open_data(key, version)
+            if file is not None:
+                # Worker lain sudah menyimpan versi yang sama lebih dulu
+                self._remove(tmp_path)
+                return file
+            try:
+                os.replace(tmp_path, data_path)
+            except OSError as e:
+                self._remove(tmp_path)
+                logging.error(f"Disk cache write failed for {key}: {e}")
+                self._count('errors')
+                return None
+            self._count('fills')
+
+        self._account(size)
+        return self._open_data(key, version)
+
+    def invalidate(self, key):
+        """Remove the metadata and every cached version of key"""
+        base = self._base(key)
+        directory, prefix = os.path.split(base)
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if name.startswith(prefix + '.'):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except FileNotFoundError:
+                    pass
+
+    # Eviksi
+    def evict(self):
+        """
+        Scan the cache and delete least recently used files until it fits, holding
+        an exclusive lock so only one worker evicts at a time.
+
+        :return: Number of files evicted
+        """
+        with self._flock(os.path.join(self.directory, '.evict.lock')):
+            files = []
+            total = 0
+            now = time.time()
+            for entry in self._scan():
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # File sementara yang baru saja di-rename atau dihapus worker lain
+                if entry.name.startswith('.tmp'):
+                    if now - stat.st_mtime > STALE_TMP_SECONDS:
+                        self._remove(entry.path)
+                    continue
+                if entry.name.endswith('.data'):
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+
+            evicted = 0
+            if total > self.max_bytes:
+                target = self.max_bytes * EVICT_TARGET_RATIO
+                files.sort()
+                for _, size, path in files:
+                    if total <= target:
+                        break
+                    if self._remove(path):
+                        total -= size
+                        evicted += 1
+                        self._count('evictions')
+                        self._count('evicted_bytes', size)
+
+            with self._size_lock:
+                self._approx_bytes = total
+                self._entries = len(files) - evicted
+                self._scanned_at = time.monotonic()
+            return evicted
+
+    def stats(self):
+        """Counters of this process and the cache size seen by its last scan"""
+        with self._counter_lock:
+            counters = dict(self.counters)
+        lookups = counters['hits'] + counters['misses']
+        return {
+            **counters,
+            'hit_ratio': round(counters['hits'] / lookups, 3) if lookups else None,
+            'bytes': self._approx_bytes,
+            'entries': self._entries,
+            'max_bytes': self.max_bytes,
+            'directory': self.directory,
+        }
+
+    # Internal
+    def _base(self, key):
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def _data_path(self, key, version):
+        return f'{self._base(key)}.{version}.data'
+
+    def _open_data(self, key, version):
+        path = self._data_path(key, version)
+        try:
+            file = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)  # Waktu modifikasi dipakai sebagai urutan LRU
+        except OSError:
+            pass
+        return file
+
+    def _write_atomic(self, path, chunks, limit=None):
+        """Write chunks to a temporary file and rename it over path; returns the size, or None past limit"""
+        tmp_path, size = self._write_tmp(os.path.dirname(path), chunks, limit)
+        if tmp_path is None:
+            return None
+        try:
+            os.replace(tmp_path, path)
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        return size
+
+    def _write_tmp(self, directory, chunks, limit=None):
+        """Write chunks to a new temporary file in directory; returns (path, size), or (None, None) past limit"""
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp', dir=directory)
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                for chunk in chunks:
+                    size += len(chunk)
+                    if limit is not None and size > limit:
+                        break
+                    file.write(chunk)
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        if limit is not None and size > limit:
+            self._remove(tmp_path)
+            return None, None
+        return tmp_path, size
+
+    def _account(self, size):
+        with self._size_lock:
+            if self._approx_bytes is not None:
+                self._approx_bytes += size
+            due = (
+                self._approx_bytes is None
+                or self._approx_bytes > self.max_bytes
+                or time.monotonic() - self._scanned_at > SCAN_INTERVAL
+            )
+        if due:
+            self.evict()
+
+    def _scan(self):
+        for shard in os.scandir(self.directory):
+            if shard.is_dir():
+                yield from os.scandir(shard.path)
+
+    def _count(self, name, amount=1):
+        with self._counter_lock:
+            self.counters[name] += amount
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    @staticmethod
+    @contextmanager
+    def _flock(path):
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a') as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
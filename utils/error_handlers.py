@@ -1,5 +1,6 @@
 from flask import jsonify
 from flask_jwt_extended.exceptions import NoAuthorizationError, InvalidHeaderError
+from utils.pagination import PaginationError
 
 def register_error_handlers(app):
     @app.errorhandler(NoAuthorizationError)
@@ -15,3 +16,10 @@ def register_error_handlers(app):
             "status": False,
             "message": "Invalid Authorization Header. Please check the token format."
         }), 401
+
+    @app.errorhandler(PaginationError)
+    def handle_pagination_error(e):
+        return jsonify({
+            "status": False,
+            "message": str(e)
+        }), 400
@@ -0,0 +1,165 @@
+import json
+import queue
+import logging
+import threading
+from flask import current_app
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import Session
+
+class MemorySubscription:
+    def __init__(self, backend, channels, maxsize):
+        self.backend = backend
+        self.channels = channels
+        self.queue = queue.Queue(maxsize=maxsize)
+
+    def get(self, timeout=None):
+        """Next (type, data) message, or None after `timeout` seconds"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.backend._unsubscribe(self)
+
+class MemoryBackend:
+    """
+    In-process fan-out. Only subscribers in the same worker process receive the
+    message, which is enough for a single worker, local runs and tests.
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(message)
+            except queue.Full:
+                logging.warning(f"Event dropped for a slow subscriber on {channel}")
+
+    def subscribe(self, channels):
+        subscription = MemorySubscription(self, channels, self.queue_size)
+        with self._lock:
+            for channel in channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+class RedisSubscription:
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+
+    def get(self, timeout=None):
+        message = self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            return None
+        payload = json.loads(message['data'])
+        return payload['type'], payload['data']
+
+    def close(self):
+        self.pubsub.close()
+
+class RedisBackend:
+    """Fan-out across gunicorn workers and instances through Redis pub/sub"""
+
+    def __init__(self, url):
+        import redis  # Dependensi opsional, hanya untuk backend 'redis'
+        self.client = redis.Redis.from_url(url)
+
+    def publish(self, channel, message):
+        event_type, data = message
+        self.client.publish(channel, json.dumps({'type': event_type, 'data': data}))
+
+    def subscribe(self, channels):
+        pubsub = self.client.pubsub()
+        pubsub.subscribe(*channels)
+        return RedisSubscription(pubsub)
+
+class EventBroker:
+    """
+    Publish incident events to per-institution and per-driver channels.
+
+    Backends, chosen with the EVENT_BROKER_BACKEND config:
+    - 'memory' : in-process queues, only for a single process (default without gunicorn)
+    - 'redis'  : Redis pub/sub at EVENT_BROKER_REDIS_URL, shared by all workers
+                 (default and required when GUNICORN_WORKERS > 1)
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        name = app.config.get('EVENT_BROKER_BACKEND', 'memory')
+        if name == 'memory':
+            # Pelanggan di worker lain tidak akan pernah menerima event
+            if app.config.get('GUNICORN_WORKERS', 1) > 1:
+                raise ValueError(
+                    "EVENT_BROKER_BACKEND 'memory' only reaches subscribers in the publishing process; "
+                    "use 'redis' when GUNICORN_WORKERS > 1"
+                )
+            self.backend = MemoryBackend(queue_size=int(app.config.get('EVENT_QUEUE_SIZE', 100)))
+        elif name == 'redis':
+            self.backend = RedisBackend(app.config['EVENT_BROKER_REDIS_URL'])
+        else:
+            raise ValueError(f"Unknown EVENT_BROKER_BACKEND: {name}")
+
+        # Event hanya dikirim setelah transaksi berhasil di-commit
+        if not sa_event.contains(Session, 'after_commit', _publish_pending):
+            sa_event.listen(Session, 'after_commit', _publish_pending)
+            sa_event.listen(Session, 'after_rollback', _discard_pending)
+
+        app.extensions['event_broker'] = self
+
+    def publish(self, channels, event_type, data):
+        """
+        Send an event now.
+
+        :param channels: Channel names, e.g. institution_channel(1)
+        :param event_type: Event name, e.g. 'incident.reported'
+        :param data: JSON-serializable payload
+        """
+        message = (event_type, current_app.json.dumps(data))
+        for channel in channels:
+            try:
+                self.backend.publish(channel, message)
+            except Exception as e:
+                logging.error(f"Failed to publish {event_type} to {channel}: {e}")
+
+    def publish_on_commit(self, session, channels, event_type, data):
+        """Send an event once the session's current transaction commits; dropped on rollback"""
+        session.info.setdefault('pending_events', []).append((list(channels), event_type, data))
+
+    def subscribe(self, channels):
+        return self.backend.subscribe(list(channels))
+
+def _publish_pending(session):
+    pending = session.info.pop('pending_events', None)
+    if not pending:
+        return
+    broker = current_app.extensions['event_broker']
+    for channels, event_type, data in pending:
+        broker.publish(channels, event_type, data)
+
+def _discard_pending(session):
+    session.info.pop('pending_events', None)
+
+def institution_channel(institution_id):
+    return f'institution:{institution_id}'
+
+def driver_channel(driver_id):
+    return f'driver:{driver_id}'
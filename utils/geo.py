@@ -0,0 +1,92 @@
+import math
+import numpy as np
+
+# Jari-jari rata-rata bumi dalam kilometer
+EARTH_RADIUS_KM = 6371.0088
+
+# Ukuran sel grid dalam derajat (~11 km di khatulistiwa).
+# Mengubah nilai ini mengharuskan menjalankan ulang `flask backfill-institution-grid`.
+GRID_CELL_DEGREES = 0.1
+
+def grid_cell(latitude, longitude):
+    """
+    Grid bucket of a coordinate, stored on the row so proximity queries can use an index.
+
+    :param latitude: Latitude in degrees
+    :param longitude: Longitude in degrees
+    :return: Tuple of (grid_lat, grid_lng)
+    """
+    return (
+        math.floor(float(latitude) / GRID_CELL_DEGREES),
+        math.floor(float(longitude) / GRID_CELL_DEGREES)
+    )
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    Smallest latitude/longitude box that contains the circle around the point.
+
+    :param latitude: Latitude of the center in degrees
+    :param longitude: Longitude of the center in degrees
+    :param radius_km: Radius in kilometers
+    :return: Tuple of (min_lat, max_lat, min_lng, max_lng)
+    """
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat = max(latitude - delta_lat, -90.0)
+    max_lat = min(latitude + delta_lat, 90.0)
+
+    # Dekat kutub lingkaran mencakup semua bujur
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if cos_lat <= 1e-9:
+        return min_lat, max_lat, -180.0, 180.0
+
+    delta_lng = min(math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)), 180.0)
+    return min_lat, max_lat, max(longitude - delta_lng, -180.0), min(longitude + delta_lng, 180.0)
+
+def grid_range(min_lat, max_lat, min_lng, max_lng):
+    """
+    Grid cells covering a bounding box.
+
+    :return: Tuple of (min_grid_lat, max_grid_lat, min_grid_lng, max_grid_lng)
+    """
+    min_grid_lat, min_grid_lng = grid_cell(min_lat, min_lng)
+    max_grid_lat, max_grid_lng = grid_cell(max_lat, max_lng)
+    return min_grid_lat, max_grid_lat, min_grid_lng, max_grid_lng
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """
+    Great-circle distance from one point to many points.
+
+    :param latitude: Latitude of the origin in degrees
+    :param longitude: Longitude of the origin in degrees
+    :param latitudes: Sequence of latitudes in degrees
+    :param longitudes: Sequence of longitudes in degrees
+    :return: NumPy array of distances in kilometers
+    """
+    lat1 = math.radians(latitude)
+    lng1 = math.radians(longitude)
+    lat2 = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lng2 = np.radians(np.asarray(longitudes, dtype=np.float64))
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def nearest(latitude, longitude, rows, radius_km, limit):
+    """
+    Rank candidate rows by exact distance and keep those inside the radius.
+
+    :param rows: Rows with `latitude` and `longitude` attributes
+    :return: List of (row, distance_km), nearest first
+    """
+    if not rows:
+        return []
+
+    distances = haversine_km(
+        latitude,
+        longitude,
+        [row.latitude for row in rows],
+        [row.longitude for row in rows]
+    )
+
+    inside = np.flatnonzero(distances <= radius_km)
+    order = inside[np.argsort(distances[inside], kind='stable')][:limit]
+    return [(rows[i], float(distances[i])) for i in order]
@@ -0,0 +1,78 @@
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+def _gevent_patched():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('threading')
+
+class JobQueue:
+    """
+    Run slow work (uploads, classification, email) outside the request thread.
+
+    Backends, chosen with the JOB_QUEUE_BACKEND config:
+    - 'thread' : in-process thread pool (default)
+    - 'sync'   : run the job immediately in the caller, for local runs and tests
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.backend = 'thread'
+        self.max_workers = 4
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.backend = app.config.get('JOB_QUEUE_BACKEND', 'thread')
+        self.max_workers = int(app.config.get('JOB_QUEUE_WORKERS', 4))
+
+        if self.backend not in ('thread', 'sync'):
+            raise ValueError(f"Unknown JOB_QUEUE_BACKEND: {self.backend}")
+
+        app.extensions['job_queue'] = self
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Queue func(*args, **kwargs) to run inside an application context
+
+        :return: Future of the job, or None when run synchronously
+        """
+        if self.backend == 'sync':
+            self._run(func, args, kwargs)
+            return None
+
+        return self._get_executor().submit(self._run, func, args, kwargs)
+
+    def _get_executor(self):
+        # Thread pools do not survive fork, so create one per worker process
+        pid = os.getpid()
+        if self._executor is None or self._executor_pid != pid:
+            with self._lock:
+                if self._executor is None or self._executor_pid != pid:
+                    self._executor = self._create_executor()
+                    self._executor_pid = pid
+        return self._executor
+
+    def _create_executor(self):
+        # Under gevent workers threading is patched into greenlets, so CPU-bound jobs
+        # (classification) would stall the event loop; use gevent's native thread pool
+        if _gevent_patched():
+            from gevent.threadpool import ThreadPoolExecutor as NativeThreadPoolExecutor
+            return NativeThreadPoolExecutor(max_workers=self.max_workers)
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+
+    def _run(self, func, args, kwargs):
+        with self.app.app_context():
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                logging.exception(f"Job {func.__name__} failed: {e}")
@@ -0,0 +1,125 @@
+import dataclasses
+import decimal
+import uuid
+from datetime import date, datetime, time, timezone
+from enum import Enum
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson bersifat opsional
+    orjson = None
+
+_DAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+def http_date(value):
+    """
+    Same output as werkzeug.http.http_date for dates and datetimes, without the
+    email.utils round trip that dominates large responses.
+
+    :param value: date or datetime; naive datetimes are treated as UTC
+    :return: RFC 822 date string, e.g. "Mon, 19 Oct 2026 00:18:45 GMT"
+    """
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        hour, minute, second = value.hour, value.minute, value.second
+    else:
+        hour = minute = second = 0
+
+    return (
+        f'{_DAYS[value.weekday()]}, {value.day:02d} {_MONTHS[value.month - 1]} {value.year:04d} '
+        f'{hour:02d}:{minute:02d}:{second:02d} GMT'
+    )
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """
+    Flask's stdlib JSON provider with a configurable datetime format.
+
+    - 'http' : RFC 822 / HTTP date, the Flask default (e.g. "Mon, 19 Oct 2026 00:18:45 GMT")
+    - 'iso'  : ISO 8601 (e.g. "2026-10-19T00:18:45+07:00")
+    """
+
+    datetime_format = 'http'
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.datetime_format = app.config.get('JSON_DATETIME_FORMAT', 'http')
+        if self.datetime_format == 'iso':
+            self.default = self._default_iso
+
+    @staticmethod
+    def _default_iso(o):
+        if isinstance(o, (date, time)):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+class OrjsonProvider(StdlibJSONProvider):
+    """
+    Flask JSON provider backed by orjson.
+
+    Output matches the stdlib provider: sorted keys, Decimal as string, Enum as
+    its value and datetimes as HTTP dates unless JSON_DATETIME_FORMAT is 'iso',
+    in which case orjson's native RFC 3339 encoder is used.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+        if self.datetime_format != 'iso':
+            # Tanggal diserahkan ke _default agar tetap berformat HTTP date
+            self.option |= orjson.OPT_PASSTHROUGH_DATETIME
+
+    @staticmethod
+    def _default(o):
+        if isinstance(o, date):
+            return http_date(o)
+        if isinstance(o, time):
+            return o.isoformat()
+        if isinstance(o, (decimal.Decimal, uuid.UUID)):
+            return str(o)
+        if isinstance(o, Enum):
+            return o.value
+        if dataclasses.is_dataclass(o) and not isinstance(o, type):
+            return dataclasses.asdict(o)
+        if hasattr(o, '__html__'):
+            return str(o.__html__())
+        raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+    def dumps_bytes(self, obj, indent=False):
+        """Serialize to UTF-8 bytes without an intermediate str"""
+        option = self.option | orjson.OPT_INDENT_2 if indent else self.option
+        return orjson.dumps(obj, default=self._default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        # Argumen khusus json.dumps (separators, ensure_ascii, ...) tidak berlaku untuk orjson
+        return self.dumps_bytes(obj, indent=bool(kwargs.get('indent'))).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumps_bytes(obj, indent=indent) + b'\n', mimetype=self.mimetype)
+
+def init_json_provider(app):
+    """
+    Install the JSON provider chosen by the JSON_PROVIDER config.
+
+    - 'auto'   : orjson when installed, otherwise the stdlib (default)
+    - 'orjson' : orjson, fails if it is not installed
+    - 'stdlib' : Python's json module
+    """
+    name = app.config.get('JSON_PROVIDER', 'auto')
+    if name not in ('auto', 'orjson', 'stdlib'):
+        raise ValueError(f"Unknown JSON_PROVIDER: {name}")
+    if name == 'orjson' and orjson is None:
+        raise RuntimeError("JSON_PROVIDER is 'orjson' but orjson is not installed")
+
+    use_orjson = orjson is not None and name != 'stdlib'
+    app.json = OrjsonProvider(app) if use_orjson else StdlibJSONProvider(app)
+    return app.json
@@ -0,0 +1,86 @@
+import json
+import base64
+import binascii
+from flask import request, current_app
+
+class PaginationError(ValueError):
+    """Raised when the limit or cursor query parameter is invalid"""
+
+def encode_cursor(value):
+    """
+    Encode the last key of a page into an opaque cursor.
+
+    :param value: Key value of the last row on the page
+    :return: URL-safe cursor string
+    """
+    raw = json.dumps({'k': value}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor.
+
+    :param cursor: Cursor string from the `cursor` query parameter
+    :return: Key value of the last row of the previous page
+    :raises PaginationError: When the cursor is malformed or its key is not an integer
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value = json.loads(base64.urlsafe_b64decode(padded.encode()))['k']
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise PaginationError('Cursor tidak valid.')
+
+    # Kunci halaman selalu ID bilangan bulat, nilai lain tidak boleh sampai ke kueri
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise PaginationError('Cursor tidak valid.')
+    return value
+
+def get_pagination_args():
+    """
+    Read `limit` and `cursor` from the query string.
+
+    :return: Tuple of (limit, cursor)
+    """
+    default_limit = current_app.config.get('PAGINATION_DEFAULT_LIMIT', 20)
+    max_limit = current_app.config.get('PAGINATION_MAX_LIMIT', 100)
+
+    limit = request.args.get('limit', default_limit)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise PaginationError('Limit harus berupa angka.')
+
+    if limit < 1 or limit > max_limit:
+        raise PaginationError(f'Limit harus antara 1 dan {max_limit}.')
+
+    return limit, request.args.get('cursor') or None
+
+def paginate(query, column, key=None, descending=False):
+    """
+    Keyset (cursor) pagination over a unique, indexed column.
+
+    Instead of OFFSET, each page continues after the key of the last row of the
+    previous page, so every page costs one index range scan.
+
+    :param query: SQLAlchemy query to paginate
+    :param column: Unique column to order and seek by, e.g. Incident.id
+    :param key: Attribute name of the column on the result rows, if it is labeled
+    :param descending: Newest first when True
+    :return: Tuple of (rows, next_cursor); next_cursor is None on the last page
+    """
+    limit, cursor = get_pagination_args()
+    key = key or column.key
+
+    if cursor is not None:
+        last = decode_cursor(cursor)
+        query = query.filter(column < last if descending else column > last)
+
+    query = query.order_by(column.desc() if descending else column.asc())
+
+    # Ambil satu baris lebih untuk mengetahui apakah masih ada halaman berikutnya
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    return rows, encode_cursor(getattr(rows[-1], key))
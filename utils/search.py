@@ -0,0 +1,245 @@
+import re
+import time
+import threading
+from collections import defaultdict
+from flask import request, current_app
+from sqlalchemy import case, inspect
+from sqlalchemy.dialects.mysql import match
+
+from app.extensions import db, jobs
+from utils.pagination import get_pagination_args
+
+# Kata yang lebih pendek dari ini diabaikan oleh FULLTEXT InnoDB (innodb_ft_min_token_size)
+FULLTEXT_MIN_TOKEN = 3
+
+# Proporsi minimal trigram kata kunci yang harus ada pada baris (toleransi salah ketik)
+NGRAM_MIN_SIMILARITY = 0.7
+
+def tokenize(text):
+    """Lowercase words of a text, without punctuation"""
+    return re.findall(r'\w+', str(text or '').lower())
+
+def trigrams(text):
+    """
+    Trigrams of every word, padded like pg_trgm so short words and prefixes still match.
+
+    :param text: Text to split
+    :return: Set of trigrams
+    """
+    grams = set()
+    for word in tokenize(text):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+class NgramIndex:
+    """
+    In-process trigram inverted index over one text column.
+
+    Used when the database has no FULLTEXT support (e.g. SQLite in tests). The
+    index is built on first use, kept up to date by ORM events in this process
+    and rebuilt as a background job after `ttl` seconds to pick up writes from
+    other workers; searches keep using the old index until the new one is ready.
+    """
+
+    def __init__(self, column, ttl=300):
+        self.column = column
+        self.model = column.class_
+        self.primary_key = inspect(self.model).primary_key[0]
+        self.ttl = float(ttl)
+        self._postings = defaultdict(set)
+        self._texts = {}
+        self._built_at = None
+        self._pending = None  # Perubahan selama pembangunan ulang, None jika tidak sedang dibangun
+        self._lock = threading.RLock()
+
+        for event_name in ('after_insert', 'after_update'):
+            db.event.listen(self.model, event_name, self._on_write)
+        db.event.listen(self.model, 'after_delete', self._on_delete)
+
+    def search(self, term, prefix=False, limit=None, allowed=None):
+        """
+        Rank the primary keys of rows that match the term.
+
+        :param term: Search text
+        :param prefix: Every word of the term must start a word of the row (autocomplete)
+        :param limit: Maximum number of keys
+        :param allowed: Only rank these keys (rows visible to the caller), applied before the limit
+        :return: List of primary keys, best match first
+        """
+        self._ensure_built()
+
+        words = tokenize(term)
+        term_grams = trigrams(term)
+        if not words:
+            return []
+
+        needle = ' '.join(words)
+        with self._lock:
+            # Hitung trigram yang sama untuk setiap kandidat
+            shared = defaultdict(int)
+            for gram in term_grams:
+                for key in self._postings.get(gram, ()):
+                    shared[key] += 1
+
+            ranked = []
+            for key, count in shared.items():
+                if allowed is not None and key not in allowed:
+                    continue
+                text = self._texts[key]
+                text_words = text.split()
+
+                if prefix:
+                    if not all(any(text_word.startswith(word) for text_word in text_words) for word in words):
+                        continue
+                    score = 2.0 + count / len(term_grams)
+                else:
+                    score = count / len(term_grams)
+                    if needle in text:
+                        score += 1.0  # Perilaku lama (ILIKE '%nama%') tetap cocok
+                    elif score < NGRAM_MIN_SIMILARITY:
+                        continue
+
+                if text.startswith(needle):
+                    score += 0.5
+                ranked.append((-score, len(text), key))
+
+        ranked.sort()
+        return [key for _, _, key in ranked[:limit]]
+
+    def _ensure_built(self):
+        if self._built_at is None:
+            # Belum ada indeks yang bisa dipakai, bangun sekarang
+            with self._lock:
+                if self._built_at is None:
+                    self._postings, self._texts = self._build()
+                    self._built_at = time.monotonic()
+            return
+
+        if time.monotonic() - self._built_at >= self.ttl:
+            with self._lock:
+                if self._pending is not None:
+                    return  # Sudah dibangun ulang oleh job lain
+                self._pending = []
+            jobs.submit(self.rebuild)
+
+    def rebuild(self):
+        """Rebuild the index from the database and swap it in, keeping writes made meanwhile"""
+        try:
+            postings, texts = self._build()
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+
+        with self._lock:
+            pending, self._pending = self._pending or [], None
+            self._postings, self._texts = postings, texts
+            for key, value in pending:
+                self._remove(key)
+                if value is not None:
+                    self._add(key, value)
+            self._built_at = time.monotonic()
+
+    def _build(self):
+        postings = defaultdict(set)
+        texts = {}
+        for key, value in db.session.query(self.primary_key, self.column):
+            texts[key] = ' '.join(tokenize(value))
+            for gram in trigrams(value):
+                postings[gram].add(key)
+        return postings, texts
+
+    def _add(self, key, value):
+        self._texts[key] = ' '.join(tokenize(value))
+        for gram in trigrams(value):
+            self._postings[gram].add(key)
+
+    def _on_write(self, mapper, connection, target):
+        if self._built_at is None:
+            return
+        key = getattr(target, self.primary_key.key)
+        value = getattr(target, self.column.key)
+        with self._lock:
+            self._remove(key)
+            self._add(key, value)
+            if self._pending is not None:
+                self._pending.append((key, value))
+
+    def _on_delete(self, mapper, connection, target):
+        if self._built_at is None:
+            return
+        key = getattr(target, self.primary_key.key)
+        with self._lock:
+            self._remove(key)
+            if self._pending is not None:
+                self._pending.append((key, None))
+
+    def _remove(self, key):
+        text = self._texts.pop(key, None)
+        if text is None:
+            return
+        for gram in trigrams(text):
+            self._postings.get(gram, set()).discard(key)
+
+# Indeks n-gram per kolom, dibuat saat pertama kali digunakan
+_ngram_indexes = {}
+_ngram_lock = threading.Lock()
+
+def get_ngram_index(column):
+    key = (column.class_, column.key)
+    if key not in _ngram_indexes:
+        with _ngram_lock:
+            if key not in _ngram_indexes:
+                _ngram_indexes[key] = NgramIndex(column, ttl=current_app.config.get('SEARCH_INDEX_TTL', 300))
+    return _ngram_indexes[key]
+
+def get_search_backend():
+    """
+    Search backend from the SEARCH_BACKEND config: 'fulltext', 'ngram' or 'auto'
+    ('fulltext' on MySQL, 'ngram' elsewhere)
+    """
+    backend = current_app.config.get('SEARCH_BACKEND', 'auto')
+    if backend == 'auto':
+        return 'fulltext' if db.engine.dialect.name in ('mysql', 'mariadb') else 'ngram'
+    if backend not in ('fulltext', 'ngram'):
+        raise ValueError(f"Unknown SEARCH_BACKEND: {backend}")
+    return backend
+
+def search(query, column, term):
+    """
+    Filter a list query by a text column and rank it by relevance.
+
+    Reads `limit` and `mode` (`prefix` for autocomplete) from the query string.
+    Ranked results are a single page, so the returned cursor is always None.
+
+    :param query: SQLAlchemy query of the list route
+    :param column: Indexed text column to search, e.g. User.name
+    :param term: Search text
+    :return: Tuple of (rows, next_cursor)
+    """
+    limit, _ = get_pagination_args()
+    prefix = request.args.get('mode') == 'prefix'
+
+    if get_search_backend() == 'fulltext':
+        words = [word for word in tokenize(term) if len(word) >= FULLTEXT_MIN_TOKEN]
+        if not words:
+            # Kata terlalu pendek untuk FULLTEXT, gunakan awalan yang bisa memakai indeks B-tree
+            query = query.filter(column.startswith(term.strip(), autoescape=True)).order_by(column)
+        else:
+            # Mode prefix mewajibkan semua kata, mode biasa mengurutkan berdasarkan kecocokan terbanyak
+            operator = '+' if prefix else ''
+            relevance = match(column, against=' '.join(f'{operator}{word}*' for word in words)).in_boolean_mode()
+            query = query.filter(relevance > 0).order_by(relevance.desc())
+        return query.limit(limit).all(), None
+
+    # Batasi kandidat ke baris yang lolos filter route (mis. driver satu instansi) sebelum dipotong,
+    # agar kecocokan yang sah tidak tersingkir oleh baris milik pengguna lain
+    index = get_ngram_index(column)
+    allowed = {key for key, in query.with_entities(index.primary_key)}
+    keys = index.search(term, prefix=prefix, limit=current_app.config.get('SEARCH_MAX_CANDIDATES', 500), allowed=allowed)
+    if not keys:
+        return [], None
+
+    rank = case({key: position for position, key in enumerate(keys)}, value=index.primary_key)
+    return query.filter(index.primary_key.in_(keys)).order_by(rank).limit(limit).all(), None
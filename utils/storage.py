@@ -1,44 +1,194 @@
 import os
 import base64
-import string
-import random
+import hashlib
 import time
-import magic
+import logging
+import tempfile
+from datetime import datetime, timedelta
 
-from google.cloud import storage
-from google.oauth2 import service_account
+from app.extensions import db, jobs
+from app.models.stored_file import StoredFile
+from utils.disk_cache import DiskLRUCache
+from utils.images import ImageProcessor, THUMBNAIL_SIZES, thumbnail_path
+from utils.storage_backends import FileStat, create_backend
 
 class Storage:
-    def __init__(self):
-        # Pastikan path kredensial benar
-        status = os.environ.get("Environment")
-
-        if status == "production":
-            GOOGLE_APPLICATION_CREDENTIALS = service_account.Credentials.from_service_account_file(
-                "/SECRETS/SERVICE_ACCOUNT")
-        else:
-            GOOGLE_APPLICATION_CREDENTIALS = service_account.Credentials.from_service_account_file(
-                os.environ.get("GOOGLE_APPLICATION_CREDENTIALS"))
-        
-        self.client = storage.Client(credentials=GOOGLE_APPLICATION_CREDENTIALS)
-        self.bucket = self.client.bucket(os.getenv('BUCKET_NAME'))
+    def __init__(self, backend=None):
+        # Backend dipilih lewat STORAGE_BACKEND; kredensial dan client baru dibuat saat pertama dipakai
+        self.backend = backend or create_backend()
+
+        # Normalisasi gambar dan pembuatan thumbnail
+        self.images = ImageProcessor()
+
+        # Ukuran potongan saat membaca file (kelipatan 256 KiB sesuai GCS)
+        self.chunk_size = int(os.getenv('STORAGE_CHUNK_SIZE', 1024 * 1024))
+
+        # Cache disk lokal untuk file yang sering dibaca (STORAGE_CACHE_MAX_BYTES=0 untuk menonaktifkan).
+        # Backend lokal dan memori sudah cepat, cache hanya dipakai untuk backend jarak jauh.
+        self.cache = None
+        self.cache_stat_ttl = float(os.getenv('STORAGE_CACHE_STAT_TTL', 300))
+        cache_bytes = int(os.getenv('STORAGE_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+        if cache_bytes > 0 and self.backend.remote:
+            try:
+                self.cache = DiskLRUCache(
+                    os.getenv('STORAGE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'instahelp-storage-cache')),
+                    cache_bytes,
+                    max_object_bytes=int(os.getenv('STORAGE_CACHE_MAX_OBJECT_BYTES', 16 * 1024 * 1024))
+                )
+            except OSError as e:
+                logging.error(f"Storage cache disabled: {e}")
 
     def getFile(self, filepath):
-        return self.bucket.blob(filepath)
+        """Whole file as bytes, or None if it does not exist"""
+        return self.backend.get(filepath)
 
     def deleteFile(self, filepath):
+        """
+        Drop one reference to an uploaded file. The file and its thumbnails are
+        deleted once nothing references it any more. Commits the current transaction.
+
+        :return: True if the file was removed from storage
+        """
         try:
-            blob = self.bucket.blob(filepath)
-            blob.delete()
-            return True
+            # Baris tetap terkunci sampai commit, unggahan file yang sama menunggu
+            remaining = StoredFile.release(filepath)
+            if remaining:
+                db.session.commit()
+                return False
+
+            deleted = self.backend.delete(filepath)
+            if self.cache is not None:
+                self.cache.invalidate(filepath)
+
+            # Hapus juga thumbnail di sampingnya
+            for size in THUMBNAIL_SIZES:
+                self.backend.delete(thumbnail_path(filepath, size))
+                if self.cache is not None:
+                    self.cache.invalidate(thumbnail_path(filepath, size))
+
+            db.session.commit()
+            return deleted
         except Exception as e:
+            db.session.rollback()
             print(f"Error deleting file: {e}")
             return False
 
     def fileExists(self, filepath):
-        return self.bucket.blob(filepath).exists()
+        return self.backend.exists(filepath)
+
+    def publicUrl(self, filepath):
+        """Permanent URL of an uploaded file"""
+        return self.backend.public_url(filepath)
+
+    def signedUrl(self, filepath, expires_in=timedelta(minutes=15)):
+        """URL the client can fetch the file from directly, valid for expires_in"""
+        return self.backend.signed_url(filepath, expires_in)
+
+    def statFile(self, filepath):
+        """
+        Metadata of a file in one request, without downloading it. Served from the
+        disk cache for STORAGE_CACHE_STAT_TTL seconds after the last check.
+
+        :param filepath: Path of the file in storage
+        :return: FileStat, or None if the file does not exist
+        """
+        if self.cache is not None:
+            meta = self.cache.get_meta(filepath)
+            if meta is not None and time.time() - meta['checked_at'] < self.cache_stat_ttl:
+                return FileStat(
+                    path=filepath,
+                    size=meta['size'],
+                    content_type=meta['content_type'],
+                    etag=meta['etag'],
+                    updated=datetime.fromisoformat(meta['updated']) if meta['updated'] else None,
+                    generation=meta['generation']
+                )
+
+        stat = self.backend.stat(filepath)
+        if stat is None:
+            if self.cache is not None:
+                self.cache.invalidate(filepath)
+            return None
+
+        self._cache_stat(stat)
+        return stat
+
+    def streamFile(self, filepath, start=0, end=None, generation=None, size=None):
+        """
+        Read a file in chunks of STORAGE_CHUNK_SIZE bytes, so memory stays bounded.
+
+        With a generation, a whole-file read copies the object to the disk cache
+        (once per instance) and later reads are served from local disk. Range reads
+        on a cache miss and objects larger than the cache limit are streamed
+        straight from the backend, so nothing is downloaded twice.
+
+        :param filepath: Path of the file in storage
+        :param start: First byte to read
+        :param end: Byte after the last one to read (default: end of file)
+        :param generation: Object generation from statFile, so a file replaced mid-read is not mixed
+        :param size: Object size from statFile, if known
+        :return: Generator of bytes
+        """
+        if self.cache is not None and generation is not None:
+            file = self.cache.open(filepath, generation)
+            whole_file = start == 0 and (end is None or end == size)
+            cacheable = size is None or size <= self.cache.max_object_bytes
+            if file is None and whole_file and cacheable:
+                file = self.cache.fill(filepath, generation, self._stream_from_backend(filepath, generation=generation))
+            if file is not None:
+                with file:
+                    yield from self._read_range(file, start, end)
+                return
+
+        yield from self._stream_from_backend(filepath, start, end, generation)
+
+    def cacheStats(self):
+        """Disk cache counters, or None when the cache is disabled"""
+        return self.cache.stats() if self.cache is not None else None
+
+    def _stream_from_backend(self, filepath, start=0, end=None, generation=None):
+        with self.backend.open(filepath, generation=generation) as reader:
+            yield from self._read_range(reader, start, end)
+
+    def _read_range(self, reader, start, end):
+        if start:
+            reader.seek(start)
+        remaining = None if end is None else end - start
+        while remaining is None or remaining > 0:
+            size = self.chunk_size if remaining is None else min(self.chunk_size, remaining)
+            chunk = reader.read(size)
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+    def _cache_stat(self, stat):
+        if self.cache is None:
+            return
+        try:
+            self.cache.set_meta(stat.path, {
+                **stat._asdict(),
+                'updated': stat.updated.isoformat() if stat.updated else None,
+                'checked_at': time.time(),
+            })
+        except OSError as e:
+            logging.error(f"Storage cache metadata write failed: {e}")
 
     def uploadFile(self, file_base64, dir=''):
+        """
+        Store an uploaded picture, re-encoded without metadata and no larger than
+        IMAGE_MAX_DIMENSION, with its thumbnails next to it (see thumbnail_path).
+
+        Files are named after the SHA-256 of the uploaded bytes; a picture that is
+        already stored is not processed or written again, only its reference count
+        in StoredFile grows. The reference is added in the current transaction,
+        commit it together with the row that stores the returned path.
+
+        :param file_base64: Base64 image, optionally with a data URL prefix
+        :param dir: Directory in storage for new files, e.g. 'incidents'
+        :return: Path of the stored picture, or None if it could not be stored
+        """
         try:
             # Pisahkan prefix jika ada
             if file_base64.startswith('data:image'):
@@ -46,36 +196,68 @@ class Storage:
             
             # Konversi data base64 menjadi bytes
             file_bytes = base64.b64decode(file_base64)
+            digest = hashlib.sha256(file_bytes).hexdigest()
+
+            # Gambar yang sama (mis. unggahan ulang dari aplikasi) tidak perlu diproses lagi
+            image = None
+            stored = StoredFile.find(digest)
+            if stored is not None:
+                path, content_type, size = stored.path, stored.content_type, stored.size
+            else:
+                # Dekode ulang gambar di pool, tipe file ditentukan oleh hasil normalisasi
+                image = self.images.process(file_bytes)
+                path, content_type, size = f'{dir}/{digest}.{image.ext}', image.content_type, len(image.data)
+
+            # Savepoint: jika upload gagal, penambahan referensi ikut dibatalkan
+            with db.session.begin_nested():
+                stored = StoredFile.acquire(digest, path, content_type, size)
+
+                # Simpan file jika ini referensi pertama, atau file hilang dari storage (tanpa metadata cache)
+                if stored.ref_count == 1 or self.backend.stat(stored.path) is None:
+                    if image is None:
+                        image = self.images.process(file_bytes)
+                    stat = self.backend.upload(stored.path, image.data, image.content_type)
+                    self._cache_upload(stat, image.data)
+
+                    # Thumbnail diunggah oleh antrean job, pool gambar tetap bebas untuk permintaan lain
+                    jobs.submit(self._upload_thumbnails, stored.path, image)
             
-            # Dapatkan ekstensi file
-            ext = self._get_file_extension(file_bytes)
-            filename = self._generateFilename() + '.' + ext
-            
-            # Simpan file ke cloud
-            full_path = f'{dir}/{filename}'
-            blob = self.bucket.blob(full_path)
-            
-            # Upload dengan tipe konten yang sesuai
-            content_type = f'image/{ext}'
-            blob.upload_from_string(file_bytes, content_type=content_type)
-            
-            # Set file menjadi publik setelah diupload
-            blob.make_public()
-            
-            return full_path  # Kembalikan path file untuk disimpan di database
+            return stored.path  # Kembalikan path file untuk disimpan di database
 
         except Exception as e:
             print(f"Upload error: {e}")
             return None
 
-    def _get_file_extension(self, file_data):
-        file_signature = magic.from_buffer(file_data, mime=True)
-        return file_signature.split('/')[1]
-    
-    def _generateFilename(self):
-        timestamp = str(int(time.time()))
-        random_chars = ''.join(random.choices(string.ascii_letters + string.digits, k=8))
-        return timestamp + '_' + random_chars
+    def generateThumbnails(self, filepath):
+        """
+        Render and store the thumbnails of a picture already in storage, e.g. one
+        uploaded before thumbnails existed. The original is left untouched.
+
+        :return: True if the thumbnails were stored
+        """
+        file_bytes = self.backend.get(filepath)
+        if file_bytes is None:
+            return False
+        image = self.images.process(file_bytes)
+        return self._upload_thumbnails(filepath, image)
+
+    def _upload_thumbnails(self, filepath, image):
+        try:
+            for size, data in image.thumbnails.items():
+                stat = self.backend.upload(thumbnail_path(filepath, size), data, image.content_type)
+                self._cache_upload(stat, data)
+            return True
+        except Exception as e:
+            logging.error(f"Thumbnail upload failed for {filepath}: {e}")
+            return False
+
+    def _cache_upload(self, stat, data):
+        # Simpan juga ke cache disk, file baru biasanya segera dilihat
+        if self.cache is not None and stat.generation is not None:
+            self._cache_stat(stat)
+            file = self.cache.fill(stat.path, stat.generation, [data])
+            if file is not None:
+                file.close()
 
 # Buat instance global
 storage_manager = Storage()
\ No newline at end of file
@@ -0,0 +1,255 @@
+import io
+import os
+import mimetypes
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+FileStat = namedtuple('FileStat', ['path', 'size', 'content_type', 'etag', 'updated', 'generation'])
+
+class StorageBackend:
+    """
+    Where uploaded files live. Paths are relative, e.g. 'incidents/123_abc.png'.
+
+    - stat       : metadata without reading the file, None if missing
+    - exists     : whether the file exists
+    - get        : whole file as bytes, None if missing
+    - open       : seekable binary reader, for streaming
+    - upload     : store bytes, returns the new FileStat
+    - delete     : remove the file, False if it did not exist
+    - public_url : permanent URL of a public file
+    - signed_url : URL a client can fetch directly for a limited time
+    """
+
+    # Backend jarak jauh diberi cache disk lokal oleh Storage
+    remote = False
+
+    def stat(self, path):
+        raise NotImplementedError
+
+    def exists(self, path):
+        return self.stat(path) is not None
+
+    def get(self, path):
+        if self.stat(path) is None:
+            return None
+        with self.open(path) as reader:
+            return reader.read()
+
+    def open(self, path, generation=None):
+        raise NotImplementedError
+
+    def upload(self, path, data, content_type):
+        raise NotImplementedError
+
+    def delete(self, path):
+        raise NotImplementedError
+
+    def public_url(self, path):
+        # Backend tanpa URL publik dilayani oleh proxy /storage
+        return f'/storage/{path}'
+
+    def signed_url(self, path, expires_in=timedelta(minutes=15)):
+        # Tanpa penandatanganan, file dilayani oleh proxy /storage
+        return self.public_url(path)
+
+class GCSBackend(StorageBackend):
+    """Google Cloud Storage bucket. Credentials and the client are created on first use, per process."""
+
+    remote = True
+
+    def __init__(self, bucket_name, credentials_file=None, timeout=30, chunk_size=1024 * 1024):
+        self.bucket_name = bucket_name
+        self.credentials_file = credentials_file
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self._bucket = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def bucket(self):
+        # Koneksi HTTP client tidak aman dibagi antar proses, buat ulang setelah fork
+        pid = os.getpid()
+        if self._bucket is None or self._pid != pid:
+            with self._lock:
+                if self._bucket is None or self._pid != pid:
+                    from google.cloud import storage
+                    from google.oauth2 import service_account
+
+                    credentials = None
+                    if self.credentials_file:
+                        credentials = service_account.Credentials.from_service_account_file(self.credentials_file)
+                    self._bucket = storage.Client(credentials=credentials).bucket(self.bucket_name)
+                    self._pid = pid
+        return self._bucket
+
+    def stat(self, path):
+        blob = self.bucket.get_blob(path, timeout=self.timeout)
+        if blob is None:
+            return None
+        return self._stat_from_blob(path, blob)
+
+    def exists(self, path):
+        return self.bucket.blob(path).exists(timeout=self.timeout)
+
+    def get(self, path):
+        from google.api_core.exceptions import NotFound
+        try:
+            return self.bucket.blob(path).download_as_bytes(timeout=self.timeout)
+        except NotFound:
+            return None
+
+    def open(self, path, generation=None):
+        blob = self.bucket.blob(path, generation=generation)
+        return blob.open('rb', chunk_size=self.chunk_size, timeout=self.timeout)
+
+    def upload(self, path, data, content_type):
+        blob = self.bucket.blob(path)
+        blob.upload_from_string(data, content_type=content_type, timeout=self.timeout)
+
+        # Set file menjadi publik setelah diupload
+        blob.make_public(timeout=self.timeout)
+        return self._stat_from_blob(path, blob)
+
+    def delete(self, path):
+        from google.api_core.exceptions import NotFound
+        try:
+            self.bucket.blob(path).delete(timeout=self.timeout)
+            return True
+        except NotFound:
+            return False
+
+    def public_url(self, path):
+        return f"https://storage.googleapis.com/{self.bucket_name}/{path}"
+
+    def signed_url(self, path, expires_in=timedelta(minutes=15)):
+        return self.bucket.blob(path).generate_signed_url(version='v4', expiration=expires_in, method='GET')
+
+    @staticmethod
+    def _stat_from_blob(path, blob):
+        return FileStat(
+            path=path,
+            size=blob.size,
+            content_type=blob.content_type or 'application/octet-stream',
+            etag=blob.etag,
+            updated=blob.updated,
+            generation=blob.generation
+        )
+
+class LocalBackend(StorageBackend):
+    """Directory on the local filesystem, for development, offline load tests and benchmarks."""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def stat(self, path):
+        try:
+            full_path = self._full_path(path)
+            stat = os.stat(full_path)
+        except (ValueError, FileNotFoundError, NotADirectoryError):
+            return None
+        if not os.path.isfile(full_path):
+            return None
+        return FileStat(
+            path=path,
+            size=stat.st_size,
+            content_type=_guess_content_type(path),
+            etag=f'{stat.st_mtime_ns:x}-{stat.st_size:x}',
+            updated=datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+            generation=stat.st_mtime_ns
+        )
+
+    def open(self, path, generation=None):
+        return open(self._full_path(path), 'rb')
+
+    def upload(self, path, data, content_type):
+        full_path = self._full_path(path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+        # Tulis ke file sementara lalu ganti, pembaca tidak melihat file setengah jadi
+        tmp_path = f'{full_path}.tmp{os.getpid()}.{threading.get_ident()}'
+        with open(tmp_path, 'wb') as file:
+            file.write(data)
+        os.replace(tmp_path, full_path)
+        return self.stat(path)
+
+    def delete(self, path):
+        try:
+            os.remove(self._full_path(path))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _full_path(self, path):
+        full_path = os.path.abspath(os.path.join(self.root, path))
+        # Tolak path yang keluar dari direktori penyimpanan (mis. '../')
+        if os.path.commonpath([self.root, full_path]) != self.root:
+            raise ValueError(f"Path outside storage root: {path}")
+        return full_path
+
+class MemoryBackend(StorageBackend):
+    """Files kept in a dictionary of this process, for tests."""
+
+    def __init__(self):
+        self.files = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def stat(self, path):
+        item = self.files.get(path)
+        return item[0] if item is not None else None
+
+    def open(self, path, generation=None):
+        item = self.files.get(path)
+        if item is None:
+            raise FileNotFoundError(path)
+        return io.BytesIO(item[1])
+
+    def upload(self, path, data, content_type):
+        with self._lock:
+            self._generation += 1
+            stat = FileStat(
+                path=path,
+                size=len(data),
+                content_type=content_type,
+                etag=f'{self._generation:x}',
+                updated=datetime.now(timezone.utc),
+                generation=self._generation
+            )
+            self.files[path] = (stat, bytes(data))
+        return stat
+
+    def delete(self, path):
+        with self._lock:
+            return self.files.pop(path, None) is not None
+
+def _guess_content_type(path):
+    return mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+def create_backend(name=None):
+    """
+    Storage backend chosen by the STORAGE_BACKEND environment variable.
+
+    - 'gcs'    : Google Cloud Storage bucket BUCKET_NAME (default)
+    - 'local'  : directory STORAGE_LOCAL_DIR
+    - 'memory' : in-process dictionary, for tests
+    """
+    name = name or os.getenv('STORAGE_BACKEND', 'gcs')
+    if name == 'gcs':
+        if os.environ.get("Environment") == "production":
+            credentials_file = "/SECRETS/SERVICE_ACCOUNT"
+        else:
+            credentials_file = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
+        return GCSBackend(
+            os.getenv('BUCKET_NAME'),
+            credentials_file=credentials_file,
+            timeout=float(os.getenv('STORAGE_TIMEOUT', 30)),
+            chunk_size=int(os.getenv('STORAGE_CHUNK_SIZE', 1024 * 1024))
+        )
+    if name == 'local':
+        return LocalBackend(os.getenv('STORAGE_LOCAL_DIR', 'storage'))
+    if name == 'memory':
+        return MemoryBackend()
+    raise ValueError(f"Unknown STORAGE_BACKEND: {name}")
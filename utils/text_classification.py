@@ -1,15 +1,20 @@
 import os
 import re
+import time
+import queue
 import logging
+import threading
+import functools
 import numpy as np
 import pickle
 import nltk
 
-from tensorflow.keras.preprocessing.sequence import pad_sequences
 from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
-import tensorflow as tf
+
+# TensorFlow is imported lazily in EmergencyCaseClassifier._load_ml_components,
+# so importing this module (and the app) stays cheap until a prediction is needed.
 
 # Logging setup
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -31,7 +36,45 @@ def ensure_nltk_resources():
     except LookupError:
         nltk.download('punkt_tab')
 
-ensure_nltk_resources()
+class _LRUCache:
+    """Thread-safe bounded mapping that evicts the least recently used key"""
+
+    def __init__(self, maxsize):
+        self.maxsize = max(0, int(maxsize))
+        self._data = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            try:
+                # Re-insert to mark as most recently used
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.maxsize == 0:
+            return
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                del self._data[next(iter(self._data))]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data), 'maxsize': self.maxsize}
+
 
 class EmergencyCaseClassifier:
     def __init__(self, base_path=None):
@@ -41,6 +84,10 @@ class EmergencyCaseClassifier:
         :param base_path: Base directory for model files. If None, uses the current directory
         """
         logging.info("Initializing EmergencyCaseClassifier...")
+        started = time.perf_counter()
+
+        # Seconds spent in each startup phase
+        self.load_report = {'pid': os.getpid()}
 
         # Determine base path
         if base_path is None:
@@ -53,13 +100,30 @@ class EmergencyCaseClassifier:
         
         # Validate file existence
         self._validate_files()
+
+        # Caches are dropped whenever the model or tokenizer files change
+        self.prediction_cache = _LRUCache(os.getenv('CLASSIFIER_PREDICTION_CACHE_SIZE', 1024))
+        self.reload_check_interval = float(os.getenv('CLASSIFIER_RELOAD_CHECK_SECONDS', 30))
+        self.reloads = 0
+        self._reload_lock = threading.Lock()
+        self._files_signature = self._get_files_signature()
+        self._files_checked_at = time.monotonic()
         
         # Initialize preprocessing components
+        phase_started = time.perf_counter()
+        ensure_nltk_resources()
         self._init_preprocessing()
+        self.load_report['preprocessing_seconds'] = time.perf_counter() - phase_started
         
         # Load machine learning components
         self._load_ml_components()
 
+        self.load_report['total_seconds'] = time.perf_counter() - started
+        logging.info(
+            "Classifier startup report: " +
+            ", ".join(f"{key}={value:.3f}s" for key, value in self.load_report.items() if key.endswith('_seconds'))
+        )
+
     def _validate_files(self):
         """Check if all required model files exist"""
         files_to_check = [
@@ -73,6 +137,49 @@ class EmergencyCaseClassifier:
                 raise FileNotFoundError(f"Required model file not found: {file_path}")
         logging.info("All required model files found.")
 
+    def _get_files_signature(self):
+        """Modification time and size of every model file"""
+        signature = []
+        for file_path in (self.model_path, self.tokenizer_path, self.label_encoder_path):
+            stat = os.stat(file_path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def _check_model_files(self):
+        """Reload the model and drop the caches when the model files changed on disk"""
+        now = time.monotonic()
+        if now - self._files_checked_at < self.reload_check_interval:
+            return
+
+        with self._reload_lock:
+            if now - self._files_checked_at < self.reload_check_interval:
+                return
+            self._files_checked_at = now
+
+            signature = self._get_files_signature()
+            if signature == self._files_signature:
+                return
+
+            logging.info("Model files changed, reloading machine learning components...")
+            self._load_ml_components()
+            self._files_signature = signature
+            self.prediction_cache.clear()
+            self._stem.cache_clear()
+            self.reloads += 1
+
+    def cache_stats(self):
+        """
+        Hit/miss counters of the stem and prediction caches
+
+        :return: Dictionary of counters
+        """
+        stem = self._stem.cache_info()
+        return {
+            'stem': {'hits': stem.hits, 'misses': stem.misses, 'size': stem.currsize, 'maxsize': stem.maxsize},
+            'prediction': self.prediction_cache.stats(),
+            'reloads': self.reloads,
+        }
+
     def _init_preprocessing(self):
         """Initialize text preprocessing components"""
         logging.info("Initializing text preprocessing components...")
@@ -80,6 +187,9 @@ class EmergencyCaseClassifier:
         # Stemmer
         factory = StemmerFactory()
         self.stemmer = factory.create_stemmer()
+
+        # Descriptions reuse a small vocabulary, so memoize stemming per token
+        self._stem = functools.lru_cache(maxsize=int(os.getenv('CLASSIFIER_STEM_CACHE_SIZE', 4096)))(self.stemmer.stem)
         
         # Stopwords
         self.stop_words = set(stopwords.words('indonesian'))
@@ -97,8 +207,17 @@ class EmergencyCaseClassifier:
         logging.info("Loading machine learning components...")
 
         try:
+            # Import TensorFlow
+            phase_started = time.perf_counter()
+            import tensorflow as tf
+            from tensorflow.keras.preprocessing.sequence import pad_sequences
+            self._pad_sequences = pad_sequences
+            self.load_report['tensorflow_import_seconds'] = time.perf_counter() - phase_started
+
             # Load LSTM model
+            phase_started = time.perf_counter()
             self.model = tf.keras.models.load_model(self.model_path)
+            self.load_report['model_load_seconds'] = time.perf_counter() - phase_started
             
             # Load tokenizer
             with open(self.tokenizer_path, 'rb') as handle:
@@ -134,7 +253,7 @@ class EmergencyCaseClassifier:
         tokens = [word for word in tokens if word not in self.stop_words]
         
         # Stem tokens
-        tokens = [self.stemmer.stem(word) for word in tokens]
+        tokens = [self._stem(word) for word in tokens]
 
         logging.info("Text preprocessing completed.")
         return tokens
@@ -149,39 +268,317 @@ class EmergencyCaseClassifier:
         if not text.strip():
             raise ValueError("Input text is empty.")
 
+        label = self.predict_many([text])[0]
+        logging.info(f"Prediction completed. Predicted label: {label}")
+        return label
+
+    @staticmethod
+    def normalize_text(text):
+        """
+        Normalize text into the key used by the prediction cache
+
+        :param text: Input text
+        :return: Lowercased text with collapsed whitespace
+        """
+        return ' '.join(text.lower().split())
+
+    def predict_many(self, texts, batch_size=256):
+        """
+        Predict emergency case labels for many texts in one vectorized pass
+
+        :param texts: List of input texts to classify
+        :param batch_size: Number of rows per forward pass inside Keras
+        :return: List of predicted labels, in the same order as texts
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+
+        if any(not text or not text.strip() for text in texts):
+            raise ValueError("Input text is empty.")
+
         try:
-            logging.info("Predicting emergency case...")
-            
-            # Preprocess text
-            tokens = self.preprocess_text(text)
-            
-            # Convert to sequence
-            sequence = self.tokenizer.texts_to_sequences([tokens])
-            
-            # Pad sequence
-            padded = pad_sequences(sequence, padding='post', maxlen=self.MAX_SEQUENCE_LENGTH)
-            
-            # Predict
-            prediction = self.model.predict(padded)
-            
-            # Get predicted index
-            predicted_index = np.argmax(prediction, axis=1)
-            
-            # Return label
-            label = self.label_encoder.inverse_transform(predicted_index)[0]
-            logging.info(f"Prediction completed. Predicted label: {label}")
-            return label
+            logging.info(f"Predicting {len(texts)} emergency cases...")
+            self._check_model_files()
+
+            # Serve repeated descriptions from the prediction cache
+            keys = [self.normalize_text(text) for text in texts]
+            cached = {key: self.prediction_cache.get(key) for key in dict.fromkeys(keys)}
+            missing = [key for key, label in cached.items() if label is None]
+
+            if missing:
+                # Preprocess every unseen text, then tokenize, pad and predict as one array
+                token_lists = [self.preprocess_text(key) for key in missing]
+                predicted = self._predict_tokens(token_lists, batch_size=batch_size)
+                for key, label in zip(missing, predicted):
+                    self.prediction_cache.put(key, label)
+                    cached[key] = label
+
+            labels = [cached[key] for key in keys]
+
+            logging.info(f"Prediction completed for {len(labels)} texts.")
+            return labels
 
         except Exception as e:
-            logging.error(f"Error during prediction: {e}")
+            logging.error(f"Error during batch prediction: {e}")
             raise RuntimeError(f"Prediction error: {e}")
 
-# Create a singleton instance
-try:
-    emergency_classifier = EmergencyCaseClassifier()
-except Exception as e:
-    logging.error(f"Failed to initialize EmergencyCaseClassifier: {e}")
-    raise
+    def _predict_tokens(self, token_lists, batch_size=None):
+        """
+        Run a single forward pass over several preprocessed token lists
+
+        :param token_lists: List of token lists produced by preprocess_text
+        :param batch_size: Number of rows per forward pass inside Keras
+        :return: List of predicted labels, in the same order
+        """
+        # Convert to sequences
+        sequences = self.tokenizer.texts_to_sequences(token_lists)
+
+        # Pad sequences into one matrix
+        padded = self._pad_sequences(sequences, padding='post', maxlen=self.MAX_SEQUENCE_LENGTH)
+
+        # Predict
+        prediction = self.model.predict(padded, batch_size=batch_size, verbose=0)
+
+        # Get predicted indexes
+        predicted_index = np.argmax(prediction, axis=1)
+
+        # Return labels
+        return list(self.label_encoder.inverse_transform(predicted_index))
+
+
+class _PendingPrediction:
+    """A single caller waiting for its label from the batching worker"""
+
+    __slots__ = ('text', 'enqueued_at', 'done', 'label', 'error')
+
+    def __init__(self, text):
+        self.text = text
+        self.enqueued_at = time.monotonic()
+        self.done = threading.Event()
+        self.label = None
+        self.error = None
+
+
+class MicroBatchClassifier:
+    def __init__(self, loader, max_batch_size=32, max_wait_ms=5):
+        """
+        Collect concurrent predictions for a few milliseconds and run them as one forward pass
+
+        :param loader: Callable returning the EmergencyCaseClassifier used for the forward pass
+        :param max_batch_size: Maximum number of texts per forward pass
+        :param max_wait_ms: Maximum time the oldest request waits for the batch to fill
+        """
+        self.loader = loader
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+        self._reset_stats()
+
+    def predict(self, text):
+        """
+        Predict emergency case label, sharing the forward pass with concurrent callers
+
+        :param text: Input text to classify
+        :return: Predicted label
+        """
+        if not text.strip():
+            raise ValueError("Input text is empty.")
+
+        self._ensure_worker()
+
+        pending = _PendingPrediction(text)
+        self._queue.put(pending)
+        pending.done.wait()
+
+        if pending.error is not None:
+            raise pending.error
+        return pending.label
+
+    def stats(self):
+        """
+        Snapshot of batch-size and queue-wait metrics for tuning
+
+        :return: Dictionary of counters
+        """
+        with self._lock:
+            batches = self._stats['batches']
+            requests = self._stats['requests']
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'batches': batches,
+                'requests': requests,
+                'errors': self._stats['errors'],
+                'queue_depth': self._queue.qsize(),
+                'avg_batch_size': (requests / batches) if batches else 0.0,
+                'largest_batch': self._stats['largest_batch'],
+                'batch_size_histogram': dict(sorted(self._stats['batch_sizes'].items())),
+                'avg_queue_wait_ms': (self._stats['queue_wait_total'] / requests * 1000.0) if requests else 0.0,
+                'max_queue_wait_ms': self._stats['queue_wait_max'] * 1000.0,
+                'avg_inference_ms': (self._stats['inference_total'] / batches * 1000.0) if batches else 0.0,
+            }
+
+    def _reset_stats(self):
+        self._stats = {
+            'batches': 0,
+            'requests': 0,
+            'errors': 0,
+            'largest_batch': 0,
+            'batch_sizes': {},
+            'queue_wait_total': 0.0,
+            'queue_wait_max': 0.0,
+            'inference_total': 0.0,
+        }
+
+    def _ensure_worker(self):
+        """Start the worker thread, once per process (gunicorn forks after import)"""
+        pid = os.getpid()
+        if self._worker is not None and self._worker_pid == pid and self._worker.is_alive():
+            return
+
+        with self._lock:
+            if self._worker is not None and self._worker_pid == pid and self._worker.is_alive():
+                return
+
+            if self._worker_pid != pid:
+                # Thread and queue inherited from the parent process are unusable after fork
+                self._queue = queue.Queue()
+                self._reset_stats()
+
+            self._worker = threading.Thread(target=self._run, name='classifier-batcher', daemon=True)
+            self._worker_pid = pid
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            batch = [first]
+
+            # Wait for more requests until the oldest one has waited max_wait
+            deadline = first.enqueued_at + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))
+                    else:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._process(batch)
+
+    def _process(self, batch):
+        started = time.monotonic()
+        failed = False
+
+        try:
+            labels = self.loader().predict_many([pending.text for pending in batch])
+            for pending, label in zip(batch, labels):
+                pending.label = label
+        except Exception as e:
+            failed = True
+            for pending in batch:
+                pending.error = e if isinstance(e, RuntimeError) else RuntimeError(f"Prediction error: {e}")
+
+        finished = time.monotonic()
+        size = len(batch)
+
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['requests'] += size
+            self._stats['errors'] += size if failed else 0
+            self._stats['largest_batch'] = max(self._stats['largest_batch'], size)
+            self._stats['batch_sizes'][size] = self._stats['batch_sizes'].get(size, 0) + 1
+            self._stats['inference_total'] += finished - started
+            for pending in batch:
+                wait = started - pending.enqueued_at
+                self._stats['queue_wait_total'] += wait
+                self._stats['queue_wait_max'] = max(self._stats['queue_wait_max'], wait)
+
+        logging.debug(f"Classified batch of {size} in {(finished - started) * 1000.0:.1f} ms")
+
+        for pending in batch:
+            pending.done.set()
+
+# Singleton instance, created on first use
+_emergency_classifier = None
+_emergency_classifier_lock = threading.Lock()
+
+def get_emergency_classifier():
+    """
+    Return the shared classifier, loading TensorFlow and the model on first use
+
+    :return: EmergencyCaseClassifier instance
+    """
+    global _emergency_classifier
+
+    if _emergency_classifier is None:
+        with _emergency_classifier_lock:
+            if _emergency_classifier is None:
+                try:
+                    _emergency_classifier = EmergencyCaseClassifier()
+                except Exception as e:
+                    logging.error(f"Failed to initialize EmergencyCaseClassifier: {e}")
+                    raise
+    return _emergency_classifier
+
+def preload_classifier():
+    """
+    Load the classifier now, e.g. in the gunicorn master so workers share it copy-on-write
+
+    :return: Startup report of the load
+    """
+    return get_emergency_classifier().load_report
+
+def warm_up_classifier_async():
+    """
+    Load the classifier in a background thread so the first request does not pay for it
+
+    :return: The started thread
+    """
+    def warm_up():
+        try:
+            get_emergency_classifier()
+        except Exception:
+            # Already logged; the next prediction will retry the load
+            pass
+
+    thread = threading.Thread(target=warm_up, name='classifier-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+def get_classifier_cache_stats():
+    """
+    Hit/miss counters of the stem and prediction caches
+
+    :return: Cache counters, or None if the classifier has not been loaded yet
+    """
+    if _emergency_classifier is None:
+        return None
+    return _emergency_classifier.cache_stats()
+
+def get_classifier_load_report():
+    """
+    Seconds spent importing TensorFlow and loading the model
+
+    :return: Startup report, or None if the classifier has not been loaded yet
+    """
+    if _emergency_classifier is None:
+        return None
+    return dict(_emergency_classifier.load_report)
+
+# Share forward passes between concurrent requests
+classifier_batcher = MicroBatchClassifier(
+    get_emergency_classifier,
+    max_batch_size=os.getenv('CLASSIFIER_MAX_BATCH_SIZE', 32),
+    max_wait_ms=os.getenv('CLASSIFIER_MAX_WAIT_MS', 5)
+)
 
 def predict_emergency_case(text):
     """
@@ -190,4 +587,22 @@ def predict_emergency_case(text):
     :param text: Input text to classify
     :return: Predicted label
     """
-    return emergency_classifier.predict(text)
+    return classifier_batcher.predict(text)
+
+def predict_emergency_cases(texts, batch_size=256):
+    """
+    Convenience function to predict emergency case labels for many texts
+
+    :param texts: List of input texts to classify
+    :param batch_size: Number of rows per forward pass
+    :return: List of predicted labels
+    """
+    return get_emergency_classifier().predict_many(texts, batch_size=batch_size)
+
+def get_classifier_stats():
+    """
+    Batch-size and queue-wait metrics of the micro-batching layer
+
+    :return: Dictionary of counters
+    """
+    return classifier_batcher.stats()
@@ -0,0 +1,73 @@
+import os
+import time
+import threading
+from app.models.login_log import LoginLog
+
+class TokenSessionCache:
+    """
+    In-process cache of active and revoked token identifiers (JTI).
+
+    Every authenticated request checks its JTI here first and only falls back to
+    the login_logs table when the entry is missing or older than the TTL. Each
+    gunicorn worker has its own cache, so a logout handled by another worker is
+    seen here after at most `ttl` seconds.
+    """
+
+    def __init__(self, ttl=60, maxsize=10000):
+        self.ttl = float(ttl)
+        self.maxsize = int(maxsize)
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def is_active(self, jti):
+        """
+        Check whether the token has a login session that has not been logged out
+
+        :param jti: Token identifier from the JWT
+        :return: True if the session is active
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(jti)
+            if entry is not None and entry[1] > now:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        log = LoginLog.query.filter_by(token_identifier=jti).with_entities(LoginLog.destroy_at).first()
+        active = log is not None and log.destroy_at is None
+        self._set(jti, active)
+        return active
+
+    def mark_active(self, jti):
+        """Cache a freshly created login session"""
+        self._set(jti, True)
+
+    def invalidate(self, jti):
+        """Cache the token as revoked, e.g. right after logout"""
+        self._set(jti, False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'ttl': self.ttl}
+
+    def _set(self, jti, active):
+        with self._lock:
+            self._entries.pop(jti, None)
+            self._entries[jti] = (active, time.monotonic() + self.ttl)
+
+            # Buang entri terlama jika melebihi batas
+            while len(self._entries) > self.maxsize:
+                del self._entries[next(iter(self._entries))]
+
+# Buat instance global
+token_sessions = TokenSessionCache(
+    ttl=os.getenv('TOKEN_SESSION_CACHE_TTL', 60),
+    maxsize=os.getenv('TOKEN_SESSION_CACHE_SIZE', 10000)
+)